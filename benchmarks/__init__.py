@@ -0,0 +1,10 @@
+"""Benchmarks of Krupy against synthetic templates.
+
+Templates are generated with [generator][benchmarks.generator], and shipped as
+Git bundles, so cloning costs the same as with any other local repository.
+Run all scenarios with:
+
+```shell
+poe bench
+```
+"""
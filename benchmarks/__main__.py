@@ -0,0 +1,125 @@
+"""Run benchmarks from the command line.
+
+```shell
+python -m benchmarks --files 1000 --templated 0.9 copy update
+```
+
+Save a baseline, then fail if a later run regresses against it:
+
+```shell
+python -m benchmarks --save baseline.json
+python -m benchmarks --compare baseline.json --tolerance 0.2
+```
+"""
+
+from pathlib import Path
+
+from plumbum import cli
+
+from .generator import TemplateSpec
+from .runner import (
+    DEFAULT_TOLERANCE,
+    TRACKED,
+    compare,
+    load_baseline,
+    run_benchmarks,
+    save_baseline,
+    table,
+)
+from .scenarios import SCENARIOS
+
+_DEFAULTS = TemplateSpec()
+_CHOICES = dict.fromkeys([*SCENARIOS, *TRACKED])
+
+
+class BenchmarksApp(cli.Application):
+    """Time Krupy scenarios against a synthetic template."""
+
+    DESCRIPTION = "Time Krupy scenarios against a synthetic template"
+
+    files = cli.SwitchAttr(
+        ["--files"], int, default=_DEFAULTS.files, help="Files to render"
+    )
+    depth = cli.SwitchAttr(
+        ["--depth"], int, default=_DEFAULTS.depth, help="How deep folders are nested"
+    )
+    size = cli.SwitchAttr(
+        ["--size"], int, default=_DEFAULTS.size, help="Bytes in each file"
+    )
+    templated = cli.SwitchAttr(
+        ["--templated"],
+        float,
+        default=_DEFAULTS.templated,
+        help="Ratio of templated files",
+    )
+    path_templated = cli.SwitchAttr(
+        ["--path-templated"],
+        float,
+        default=_DEFAULTS.path_templated,
+        help="Ratio of files with templated names",
+    )
+    excluded = cli.SwitchAttr(
+        ["--excluded"],
+        int,
+        default=_DEFAULTS.excluded,
+        help="Exclusion patterns, each matching one file",
+    )
+    questions = cli.SwitchAttr(
+        ["--questions"], int, default=_DEFAULTS.questions, help="Questions to answer"
+    )
+    rounds = cli.SwitchAttr(
+        ["--rounds"], cli.Range(1, 1000), default=5, help="Times to run each scenario"
+    )
+    save = cli.SwitchAttr(
+        ["--save"],
+        cli.NonexistentPath,
+        help="Write results to a baseline file; tracked scenarios by default",
+    )
+    compare = cli.SwitchAttr(
+        ["--compare"],
+        cli.ExistingFile,
+        excludes=["--save"],
+        help=(
+            "Measure again what a baseline file has, with the same template, "
+            "and fail if anything regressed"
+        ),
+    )
+    tolerance = cli.SwitchAttr(
+        ["--tolerance"],
+        float,
+        default=DEFAULT_TOLERANCE,
+        help="Ratio a median can grow before it counts as a regression",
+    )
+
+    def main(self, *scenarios: cli.Set(*_CHOICES)) -> int:  # type: ignore[valid-type]
+        """Run the given scenarios, or all of them."""
+        if self.compare:
+            spec, baseline = load_baseline(Path(self.compare))
+            results = run_benchmarks(spec, scenarios or baseline, self.rounds)
+            print(table(results))
+            report, failed = compare(baseline, results, self.tolerance)
+            print(report)
+            if failed:
+                print(f"Regressed: {', '.join(failed)}")
+                return 1
+            return 0
+        spec = TemplateSpec(
+            files=self.files,
+            depth=self.depth,
+            size=self.size,
+            templated=self.templated,
+            path_templated=self.path_templated,
+            excluded=self.excluded,
+            questions=self.questions,
+        )
+        print(spec)
+        default = TRACKED if self.save else SCENARIOS
+        results = run_benchmarks(spec, scenarios or default, self.rounds)
+        print(table(results))
+        if self.save:
+            save_baseline(Path(self.save), spec, results)
+        return 0
+
+
+if __name__ == "__main__":
+    BenchmarksApp.run()
@@ -0,0 +1,147 @@
+"""Generate synthetic templates of any shape.
+
+A template is described with a [TemplateSpec][benchmarks.generator.TemplateSpec],
+and saved in a Git bundle with two tags, so it can be copied from `v1` and
+updated to `v2`.
+"""
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List
+
+import yaml
+from plumbum import local
+from plumbum.cmd import git
+
+from krupy.template import DEFAULT_EXCLUDE, DEFAULT_TEMPLATES_SUFFIX as SUFFIX
+from tests.helpers import build_file_tree, git_save
+
+
+@dataclass(frozen=True)
+class TemplateSpec:
+    """Shape of a synthetic template.
+
+    Attributes:
+        files:
+            How many files are rendered, not counting excluded ones.
+
+        depth:
+            How deep folders are nested. Files are spread among up to
+            `2 ** depth` folders.
+
+        size:
+            Approximate size of each file, in bytes.
+
+        templated:
+            Ratio of files that end with the templates suffix.
+
+        path_templated:
+            Ratio of files whose name is templated.
+
+        excluded:
+            How many exclusion patterns the template has. Each one matches
+            one file.
+
+        questions:
+            How many questions the template has, beside `project`, which
+            templated paths use. Templated files reference them.
+    """
+
+    files: int = 100
+    depth: int = 2
+    size: int = 1024
+    templated: float = 0.5
+    path_templated: float = 0.1
+    excluded: int = 0
+    questions: int = 5
+
+    @property
+    def updated(self) -> List[int]:
+        """Indexes of the files that change from `v1` to `v2`."""
+        return list(range(0, self.files, 10))
+
+    def questionary(self) -> Dict[str, dict]:
+        """Questions of the template, by variable name."""
+        result: Dict[str, dict] = {"project": {"type": "str", "default": "bench"}}
+        for index in range(self.questions):
+            question: dict = {"type": "str", "default": f"value {index}"}
+            if index % 3 == 1:
+                question["default"] = f"{{{{ project }}}}-{index}"
+            if index % 4 == 2:
+                question["when"] = "{{ project != 'skip' }}"
+            result[f"q{index}"] = question
+        return result
+
+    def tree(self, version: int = 1) -> Dict[Path, str]:
+        """Contents of all template files, by relative path.
+
+        Args:
+            version: 1 or 2, to get the contents of each tag.
+        """
+        config = {
+            **self.questionary(),
+            "_exclude": [
+                *DEFAULT_EXCLUDE,
+                *(f"skip-{index}.txt" for index in range(self.excluded)),
+            ],
+        }
+        result = {
+            Path("krupy.yml"): yaml.safe_dump(config),
+            # Recopies and updates need the answers file
+            Path("{{ _krupy_conf.answers_file }}" + SUFFIX): (
+                "{{ _krupy_answers|to_nice_yaml }}"
+            ),
+        }
+        for index in range(self.excluded):
+            result[Path(f"skip-{index}.txt")] = "excluded\n"
+        variables = ["project", *(f"q{index}" for index in range(self.questions))]
+        for index in range(self.files):
+            templated = _spread(index, self.templated)
+            folder = Path(*(f"d{(index >> level) % 2}" for level in range(self.depth)))
+            name = f"file-{index}.txt"
+            if _spread(index, self.path_templated):
+                name = f"{{{{ project }}}}-{name}"
+            if templated:
+                name += SUFFIX
+            lines: List[str] = []
+            length = 0
+            while length < self.size:
+                line = f"line {len(lines)} of file {index}"
+                if templated:
+                    line += f": {{{{ {variables[len(lines) % len(variables)]} }}}}"
+                lines.append(line)
+                length += len(line) + 1
+            if version > 1 and index in self.updated:
+                lines.append("updated")
+            result[folder / name] = "\n".join(lines) + "\n"
+        if version > 1:
+            result[Path("added.txt")] = "added\n"
+        return result
+
+
+def _spread(index: int, ratio: float) -> bool:
+    """Pick evenly spread indexes, as many as the ratio says."""
+    return int((index + 1) * ratio) > int(index * ratio)
+
+
+def generate(spec: TemplateSpec, root: Path) -> Path:
+    """Generate a template in a Git bundle.
+
+    Args:
+        spec: Shape of the template.
+        root: Empty folder where the repository and the bundle are created.
+
+    Returns:
+        Path to the bundle, with tags `v1` and `v2`.
+    """
+    repo = root / "template"
+    for version in (1, 2):
+        build_file_tree(
+            {repo / path: contents for path, contents in spec.tree(version).items()},
+            dedent=False,
+        )
+        git_save(repo, f"Version {version}", f"v{version}")
+    bundle = root / "template.bundle"
+    with local.cwd(repo):
+        git("bundle", "create", bundle, "--all")
+    return bundle
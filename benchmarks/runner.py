@@ -0,0 +1,276 @@
+"""Time scenarios against a generated template, and compare with a baseline.
+
+Beside [scenarios][benchmarks.scenarios.SCENARIOS], these measurements are
+available:
+
+-   `import`: seconds to import Krupy, in a new interpreter.
+-   `copy_memory`: peak bytes allocated by Python while copying.
+
+A baseline is a JSON file with the spec of the template and the samples of
+each measurement. Comparing a new run with it reports a regression when the
+median grew more than the tolerance, and the interquartile ranges (IQR) of
+both runs don't overlap, so that noise alone rarely fails the comparison.
+"""
+
+import json
+import statistics
+import sys
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple
+
+from plumbum import local
+
+from krupy.tools import format_size
+
+from .generator import TemplateSpec, generate
+from .scenarios import SCENARIOS, Scenario
+
+TRACKED = ("copy", "update", "import", "copy_memory")
+DEFAULT_TOLERANCE = 0.1
+
+_IMPORT = (
+    "import time; start = time.perf_counter(); import krupy; "
+    "print(time.perf_counter() - start)"
+)
+
+
+@dataclass
+class Result:
+    """Samples of one measurement.
+
+    Attributes:
+        scenario:
+            Name of the scenario or measurement.
+
+        items:
+            How many files the scenario renders, or questions it answers.
+
+        samples:
+            Value measured in each round.
+
+        unit:
+            `s` for seconds, or `B` for bytes.
+    """
+
+    scenario: str
+    items: int
+    samples: List[float]
+    unit: str = "s"
+
+    @property
+    def median(self) -> float:
+        """Median value of all rounds."""
+        return statistics.median(self.samples)
+
+    @property
+    def quartiles(self) -> Tuple[float, float]:
+        """First and third quartiles of all rounds."""
+        if len(self.samples) < 2:
+            return self.samples[0], self.samples[0]
+        first, _, third = statistics.quantiles(self.samples, method="inclusive")
+        return first, third
+
+    @property
+    def iqr(self) -> float:
+        """Interquartile range of all rounds, which tells how noisy they are."""
+        first, third = self.quartiles
+        return third - first
+
+    @property
+    def throughput(self) -> float:
+        """Items processed per second, in the median round."""
+        return self.items / self.median
+
+    def format(self, value: float) -> str:
+        """Format a value in the unit of this result."""
+        if self.unit == "B":
+            return format_size(int(value))
+        return f"{value:.3f}s"
+
+
+def _prepared(scenario: Scenario, bundle: Path, rounds: int) -> Iterator[Callable]:
+    """Prepare a scenario several times, each one in a new folder."""
+    for _ in range(rounds):
+        with TemporaryDirectory(prefix=f"{__name__}.") as root, scenario(
+            bundle, Path(root)
+        ) as run:
+            yield run
+
+
+def measure(scenario: Scenario, bundle: Path, rounds: int) -> List[float]:
+    """Time a scenario several times, each one in a new folder.
+
+    Args:
+        scenario: What to time.
+        bundle: Template to use.
+        rounds: How many times to run it.
+    """
+    result: List[float] = []
+    for run in _prepared(scenario, bundle, rounds):
+        start = time.perf_counter()
+        run()
+        result.append(time.perf_counter() - start)
+    return result
+
+
+def measure_memory(scenario: Scenario, bundle: Path, rounds: int) -> List[float]:
+    """Get the peak memory allocated by a scenario, several times.
+
+    Args:
+        scenario: What to measure.
+        bundle: Template to use.
+        rounds: How many times to run it.
+    """
+    result: List[float] = []
+    for run in _prepared(scenario, bundle, rounds):
+        tracemalloc.start()
+        try:
+            run()
+            result.append(tracemalloc.get_traced_memory()[1])
+        finally:
+            tracemalloc.stop()
+    return result
+
+
+def measure_import(rounds: int) -> List[float]:
+    """Time importing Krupy in a new interpreter, several times.
+
+    Args:
+        rounds: How many times to import it.
+    """
+    python = local[sys.executable]
+    return [float(python("-c", _IMPORT)) for _ in range(rounds)]
+
+
+def run_benchmarks(
+    spec: TemplateSpec, names: Iterable[str] = SCENARIOS, rounds: int = 5
+) -> Dict[str, Result]:
+    """Generate a template and measure scenarios against it.
+
+    Args:
+        spec: Shape of the template.
+        names:
+            Scenarios to run, from [SCENARIOS][benchmarks.scenarios.SCENARIOS],
+            or other measurements from [TRACKED][benchmarks.runner.TRACKED].
+        rounds: How many times to run each scenario.
+    """
+    results = {}
+    with TemporaryDirectory(prefix=f"{__name__}.") as root:
+        bundle = generate(spec, Path(root))
+        for name in names:
+            if name == "import":
+                results[name] = Result(name, 1, measure_import(rounds))
+            elif name == "copy_memory":
+                samples = measure_memory(SCENARIOS["copy"], bundle, rounds)
+                results[name] = Result(name, spec.files, samples, "B")
+            else:
+                results[name] = Result(
+                    name,
+                    spec.questions + 1 if name == "ask" else spec.files,
+                    measure(SCENARIOS[name], bundle, rounds),
+                )
+    return results
+
+
+def table(results: Dict[str, Result]) -> str:
+    """Format results in a table."""
+    width = max(len("scenario"), *map(len, results))
+    lines = [
+        f"{'scenario':<{width}}  {'rounds':>6}  {'median':>10}  {'iqr':>10}"
+        f"  {'items/s':>9}"
+    ]
+    for name, result in results.items():
+        throughput = f"{result.throughput:.1f}" if result.unit == "s" else "-"
+        lines.append(
+            f"{name:<{width}}  {len(result.samples):>6}"
+            f"  {result.format(result.median):>10}  {result.format(result.iqr):>10}"
+            f"  {throughput:>9}"
+        )
+    return "\n".join(lines)
+
+
+def save_baseline(path: Path, spec: TemplateSpec, results: Dict[str, Result]) -> None:
+    """Write results to a baseline file.
+
+    Args:
+        path: Where to write the JSON file.
+        spec: Shape of the template that was measured.
+        results: What was measured.
+    """
+    data = {
+        "spec": asdict(spec),
+        "results": {name: asdict(result) for name, result in results.items()},
+    }
+    path.write_text(json.dumps(data, indent=2) + "\n")
+
+
+def load_baseline(path: Path) -> Tuple[TemplateSpec, Dict[str, Result]]:
+    """Read a baseline file.
+
+    Args:
+        path: JSON file written by [save_baseline][benchmarks.runner.save_baseline].
+
+    Returns:
+        The spec of the template that was measured, and its results.
+    """
+    data = json.loads(path.read_text())
+    results = {name: Result(**result) for name, result in data["results"].items()}
+    return TemplateSpec(**data["spec"]), results
+
+
+def regressed(old: Result, new: Result, tolerance: float) -> bool:
+    """Tell if a result is significantly worse than the baseline.
+
+    Args:
+        old: Result from the baseline.
+        new: Result of the current run.
+        tolerance: Ratio the median can grow without being a regression.
+    """
+    return (
+        new.median > old.median * (1 + tolerance)
+        and new.quartiles[0] > old.quartiles[1]
+    )
+
+
+def compare(
+    baseline: Dict[str, Result],
+    results: Dict[str, Result],
+    tolerance: float = DEFAULT_TOLERANCE,
+) -> Tuple[str, List[str]]:
+    """Compare results with a baseline.
+
+    Args:
+        baseline: Results loaded from the baseline.
+        results: Results of the current run.
+        tolerance: Ratio the median can grow without being a regression.
+
+    Returns:
+        A table with both medians, and the names of regressed measurements.
+        Measurements missing from the baseline are reported as new.
+    """
+    width = max(len("scenario"), *map(len, results))
+    lines = [f"{'scenario':<{width}}  {'baseline':>10}  {'current':>10}  {'change':>7}"]
+    failed = []
+    for name, new in results.items():
+        if name not in baseline:
+            lines.append(
+                f"{name:<{width}}  {'-':>10}  {new.format(new.median):>10}  {'new':>7}"
+            )
+            continue
+        old = baseline[name]
+        change = new.median / old.median - 1
+        verdict = ""
+        if regressed(old, new, tolerance):
+            failed.append(name)
+            verdict = "  regressed"
+        elif regressed(new, old, tolerance):
+            verdict = "  improved"
+        lines.append(
+            f"{name:<{width}}  {old.format(old.median):>10}"
+            f"  {new.format(new.median):>10}  {change:>+7.1%}{verdict}"
+        )
+    return "\n".join(lines), failed
@@ -0,0 +1,56 @@
+"""What the benchmarks measure.
+
+Each scenario prepares its work in a given folder, then yields the function
+that is timed. Preparing and cleaning up are not timed.
+"""
+
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, ContextManager, Dict, Iterator
+
+from krupy import Worker, run_copy, run_recopy, run_update
+from tests.helpers import git_save
+
+Scenario = Callable[[Path, Path], ContextManager[Callable[[], object]]]
+
+
+@contextmanager
+def copy(bundle: Path, root: Path) -> Iterator[Callable[[], object]]:
+    """Clone the template and render it into a new project."""
+    yield lambda: run_copy(str(bundle), root / "dst", defaults=True, quiet=True)
+
+
+@contextmanager
+def recopy(bundle: Path, root: Path) -> Iterator[Callable[[], object]]:
+    """Render the template again over an existing project."""
+    dst = root / "dst"
+    run_copy(str(bundle), dst, defaults=True, quiet=True)
+    yield lambda: run_recopy(dst, defaults=True, overwrite=True, quiet=True)
+
+
+@contextmanager
+def update(bundle: Path, root: Path) -> Iterator[Callable[[], object]]:
+    """Update a project from `v1` to `v2`."""
+    dst = root / "dst"
+    run_copy(str(bundle), dst, defaults=True, quiet=True, vcs_ref="v1")
+    git_save(dst)
+    yield lambda: run_update(dst, defaults=True, overwrite=True, quiet=True)
+
+
+@contextmanager
+def ask(bundle: Path, root: Path) -> Iterator[Callable[[], object]]:
+    """Answer all questions with their defaults, with the template ready."""
+    with Worker(
+        src_path=str(bundle), dst_path=root / "dst", defaults=True, quiet=True
+    ) as worker:
+        worker.template.questions_data
+        worker.jinja_env
+        yield worker._ask
+
+
+SCENARIOS: Dict[str, Scenario] = {
+    "copy": copy,
+    "recopy": recopy,
+    "update": update,
+    "ask": ask,
+}
@@ -3,6 +3,41 @@
 Docs: https://krupy.readthedocs.io/
 """
 
-from .main import *  # noqa: F401,F403
+from importlib import import_module
+from typing import TYPE_CHECKING, Any, List
 
 __version__ = "2.0.0"
+
+__all__ = [
+    "TemplateSession",
+    "Worker",
+    "arun_copy",
+    "arun_recopy",
+    "arun_update",
+    "run_copy",
+    "run_recopy",
+    "run_update",
+]
+
+# Importing the main module is slow, so it happens only when something from it
+# is used, with PEP 562 module attributes
+if TYPE_CHECKING:
+    from .main import *  # noqa: F401,F403
+
+
+def __getattr__(name: str) -> Any:
+    if name.startswith("_"):
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    main = import_module(".main", __name__)
+    # Submodules become attributes while importing the main one
+    if name in globals():
+        return globals()[name]
+    try:
+        return getattr(main, name)
+    except AttributeError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+
+
+def __dir__() -> List[str]:
+    main = import_module(".main", __name__)
+    return sorted({*globals(), *(name for name in dir(main) if name[0] != "_")})
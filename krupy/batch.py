@@ -0,0 +1,256 @@
+"""Generate many subprojects at once, from a manifest of jobs.
+
+Jobs using the same template and ref are grouped, so each template is
+resolved only once, no matter how many subprojects it generates. Then, jobs
+are distributed among a pool of processes.
+"""
+
+import csv
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import field
+from pathlib import Path
+from time import perf_counter
+from typing import Dict, List, Sequence, Tuple
+
+import yaml
+from pydantic.dataclasses import dataclass
+
+from .errors import UserMessageError
+from .main import TemplateSession
+from .types import AnyByStrDict, OptStr, StrOrPath
+
+# Columns with special meaning in CSV manifests; other columns are data
+MANIFEST_FIELDS = ("template", "ref", "destination")
+
+_GroupKey = Tuple[str, OptStr]
+
+# Sessions prepared in each pool process, by group
+_sessions: Dict[_GroupKey, TemplateSession] = {}
+
+# Template properties resolved by the main process, reused by pool processes.
+# Snapshots of remote templates aren't Git repos, so they can't be resolved again.
+_RESOLVED = ("local_abspath", "commit", "commit_hash", "version")
+
+
+@dataclass
+class BatchJob:
+    """One subproject to generate in a batch.
+
+    Attributes:
+        template:
+            String that can be resolved to a template path, be it local or remote.
+
+        destination:
+            Destination path where to render the subproject.
+
+        ref:
+            Specify the VCS tag/commit to use in the template.
+
+        data:
+            Answers to the questionary defined in the template.
+    """
+
+    template: str
+    destination: str
+    ref: OptStr = None
+    data: AnyByStrDict = field(default_factory=dict)
+
+
+@dataclass
+class BatchResult:
+    """Outcome of one [BatchJob][krupy.batch.BatchJob].
+
+    Attributes:
+        job:
+            The job that produced this result.
+
+        duration:
+            Seconds spent rendering the job.
+
+        error:
+            Description of the error that made the job fail, if any.
+    """
+
+    job: BatchJob
+    duration: float = 0.0
+    error: OptStr = None
+
+    @property
+    def ok(self) -> bool:
+        """Indicate if the job succeeded."""
+        return self.error is None
+
+
+def load_manifest(path: StrOrPath) -> List[BatchJob]:
+    """Load jobs from a manifest file.
+
+    YAML manifests contain a list of mappings with the
+    [BatchJob][krupy.batch.BatchJob] fields.
+
+    CSV manifests need a header row. The `template`, `ref` and `destination`
+    columns are job fields; all other columns are data for the template.
+    Empty cells are ignored.
+
+    Args:
+        path: Path to a `.yml`, `.yaml` or `.csv` file.
+    """
+    path = Path(path)
+    with path.open(newline="") as fd:
+        if path.suffix.lower() == ".csv":
+            rows: List[AnyByStrDict] = []
+            for row in csv.DictReader(fd):
+                values = {key: value for key, value in row.items() if value}
+                job = {key: values.pop(key) for key in MANIFEST_FIELDS if key in values}
+                rows.append({**job, "data": values})
+        else:
+            rows = yaml.safe_load(fd) or []
+    if not isinstance(rows, list):
+        raise UserMessageError(f"Manifest `{path}` must contain a list of jobs.")
+    return [BatchJob(**row) for row in rows]
+
+
+def run_batch(
+    jobs: Sequence[BatchJob], processes: int = 1, **kwargs
+) -> List[BatchResult]:
+    """Generate all subprojects in a batch.
+
+    A failing job doesn't stop the others.
+
+    Args:
+        jobs:
+            Subprojects to generate.
+        processes:
+            How many of them to generate at once. If `1`, don't spawn any
+            subprocess.
+        **kwargs:
+            Other [Worker][krupy.main.Worker] fields, common to all jobs.
+            Jobs always use [defaults][], because they can't be interactive.
+
+    Returns:
+        One result for each job, in the same order.
+    """
+    settings = {**kwargs, "defaults": True}
+    # These are session fields, not render settings
+    common: AnyByStrDict = {
+        key: settings.pop(key)
+        for key in ("exclude", "use_prereleases")
+        if key in settings
+    }
+    results = [BatchResult(job=job) for job in jobs]
+    groups: Dict[_GroupKey, List[int]] = {}
+    for index, job in enumerate(jobs):
+        groups.setdefault((job.template, job.ref), []).append(index)
+    pool = ProcessPoolExecutor(processes) if processes > 1 else None
+    sessions: List[TemplateSession] = []
+    try:
+        pending: List[Tuple[int, Future]] = []
+        for (template, ref), indexes in groups.items():
+            session_kwargs: AnyByStrDict = {
+                **common,
+                "src_path": template,
+                "vcs_ref": ref,
+                "settings": settings,
+            }
+            session = TemplateSession(**session_kwargs)
+            sessions.append(session)
+            try:
+                session.prepare()
+            except Exception as error:
+                for index in indexes:
+                    results[index].error = _describe(error)
+                continue
+            if pool is None:
+                _sessions[(template, ref)] = session
+            for index in indexes:
+                args = (
+                    session_kwargs,
+                    {name: getattr(session.template, name) for name in _RESOLVED},
+                    jobs[index].destination,
+                    jobs[index].data,
+                )
+                if pool is None:
+                    results[index].duration, results[index].error = _run_job(*args)
+                else:
+                    pending.append((index, pool.submit(_run_job, *args)))
+        for index, future in pending:
+            try:
+                results[index].duration, results[index].error = future.result()
+            except Exception as error:
+                # The process running the job died
+                results[index].error = _describe(error)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        for session in sessions:
+            _sessions.pop((session.src_path, session.vcs_ref), None)
+            session.close()
+    return results
+
+
+def _run_job(
+    session_kwargs: AnyByStrDict,
+    resolved: AnyByStrDict,
+    destination: str,
+    data: AnyByStrDict,
+) -> Tuple[float, OptStr]:
+    """Render one job, reusing a session for its template if possible.
+
+    Returns:
+        The duration of the render and the error description, if any.
+    """
+    start = perf_counter()
+    key = (session_kwargs["src_path"], session_kwargs["vcs_ref"])
+    try:
+        try:
+            session = _sessions[key]
+        except KeyError:
+            # Pool process: reuse the template resolved by the main process,
+            # which also takes care of cleaning it up
+            session = TemplateSession(**session_kwargs)
+            session.template.__dict__.update(resolved)
+            session = _sessions[key] = session.prepare()
+        session.render(destination, data=data)
+    except Exception as error:
+        return perf_counter() - start, _describe(error)
+    return perf_counter() - start, None
+
+
+def _describe(error: BaseException) -> str:
+    """Summarize an error in one line."""
+    message = " ".join(str(error).split())
+    return f"{type(error).__name__}: {message}" if message else type(error).__name__
+
+
+def format_results(results: Sequence[BatchResult]) -> str:
+    """Render batch results as a text table.
+
+    Args:
+        results: What [run_batch][krupy.batch.run_batch] returned.
+    """
+    rows = [("#", "STATUS", "SECONDS", "DESTINATION", "TEMPLATE", "ERROR")]
+    for number, result in enumerate(results, 1):
+        template = result.job.template
+        if result.job.ref:
+            template = f"{template}@{result.job.ref}"
+        rows.append(
+            (
+                str(number),
+                "ok" if result.ok else "FAILED",
+                f"{result.duration:.3f}",
+                result.job.destination,
+                template,
+                result.error or "",
+            )
+        )
+    widths = [max(len(row[col]) for row in rows) for col in range(len(rows[0]))]
+    lines = [
+        "  ".join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip()
+        for row in rows
+    ]
+    failed = sum(not result.ok for result in results)
+    total = sum(result.duration for result in results)
+    lines.append(
+        f"{len(results) - failed} succeeded, {failed} failed, "
+        f"{total:.3f}s of rendering"
+    )
+    return "\n".join(lines)
@@ -0,0 +1,511 @@
+"""Persistent cache of remote templates.
+
+Remote Git templates are mirrored once into the user cache folder, and every
+later use reads from that mirror, which is only fetched again when the
+requested reference could have moved.
+
+Each commit that is used is also kept as a snapshot: a plain copy of its
+files, including submodules, without Git metadata. It's written straight from
+the objects of the mirror, or copied from a clone when only a Git checkout
+would write the files right. Later uses of the same
+commit hard-link the snapshot files into a temporary folder, without running
+Git at all when the reference is a tag or commit that was used before. The
+least recently used mirrors and snapshots are evicted when the cache takes
+more than `$KRUPY_CACHE_MAX_SIZE` MiB (1 GiB by default), and those unused for
+more than `$KRUPY_CACHE_MAX_AGE` days (30 by default). See `krupy cache` to
+manage it yourself.
+
+In [offline mode][krupy.cache.is_offline], mirrors are never fetched, and
+using a template, tag or commit that isn't in the cache fails at once.
+
+The cache lives in `$KRUPY_CACHE_DIR` if set. Otherwise, it's in the usual
+cache folder of the platform:
+
+-   Linux and others: `$XDG_CACHE_HOME/krupy`, or `~/.cache/krupy`.
+-   macOS: `~/Library/Caches/krupy`.
+-   Windows: `%LOCALAPPDATA%\\krupy\\Cache`.
+"""
+
+import json
+import os
+import re
+import shutil
+import sys
+import time
+from contextlib import suppress
+from dataclasses import asdict, dataclass
+from hashlib import sha256
+from pathlib import Path
+from tempfile import mkdtemp
+from typing import Callable, ContextManager, Dict, List, Optional, Tuple, Union
+
+from .tools import file_lock, format_size
+from .types import AnyByStrDict, OptStr
+
+CACHE_DIR_ENV = "KRUPY_CACHE_DIR"
+OFFLINE_ENV = "KRUPY_OFFLINE"
+MAX_SIZE_ENV = "KRUPY_CACHE_MAX_SIZE"
+MAX_AGE_ENV = "KRUPY_CACHE_MAX_AGE"
+DEFAULT_MAX_SIZE = 1024**3
+DEFAULT_MAX_AGE = 30 * 24 * 3600
+
+
+def cache_dir() -> Path:
+    """Get the root folder of the cache, which may not exist yet."""
+    if os.environ.get(CACHE_DIR_ENV):
+        return Path(os.environ[CACHE_DIR_ENV]).expanduser()
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or Path.home() / "AppData" / "Local"
+        return Path(base, "krupy", "Cache")
+    if sys.platform == "darwin":
+        return Path.home() / "Library" / "Caches" / "krupy"
+    base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base, "krupy")
+
+
+def is_offline() -> bool:
+    """Indicate if remote templates must be used only from the cache.
+
+    It's enabled by setting `$KRUPY_OFFLINE` to anything but `0`, e.g. with
+    the `--offline` CLI switch. Then, Git can only use local repositories.
+    """
+    return os.environ.get(OFFLINE_ENV, "0") not in {"", "0"}
+
+
+def normalize_url(url: str) -> str:
+    """Get the form of a Git URL that is used to key the cache.
+
+    Spellings of the same repository, such as with or without the `.git`
+    suffix, a trailing slash or a different case in the host, are equal.
+
+    Args:
+        url:
+            Git-parseable URL of the repo. As returned by
+            [get_repo][krupy.vcs.get_repo].
+    """
+    url = re.sub(r"(\.git)?/*$", "", url.strip())
+    # Hosts are case-insensitive, but paths may not be
+    return re.sub(
+        r"^(\w[\w+.-]*://)?([^/:]*@)?([^/:]+)",
+        lambda match: "".join(filter(None, match.groups()[:2])) + match[3].lower(),
+        url,
+    )
+
+
+def mirror_path(url: str) -> Path:
+    """Get where the bare mirror of a repository is cached.
+
+    Args:
+        url:
+            Git-parseable URL of the repo. As returned by
+            [get_repo][krupy.vcs.get_repo].
+    """
+    normalized = normalize_url(url)
+    name = re.sub(r"[^\w.-]", "_", normalized.rsplit("/", 1)[-1].rsplit(":", 1)[-1])
+    key = sha256(normalized.encode()).hexdigest()[:16]
+    return cache_dir() / "mirrors" / f"{name}-{key}.git"
+
+
+@dataclass(frozen=True)
+class Entry:
+    """Something kept in the cache.
+
+    Attributes:
+        kind: `mirror` or `snapshot`.
+        path: Where it is.
+        size: Bytes taken by its files.
+        last_used: Last time it was used, as a timestamp.
+    """
+
+    kind: str
+    path: Path
+    size: int
+    last_used: float
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    """A template commit checked out in the cache.
+
+    Attributes:
+        commit_hash: Full hash of the commit.
+        commit: Description of the commit, as given by `git describe`.
+        version: PEP 440 version of the commit, if any.
+        size: Bytes taken by its files.
+    """
+
+    commit_hash: str
+    commit: str
+    version: OptStr
+    size: int
+
+    @property
+    def path(self) -> Path:
+        """Folder of the snapshot in the cache."""
+        return cache_dir() / "snapshots" / self.commit_hash
+
+    @property
+    def tree(self) -> Path:
+        """Folder with the checked out files."""
+        return self.path / "tree"
+
+    @property
+    def last_used(self) -> float:
+        """Last time the snapshot was used, as a timestamp, or 0 if it's gone."""
+        try:
+            return (self.path / "snapshot.json").stat().st_mtime
+        except OSError:
+            return 0.0
+
+
+def lock(
+    name: str, shared: bool = False, blocking: bool = True
+) -> ContextManager[bool]:
+    """Lock an entry of the cache, to coordinate with other processes.
+
+    Entries are created and updated with exclusive locks, and used with shared
+    ones. Eviction only takes entries it can lock without waiting, so those in
+    use are kept.
+
+    Args:
+        name: Name of the entry, which is the name of its folder.
+        shared: Lock it for using it, instead of changing it.
+        blocking: Wait until it can be locked.
+
+    Yields:
+        Whether the entry was locked, which is always true when blocking.
+    """
+    return file_lock(cache_dir() / "locks" / f"{name}.lock", shared, blocking)
+
+
+def _ref_path(url: str, ref: str) -> Path:
+    """Get where the commit of an immutable reference is recorded."""
+    key = sha256(f"{normalize_url(url)}@{ref}".encode()).hexdigest()[:32]
+    return cache_dir() / "refs" / key
+
+
+def find_ref(url: str, ref: str) -> OptStr:
+    """Get the commit hash that a tag or commit was resolved to before, if any.
+
+    Args:
+        url:
+            Git-parseable URL of the repo. As returned by
+            [get_repo][krupy.vcs.get_repo].
+        ref:
+            The tag or commit.
+    """
+    try:
+        return _ref_path(url, ref).read_text().strip()
+    except OSError:
+        return None
+
+
+def save_ref(url: str, ref: str, commit_hash: str) -> None:
+    """Record the commit hash of a tag or commit, to find its snapshot later.
+
+    Args:
+        url:
+            Git-parseable URL of the repo. As returned by
+            [get_repo][krupy.vcs.get_repo].
+        ref:
+            The tag or commit. Branches must not be recorded, as they move.
+        commit_hash:
+            Full hash of the commit it points to.
+    """
+    path = _ref_path(url, ref)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Replace it at once, so other processes never read it half written
+    partial = path.with_name(f"{path.name}.{os.getpid()}")
+    partial.write_text(commit_hash)
+    partial.replace(path)
+
+
+def _read_snapshot(path: Path) -> Optional[Snapshot]:
+    """Read the metadata of a snapshot folder, if it's complete."""
+    try:
+        return Snapshot(**json.loads((path / "snapshot.json").read_text()))
+    except (OSError, TypeError, ValueError):
+        return None
+
+
+def find_snapshot(commit_hash: str) -> Optional[Snapshot]:
+    """Get the snapshot of a commit, if any, and mark it as just used.
+
+    Args:
+        commit_hash: Full hash of the commit.
+    """
+    snapshot = _read_snapshot(cache_dir() / "snapshots" / commit_hash)
+    if snapshot is not None:
+        with suppress(OSError):
+            os.utime(snapshot.path / "snapshot.json")
+    return snapshot
+
+
+def store_snapshot(
+    checkout: Union[Path, Callable[[Path], None]],
+    commit_hash: str,
+    commit: str,
+    version: OptStr,
+) -> Snapshot:
+    """Copy a checkout into a new snapshot, evicting old ones if needed.
+
+    Args:
+        checkout:
+            Folder where the commit is checked out, or a function that writes
+            its files into a new folder, e.g. [GitTree.write][krupy.vcs.GitTree.write].
+        commit_hash: Full hash of the commit.
+        commit: Description of the commit, as given by `git describe`.
+        version: PEP 440 version of the commit, if any.
+    """
+    root = cache_dir() / "snapshots"
+    root.mkdir(parents=True, exist_ok=True)
+    # Copy aside, so an interrupted copy never looks like a snapshot
+    partial = Path(mkdtemp(prefix=f"{commit_hash}.", dir=root))
+    try:
+        if callable(checkout):
+            checkout(partial / "tree")
+        else:
+            shutil.copytree(
+                checkout,
+                partial / "tree",
+                symlinks=True,
+                ignore=shutil.ignore_patterns(".git"),
+            )
+        snapshot = Snapshot(
+            commit_hash, commit, version, _folder_size(partial / "tree")
+        )
+        (partial / "snapshot.json").write_text(json.dumps(asdict(snapshot)))
+        try:
+            partial.rename(snapshot.path)
+        except OSError:
+            # Another process stored the same commit meanwhile
+            if _read_snapshot(snapshot.path) is None:
+                raise
+    finally:
+        shutil.rmtree(partial, ignore_errors=True)
+    prune()
+    return snapshot
+
+
+def _link_or_copy(src: str, dst: str) -> None:
+    """Hard-link a file, or copy it where hard links aren't supported."""
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+def link_snapshot(snapshot: Snapshot, destination: Path) -> None:
+    """Make the files of a snapshot available in a folder.
+
+    Files are hard-linked, so they must never be modified in place.
+
+    Args:
+        snapshot: What to link.
+        destination: Where to link it. It can exist already, if empty.
+    """
+    shutil.copytree(
+        snapshot.tree,
+        destination,
+        symlinks=True,
+        copy_function=_link_or_copy,
+        dirs_exist_ok=True,
+    )
+
+
+def snapshots() -> List[Snapshot]:
+    """Get all snapshots in the cache, the least recently used first."""
+    root = cache_dir() / "snapshots"
+    found = filter(None, map(_read_snapshot, root.iterdir() if root.is_dir() else ()))
+    return sorted(found, key=lambda snapshot: snapshot.last_used)
+
+
+def _folder_size(path: Path) -> int:
+    """Get the bytes taken by all files in a folder."""
+    return sum(
+        entry.lstat().st_size
+        for entry in path.rglob("*")
+        if not entry.is_dir() or entry.is_symlink()
+    )
+
+
+def entries() -> List[Entry]:
+    """Get all mirrors and snapshots in the cache, the least recently used first."""
+    found = [
+        Entry("snapshot", snapshot.path, snapshot.size, snapshot.last_used)
+        for snapshot in snapshots()
+    ]
+    for path in (cache_dir() / "mirrors").glob("*.git"):
+        with suppress(OSError):
+            found.append(
+                Entry("mirror", path, _folder_size(path), path.stat().st_mtime)
+            )
+    return sorted(found, key=lambda entry: entry.last_used)
+
+
+def record(kind: str, hit: bool) -> None:
+    """Record a lookup in the cache, to compute its hit ratio.
+
+    Records are appended to the `stats.jsonl` file in the cache, one JSON
+    object per line with the `time` of the lookup, the `kind` of entry looked
+    up and whether it was a `hit`.
+
+    Args:
+        kind: `mirror` or `snapshot`.
+        hit: Indicate if the entry was usable without downloading or cloning.
+    """
+    path = cache_dir() / "stats.jsonl"
+    with suppress(OSError), lock("stats"), path.open("a") as stats:
+        stats.write(json.dumps({"time": time.time(), "kind": kind, "hit": hit}))
+        stats.write("\n")
+
+
+def _records() -> List[AnyByStrDict]:
+    """Read all lookups recorded in the cache."""
+    try:
+        lines = (cache_dir() / "stats.jsonl").read_text().splitlines()
+    except OSError:
+        return []
+    result = []
+    for line in lines:
+        # A line may be incomplete if a process was killed while writing it
+        with suppress(ValueError):
+            result.append(json.loads(line))
+    return result
+
+
+def hit_ratios() -> Dict[str, Tuple[int, int]]:
+    """Get the recorded lookups of each kind of entry.
+
+    Returns:
+        The hits and the total lookups, by kind of entry.
+    """
+    result: Dict[str, Tuple[int, int]] = {}
+    for item in _records():
+        hits, total = result.get(item["kind"], (0, 0))
+        result[item["kind"]] = hits + bool(item["hit"]), total + 1
+    return result
+
+
+def size_limit() -> int:
+    """Get the bytes the cache can take, from `$KRUPY_CACHE_MAX_SIZE` in MiB."""
+    if os.environ.get(MAX_SIZE_ENV):
+        return int(float(os.environ[MAX_SIZE_ENV]) * 1024**2)
+    return DEFAULT_MAX_SIZE
+
+
+def age_limit() -> float:
+    """Get the seconds an entry can go unused, from `$KRUPY_CACHE_MAX_AGE` in days."""
+    if os.environ.get(MAX_AGE_ENV):
+        return float(os.environ[MAX_AGE_ENV]) * 24 * 3600
+    return DEFAULT_MAX_AGE
+
+
+def prune(
+    max_size: Optional[int] = None, max_age: Optional[float] = None
+) -> List[Entry]:
+    """Evict entries unused for too long, and the least recently used ones.
+
+    Files linked from evicted snapshots are still usable, as they're hard links.
+    Lookups recorded before the oldest age allowed are forgotten too.
+
+    Args:
+        max_size:
+            Bytes the remaining entries can take, at most. Defaults to
+            [size_limit][krupy.cache.size_limit].
+        max_age:
+            Seconds an entry can go unused. Defaults to
+            [age_limit][krupy.cache.age_limit].
+
+    Returns:
+        The evicted entries.
+    """
+    if max_size is None:
+        max_size = size_limit()
+    oldest = time.time() - (age_limit() if max_age is None else max_age)
+    remaining = entries()
+    total = sum(entry.size for entry in remaining)
+    evicted = []
+    for entry in remaining:
+        if total <= max_size and entry.last_used >= oldest:
+            break
+        with lock(entry.path.name, blocking=False) as locked:
+            # Entries in use by other processes are kept
+            if not locked:
+                continue
+            shutil.rmtree(entry.path, ignore_errors=True)
+        total -= entry.size
+        evicted.append(entry)
+    gone = {entry.path.name for entry in evicted if entry.kind == "snapshot"}
+    refs = cache_dir() / "refs"
+    for path in refs.iterdir() if gone and refs.is_dir() else ():
+        with suppress(OSError):
+            if path.read_text().strip() in gone:
+                path.unlink()
+    with lock("stats"):
+        records = _records()
+        if records and records[0]["time"] < oldest:
+            _write_records([item for item in records if item["time"] >= oldest])
+    return evicted
+
+
+def _write_records(records: List[AnyByStrDict]) -> None:
+    """Replace all lookups recorded in the cache."""
+    path = cache_dir() / "stats.jsonl"
+    partial = path.with_name(f"{path.name}.{os.getpid()}")
+    partial.write_text("".join(f"{json.dumps(item)}\n" for item in records))
+    partial.replace(path)
+
+
+def clear() -> int:
+    """Remove everything in the cache.
+
+    Returns:
+        The bytes that were freed.
+    """
+    root = cache_dir()
+    if not root.is_dir():
+        return 0
+    size = _folder_size(root)
+    for path in root.iterdir():
+        # Other processes may be waiting for their locks
+        if path.name == "locks":
+            continue
+        if path.is_dir() and not path.is_symlink():
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            path.unlink()
+    return size
+
+
+def _format_age(seconds: float) -> str:
+    """Format an amount of seconds for humans, e.g. `3d`."""
+    for unit, length in (("d", 24 * 3600), ("h", 3600), ("m", 60)):
+        if seconds >= length:
+            return f"{seconds // length:.0f}{unit}"
+    return f"{seconds:.0f}s"
+
+
+def info_table() -> str:
+    """Format what the cache holds, and how often it was useful, in tables."""
+    found = entries()
+    now = time.time()
+    lines = [f"Cache in {cache_dir()}", ""]
+    lines.append(f"  {'kind':<9}  {'entries':>7}  {'size':>10}  {'hit ratio':>16}")
+    ratios = hit_ratios()
+    for kind in ("mirror", "snapshot"):
+        of_kind = [entry for entry in found if entry.kind == kind]
+        hits, total = ratios.get(kind, (0, 0))
+        ratio = f"{hits / total:.0%} of {total}" if total else "-"
+        lines.append(
+            f"  {kind:<9}  {len(of_kind):>7}"
+            f"  {format_size(sum(entry.size for entry in of_kind)):>10}  {ratio:>16}"
+        )
+    lines += ["", "Entries, the least recently used first:"]
+    lines.append(f"  {'kind':<9}  {'size':>10}  {'unused':>6}  name")
+    for entry in found:
+        lines.append(
+            f"  {entry.kind:<9}  {format_size(entry.size):>10}"
+            f"  {_format_age(now - entry.last_used):>6}  {entry.path.name}"
+        )
+    return "\n".join(lines)
@@ -1,7 +1,7 @@
 """
 Command line entrypoint. This module declares the Krupy CLI applications.
 
-Basically, there are 3 different commands you can run:
+Basically, these are the commands you can run:
 
 -   [`krupy`][krupy.cli.KrupyApp], the main app, which is a shortcut for the
     `copy` and `update` subapps.
@@ -40,6 +40,52 @@ Basically, there are 3 different commands you can run:
         krupy update
         ```
 
+-   [`krupy batch`][krupy.cli.KrupyBatchSubApp] to generate many projects at
+    once, from a manifest file.
+
+    !!! example
+
+        ```sh
+        krupy batch --jobs 4 manifest.yml
+        ```
+
+-   [`krupy profile`][krupy.cli.KrupyProfileSubApp] to find which files and
+    filters of a template are slow to render.
+
+    !!! example
+
+        ```sh
+        krupy profile --filters path/to/template
+        ```
+
+-   [`krupy stats`][krupy.cli.KrupyStatsSubApp] to describe the shape and
+    estimated render cost of a template, without rendering it.
+
+    !!! example
+
+        ```sh
+        krupy stats --format json path/to/template
+        ```
+
+-   [`krupy serve`][krupy.cli.KrupyServeSubApp] to start a server that keeps
+    templates ready in memory and renders them on request.
+
+    !!! example
+
+        ```sh
+        krupy serve --socket /tmp/krupy.sock
+        ```
+
+-   [`krupy cache`][krupy.cli.KrupyCacheSubApp] to manage the cache of
+    remote templates.
+
+    !!! example
+
+        ```sh
+        krupy cache info
+        krupy cache prune --max-size 500 --max-age 7
+        ```
+
 Below are the docs of each one of those.
 
 CLI help generated from `krupy --help-all`:
@@ -49,20 +95,31 @@ krupy --help-all
 ```
 """
 
+import json
+import os
 import sys
+from functools import cached_property
 from os import PathLike
 from pathlib import Path
 from textwrap import dedent
+from typing import TYPE_CHECKING, List, Optional
 
 import yaml
 from decorator import decorator
 from plumbum import cli, colors
 
+from .cache import OFFLINE_ENV, clear, info_table, prune
 from .errors import UnsafeTemplateError, UserMessageError
-from .main import Worker
-from .tools import krupy_version
+from .events import EventSink, JsonLinesWriter, MemoryProfile, Timings, TraceWriter
+from .profiler import DEFAULT_TOP
+from .server import DEFAULT_MAX_BYTES, DEFAULT_MAX_TEMPLATES
+from .tools import format_size, krupy_version
 from .types import AnyByStrDict, OptStr, StrSeq
 
+# Subcommands import what they run, so `krupy --version` or `--help` are fast
+if TYPE_CHECKING:
+    from .main import Worker
+
 
 @decorator
 def handle_exceptions(method, *args, **kwargs):
@@ -106,21 +163,13 @@ class KrupyApp(cli.Application):
     CALL_MAIN_IF_NESTED_COMMAND = False
 
 
-class _Subcommand(cli.Application):
-    """Base class for Krupy subcommands."""
+class _TemplateSubcommand(cli.Application):
+    """Base class for Krupy subcommands that use a template."""
 
     def __init__(self, executable: PathLike) -> None:
         self.data: AnyByStrDict = {}
         super().__init__(executable)
 
-    answers_file = cli.SwitchAttr(
-        ["-a", "--answers-file"],
-        default=None,
-        help=(
-            "Update using this path (relative to `destination_path`) "
-            "to find the answers file"
-        ),
-    )
     exclude = cli.SwitchAttr(
         ["-x", "--exclude"],
         str,
@@ -140,14 +189,6 @@ class _Subcommand(cli.Application):
             "the latest version, use `--vcs-ref=HEAD`."
         ),
     )
-    pretend = cli.Flag(["-n", "--pretend"], help="Run but do not make any changes")
-    skip = cli.SwitchAttr(
-        ["-s", "--skip"],
-        str,
-        list=True,
-        help="Skip specified files if they exist already",
-    )
-    quiet = cli.Flag(["-q", "--quiet"], help="Suppress status output")
     prereleases = cli.Flag(
         ["-g", "--prereleases"],
         help="Use prereleases to compare template VCS tags.",
@@ -196,7 +237,104 @@ class _Subcommand(cli.Application):
         }
         self.data.update(updates_without_cli_overrides)
 
-    def _worker(self, src_path: OptStr = None, dst_path: str = ".", **kwargs) -> Worker:
+    @cli.switch(
+        ["--offline"],
+        help="Use remote templates only from the cache; never download them",
+    )
+    def offline_switch(self) -> None:
+        """Enable [offline mode][krupy.cache.is_offline]."""
+        os.environ[OFFLINE_ENV] = "1"
+
+
+class _DestinationSubcommand(_TemplateSubcommand):
+    """Base class for Krupy subcommands that write subprojects."""
+
+    answers_file = cli.SwitchAttr(
+        ["-a", "--answers-file"],
+        default=None,
+        help=(
+            "Update using this path (relative to `destination_path`) "
+            "to find the answers file"
+        ),
+    )
+    pretend = cli.Flag(["-n", "--pretend"], help="Run but do not make any changes")
+    skip = cli.SwitchAttr(
+        ["-s", "--skip"],
+        str,
+        list=True,
+        help="Skip specified files if they exist already",
+    )
+    quiet = cli.Flag(["-q", "--quiet"], help="Suppress status output")
+    log_file = cli.SwitchAttr(
+        ["--log-file"],
+        str,
+        default=None,
+        help="Append one JSON object per event to this file",
+    )
+
+
+class _Subcommand(_DestinationSubcommand):
+    """Base class for Krupy subcommands that work on one subproject."""
+
+    summary = cli.Flag(
+        ["--summary"],
+        help="Count files that were already identical, instead of listing them",
+    )
+    log_format = cli.SwitchAttr(
+        ["--log-format"],
+        cli.Set("text", "jsonl"),
+        default="text",
+        help=(
+            "Format of status output: human-readable text, or one JSON object "
+            "per event"
+        ),
+    )
+    timings = cli.Flag(
+        ["--timings"],
+        help="Print how long each phase took, and how many times, at the end",
+    )
+    trace = cli.SwitchAttr(
+        ["--trace"],
+        str,
+        default=None,
+        help="Record a trace of the work in this file, loadable in Perfetto",
+    )
+    memory_profile = cli.Flag(
+        ["--memory-profile"],
+        help=(
+            "Trace memory allocations, and print the peak, top allocation sites "
+            "and largest rendered files at the end; slow"
+        ),
+    )
+
+    @cached_property
+    def _timings(self) -> Timings:
+        return Timings()
+
+    @cached_property
+    def _trace(self) -> Optional[TraceWriter]:
+        if not self.trace:
+            return None
+        return TraceWriter(open(self.trace, "w"))
+
+    @cached_property
+    def _memory_profile(self) -> MemoryProfile:
+        return MemoryProfile()
+
+    def cleanup(self, retcode: int) -> None:
+        """Print timings and memory profile, and finish the trace, if requested."""
+        if self.timings:
+            print(self._timings.table(), file=sys.stderr)
+        if self.memory_profile:
+            self._memory_profile.stop()
+            print(self._memory_profile.report(), file=sys.stderr)
+        if self._trace:
+            self._trace.close()
+            self._trace.file_.close()
+
+    def _worker(
+        self, src_path: OptStr = None, dst_path: str = ".", **kwargs
+    ) -> "Worker":
         """
         Run Krupy's internal API using CLI switches.
 
@@ -205,6 +343,23 @@ class _Subcommand(cli.Application):
             dst_path: The path to generate the project to.
             **kwargs: Arguments passed to [Worker][krupy.main.Worker].
         """
+        from .main import Worker
+
+        quiet = self.quiet
+        sinks: List[EventSink] = []
+        if self.log_format == "jsonl" and not quiet:
+            # Machine-readable output replaces the human-readable one
+            sinks.append(JsonLinesWriter(sys.stderr))
+            quiet = True
+        if self.timings:
+            sinks.append(self._timings)
+        if self._trace:
+            sinks.append(self._trace)
+        if self.memory_profile:
+            self._memory_profile.start()
+            sinks.append(self._memory_profile)
+        if sinks:
+            kwargs["event_sinks"] = (*kwargs.get("event_sinks", ()), *sinks)
         return Worker(
             data=self.data,
             dst_path=Path(dst_path),
@@ -212,7 +367,9 @@ class _Subcommand(cli.Application):
             exclude=self.exclude,
             pretend=self.pretend,
             skip_if_exists=self.skip,
-            quiet=self.quiet,
+            quiet=quiet,
+            summary=self.summary,
+            log_file=Path(self.log_file) if self.log_file else None,
             src_path=src_path,
             vcs_ref=self.vcs_ref,
             use_prereleases=self.prereleases,
@@ -248,11 +405,20 @@ class KrupyCopySubApp(_Subcommand):
         ["-w", "--overwrite"],
         help="Overwrite files that already exist, without asking.",
     )
+    watch = cli.Flag(
+        ["-W", "--watch"],
+        help=(
+            "Keep watching a local template, and render again whatever changes. "
+            "Implies `--overwrite`, and `--vcs-ref=HEAD` if no ref is given."
+        ),
+    )
 
     @handle_exceptions
     def main(self, template_src: str, destination_path: str) -> int:
         """Call [run_copy][krupy.main.Worker.run_copy].
 
+        With `--watch`, use a [Watcher][krupy.watch.Watcher] instead.
+
         Params:
             template_src:
                 Indicate where to get the template from.
@@ -262,14 +428,22 @@ class KrupyCopySubApp(_Subcommand):
             destination_path:
                 Where to generate the new subproject. It must not exist or be empty.
         """
+        if self.watch and self.vcs_ref is None:
+            # Watch the working tree, not the latest tag
+            self.vcs_ref = "HEAD"
         with self._worker(
             template_src,
             destination_path,
             cleanup_on_error=self.cleanup_on_error,
             defaults=self.force or self.defaults,
-            overwrite=self.force or self.overwrite,
+            overwrite=self.force or self.overwrite or self.watch,
         ) as worker:
-            worker.run_copy()
+            if self.watch:
+                from .watch import Watcher
+
+                Watcher(worker).run()
+            else:
+                worker.run_copy()
         return 0
 
 
@@ -411,3 +585,361 @@ class KrupyUpdateSubApp(_Subcommand):
         ) as worker:
             worker.run_update()
         return 0
+
+
+@KrupyApp.subcommand("batch")
+class KrupyBatchSubApp(_DestinationSubcommand):
+    """The `krupy batch` subcommand.
+
+    Use this subcommand to generate many subprojects at once, from a manifest
+    file that lists them.
+    """
+
+    DESCRIPTION = "Copy many subprojects, as listed in a manifest file"
+    DESCRIPTION_MORE = dedent(
+        """\
+        The manifest can be a YAML file with a list of jobs, each one with
+        `template`, `destination` and, optionally, `ref` and `data` keys. It
+        can also be a CSV file with `template`, `ref` and `destination`
+        columns; any other column is used as data for the template.
+
+        Jobs never ask questions, so default answers are used when data is
+        missing. Options apply to all jobs; `--vcs-ref` is used for jobs
+        without a `ref`, and `--data` for missing data keys.
+
+        A failing job doesn't stop the others. A table with the result of each
+        job is printed at the end.
+        """
+    )
+
+    jobs = cli.SwitchAttr(
+        ["-j", "--jobs"],
+        cli.Range(1, 1024),
+        default=os.cpu_count() or 1,
+        help="How many subprojects to generate at once",
+    )
+    overwrite = cli.Flag(
+        ["-w", "--overwrite"],
+        help="Overwrite files that already exist, without asking.",
+    )
+
+    @handle_exceptions
+    def main(self, manifest: cli.ExistingFile) -> int:
+        """Call [run_batch][krupy.batch.run_batch].
+
+        Params:
+            manifest:
+                Path to the YAML or CSV file listing the jobs.
+        """
+        from .batch import format_results, load_manifest, run_batch
+
+        jobs = load_manifest(manifest)
+        for job in jobs:
+            job.ref = job.ref or self.vcs_ref
+            job.data = {**self.data, **job.data}
+        results = run_batch(
+            jobs,
+            processes=self.jobs,
+            answers_file=self.answers_file,
+            exclude=self.exclude,
+            log_file=Path(self.log_file) if self.log_file else None,
+            overwrite=self.overwrite,
+            pretend=self.pretend,
+            quiet=True,
+            skip_if_exists=self.skip,
+            unsafe=self.unsafe,
+            use_prereleases=self.prereleases,
+        )
+        if not self.quiet:
+            print(format_results(results))
+        return 0 if all(result.ok for result in results) else 1
+
+
+@KrupyApp.subcommand("profile")
+class KrupyProfileSubApp(_TemplateSubcommand):
+    """The `krupy profile` subcommand.
+
+    Use this subcommand to find out which files and filters of a template are
+    slow to render.
+    """
+
+    DESCRIPTION = "Measure the cost of rendering each file of a template"
+    DESCRIPTION_MORE = dedent(
+        """\
+        The template is rendered into a temporary folder, with default answers
+        unless `--data` is given. Tasks and migrations are not run.
+
+        The most expensive files are listed with their wall time, CPU time and
+        rendered size. With `--filters`, calls to each Jinja filter are counted
+        and timed too.
+        """
+    )
+
+    top = cli.SwitchAttr(
+        ["--top"],
+        cli.Range(1, 1000000),
+        default=DEFAULT_TOP,
+        help="How many files and filters to list",
+    )
+    filters = cli.Flag(
+        ["--filters"],
+        help="Count and time calls to each Jinja filter",
+    )
+
+    @handle_exceptions
+    def main(self, template_src: str) -> int:
+        """Call [profile_template][krupy.profiler.profile_template].
+
+        Params:
+            template_src:
+                Indicate where to get the template from.
+
+                This can be a git URL or a local path.
+        """
+        from .profiler import profile_template
+
+        profile = profile_template(
+            template_src,
+            filters=self.filters,
+            data=self.data,
+            exclude=self.exclude,
+            unsafe=self.unsafe,
+            use_prereleases=self.prereleases,
+            vcs_ref=self.vcs_ref,
+        )
+        print(profile.table(self.top))
+        return 0
+
+
+@KrupyApp.subcommand("stats")
+class KrupyStatsSubApp(_TemplateSubcommand):
+    """The `krupy stats` subcommand.
+
+    Use this subcommand to know the cost profile of a template before using
+    it widely.
+    """
+
+    DESCRIPTION = "Describe the shape and estimated render cost of a template"
+    DESCRIPTION_MORE = dedent(
+        """\
+        The template is walked as a copy would walk it, with default answers
+        unless `--data` is given, but nothing is rendered and tasks are not run.
+
+        It reports how many files and folders it has, how many are templated,
+        their sizes, templated paths, exclusions and questions, the variables
+        each file uses and the Jinja nodes it has, as an estimate of its render
+        work.
+        """
+    )
+
+    top = cli.SwitchAttr(
+        ["--top"],
+        cli.Range(1, 1000000),
+        default=DEFAULT_TOP,
+        help="How many files to list in each table",
+    )
+    format = cli.SwitchAttr(
+        ["--format"],
+        cli.Set("table", "json"),
+        default="table",
+        help="Print tables, or all stats as JSON",
+    )
+
+    @handle_exceptions
+    def main(self, template_src: str) -> int:
+        """Call [template_stats][krupy.stats.template_stats].
+
+        Params:
+            template_src:
+                Indicate where to get the template from.
+
+                This can be a git URL or a local path.
+        """
+        from .stats import template_stats
+
+        stats = template_stats(
+            template_src,
+            data=self.data,
+            exclude=self.exclude,
+            unsafe=self.unsafe,
+            use_prereleases=self.prereleases,
+            vcs_ref=self.vcs_ref,
+        )
+        if self.format == "json":
+            print(json.dumps(stats.to_dict(), indent=2))
+        else:
+            print(stats.table(self.top))
+        return 0
+
+
+@KrupyApp.subcommand("serve")
+class KrupyServeSubApp(cli.Application):
+    """The `krupy serve` subcommand.
+
+    Use this subcommand to start a long-lived render server. See
+    [krupy.server][] for the protocol it talks.
+    """
+
+    DESCRIPTION = "Serve render requests, keeping templates ready in memory"
+    DESCRIPTION_MORE = dedent(
+        """\
+        Clients send JSON requests to copy, plan or update subprojects through
+        a Unix socket or a localhost TCP port, one per line, and receive a
+        stream of JSON events for each one.
+
+        Prepared templates are kept in memory and reused by later requests,
+        until the cache limits are exceeded.
+        """
+    )
+
+    socket = cli.SwitchAttr(
+        ["-S", "--socket"],
+        str,
+        excludes=["--port"],
+        help="Listen on this Unix socket path",
+    )
+    port = cli.SwitchAttr(
+        ["-p", "--port"],
+        cli.Range(0, 65535),
+        excludes=["--socket"],
+        help="Listen on this localhost TCP port; use 0 to pick a free one",
+    )
+    max_templates = cli.SwitchAttr(
+        ["--max-templates"],
+        cli.Range(1, 100000),
+        default=DEFAULT_MAX_TEMPLATES,
+        help="How many prepared templates to keep in memory, at most",
+    )
+    max_memory = cli.SwitchAttr(
+        ["--max-memory"],
+        cli.Range(1, 1024**2),
+        default=DEFAULT_MAX_BYTES // 1024**2,
+        help="Maximum estimated size of templates kept in memory, in MiB",
+    )
+    unsafe = cli.Flag(
+        ["--UNSAFE", "--trust"],
+        help=(
+            "Let requests allow templates with unsafe features (Jinja extensions, "
+            "migrations, tasks); any client could then run commands"
+        ),
+    )
+
+    @handle_exceptions
+    def main(self) -> int:
+        """Call [serve][krupy.server.serve]."""
+        from .server import serve
+
+        if self.socket is None and self.port is None:
+            raise UserMessageError("Specify either `--socket` or `--port`.")
+        address = self.socket if self.socket is not None else ("127.0.0.1", self.port)
+        try:
+            serve(
+                address,
+                max_templates=self.max_templates,
+                max_bytes=self.max_memory * 1024**2,
+                on_ready=lambda bound: print(
+                    f"Serving on {bound}", file=sys.stderr, flush=True
+                ),
+                unsafe=self.unsafe,
+            )
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+
+@KrupyApp.subcommand("cache")
+class KrupyCacheSubApp(cli.Application):
+    """The `krupy cache` subcommand.
+
+    Use its subcommands to manage the cache of remote templates. See
+    [krupy.cache][] for what it holds.
+    """
+
+    DESCRIPTION = "Manage the cache of remote templates"
+    CALL_MAIN_IF_NESTED_COMMAND = False
+
+    def main(self) -> int:
+        """Show help, as a subcommand is needed."""
+        self.help()
+        return 1
+
+
+@KrupyCacheSubApp.subcommand("info")
+class KrupyCacheInfoSubApp(cli.Application):
+    """The `krupy cache info` subcommand.
+
+    Use this subcommand to know what the cache holds, and how useful it is.
+    """
+
+    DESCRIPTION = "Show the size, hit ratios and entries of the cache"
+    DESCRIPTION_MORE = dedent(
+        """\
+        Hit ratios count lookups that needed no download or clone. Each lookup
+        is also recorded in the `stats.jsonl` file of the cache, to graph them
+        over time.
+        """
+    )
+
+    @handle_exceptions
+    def main(self) -> int:
+        """Call [info_table][krupy.cache.info_table]."""
+        print(info_table())
+        return 0
+
+
+@KrupyCacheSubApp.subcommand("prune")
+class KrupyCachePruneSubApp(cli.Application):
+    """The `krupy cache prune` subcommand.
+
+    Use this subcommand to make room in the cache.
+    """
+
+    DESCRIPTION = "Evict old and least recently used entries from the cache"
+    DESCRIPTION_MORE = dedent(
+        """\
+        Entries unused for longer than the maximum age are evicted, and then
+        the least recently used ones until the rest fit in the maximum size.
+        Projects being generated from them at the same time are not affected.
+
+        Defaults come from the `KRUPY_CACHE_MAX_SIZE` and `KRUPY_CACHE_MAX_AGE`
+        environment variables, which also limit the cache automatically.
+        """
+    )
+
+    max_size = cli.SwitchAttr(
+        ["--max-size"],
+        cli.Range(0, 1024**3),
+        help="Maximum size of the entries kept, in MiB",
+    )
+    max_age = cli.SwitchAttr(
+        ["--max-age"],
+        cli.Range(0, 100000),
+        help="Maximum days an entry can go unused",
+    )
+
+    @handle_exceptions
+    def main(self) -> int:
+        """Call [prune][krupy.cache.prune]."""
+        evicted = prune(
+            None if self.max_size is None else self.max_size * 1024**2,
+            None if self.max_age is None else self.max_age * 24 * 3600,
+        )
+        freed = sum(entry.size for entry in evicted)
+        print(f"Evicted {len(evicted)} entries, freeing {format_size(freed)}")
+        return 0
+
+
+@KrupyCacheSubApp.subcommand("clear")
+class KrupyCacheClearSubApp(cli.Application):
+    """The `krupy cache clear` subcommand.
+
+    Use this subcommand to empty the cache.
+    """
+
+    DESCRIPTION = "Remove everything in the cache"
+
+    @handle_exceptions
+    def main(self) -> int:
+        """Call [clear][krupy.cache.clear]."""
+        print(f"Freed {format_size(clear())}")
+        return 0
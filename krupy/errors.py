@@ -24,6 +24,10 @@ class UnsupportedVersionError(UserMessageError):
     """Krupy version does not support template version."""
 
 
+class OfflineError(UserMessageError):
+    """A template isn't in the cache, and it can't be downloaded offline."""
+
+
 class ConfigFileError(ValueError, KrupyError):
     """Parent class defining problems with the config file."""
 
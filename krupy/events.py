@@ -0,0 +1,749 @@
+"""Events emitted while Krupy works, to observe its progress.
+
+Pass callables to [event_sinks][krupy.main.Worker.event_sinks], and they
+will be called with each event, in the order things happen:
+
+```python
+from krupy import run_copy
+from krupy.events import FileWritten
+
+written = []
+
+
+def sink(event):
+    if isinstance(event, FileWritten):
+        written.append(event.size)
+
+
+run_copy("gh:Krunal-Kevadiya/krupytest", "output", event_sinks=[sink])
+print(f"{len(written)} files, {sum(written)} bytes")
+```
+
+Sinks run synchronously, in the thread that produced the event, so they
+should be fast. If a sink raises an exception, the run fails with it.
+
+Krupy's own console output is just another sink, a
+[ConsolePrinter][krupy.events.ConsolePrinter], added unless [quiet][] is
+enabled.
+"""
+
+import hashlib
+import heapq
+import io
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field, fields
+from functools import cached_property
+from pathlib import Path
+from typing import (
+    Callable,
+    ClassVar,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    TextIO,
+    Tuple,
+    Type,
+    Union,
+    cast,
+)
+
+from plumbum import colors
+
+from .tools import Style, format_size, printf
+from .types import AnyByStrDict, IntSeq, OptStr
+
+
+@dataclass(frozen=True)
+class Event:
+    """Base class of all events.
+
+    Attributes:
+        kind:
+            Name of the event type, in snake case.
+        derived:
+            Properties serialized along with the fields, computed only then.
+    """
+
+    kind: ClassVar[str] = "event"
+    derived: ClassVar[Tuple[str, ...]] = ()
+
+
+@dataclass(frozen=True)
+class FilePlanned(Event):
+    """A template file, folder or symlink is going to be rendered.
+
+    Attributes:
+        src_path: Absolute path of the source within the template.
+        path: Destination path, relative to the subproject.
+    """
+
+    kind: ClassVar[str] = "file_planned"
+    src_path: Path
+    path: Path
+
+
+@dataclass(frozen=True)
+class FileRendered(Event):
+    """A file's contents were rendered in memory.
+
+    Attributes:
+        path: Destination path, relative to the subproject.
+        size: Bytes rendered.
+        duration: Seconds spent rendering, including compiling the template.
+        cpu_time: CPU seconds spent rendering, by the rendering thread.
+        content: The rendered contents; not serialized.
+    """
+
+    kind: ClassVar[str] = "file_rendered"
+    derived: ClassVar[Tuple[str, ...]] = ("sha256",)
+    path: Path
+    size: int
+    duration: float
+    cpu_time: float
+    content: bytes = field(repr=False, compare=False)
+
+    @cached_property
+    def sha256(self) -> str:
+        """Hex digest of the rendered contents, computed on first access."""
+        return hashlib.sha256(self.content).hexdigest()
+
+
+@dataclass(frozen=True)
+class FileVerdict(Event):
+    """Base class of the decisions taken for each destination path.
+
+    Attributes:
+        path: Destination path, relative to the subproject.
+    """
+
+    path: Path
+
+
+@dataclass(frozen=True)
+class FileCreated(FileVerdict):
+    """The destination path didn't exist, so it will be created."""
+
+    kind: ClassVar[str] = "file_created"
+
+
+@dataclass(frozen=True)
+class FileIdentical(FileVerdict):
+    """The destination path already has the rendered contents."""
+
+    kind: ClassVar[str] = "file_identical"
+
+
+@dataclass(frozen=True)
+class FileConflict(FileVerdict):
+    """The destination path exists with different contents."""
+
+    kind: ClassVar[str] = "file_conflict"
+
+
+@dataclass(frozen=True)
+class FileSkipped(FileVerdict):
+    """A conflicting path is kept as is, due to [skip_if_exists][]."""
+
+    kind: ClassVar[str] = "file_skipped"
+
+
+@dataclass(frozen=True)
+class FileOverwritten(FileVerdict):
+    """A conflicting path will be overwritten."""
+
+    kind: ClassVar[str] = "file_overwritten"
+
+
+@dataclass(frozen=True)
+class FileWritten(Event):
+    """A file was written to disk.
+
+    Attributes:
+        path: Destination path, relative to the subproject.
+        size: Bytes written.
+    """
+
+    kind: ClassVar[str] = "file_written"
+    path: Path
+    size: int
+
+
+@dataclass(frozen=True)
+class TaskStarted(Event):
+    """A task is going to run.
+
+    Attributes:
+        index: Position of the task, starting at 1.
+        total: Amount of tasks being run.
+        command: Rendered command; a string if it runs in a shell.
+    """
+
+    kind: ClassVar[str] = "task_started"
+    index: int
+    total: int
+    command: Union[str, Sequence[str]]
+
+
+@dataclass(frozen=True)
+class TaskFinished(Event):
+    """A task finished.
+
+    Attributes:
+        index: Position of the task, starting at 1.
+        total: Amount of tasks being run.
+        command: Rendered command; a string if it runs in a shell.
+        returncode: Exit code of the task; `None` in [pretend][] mode.
+        duration: Seconds the task took.
+    """
+
+    kind: ClassVar[str] = "task_finished"
+    index: int
+    total: int
+    command: Union[str, Sequence[str]]
+    returncode: Optional[int]
+    duration: float
+
+
+@dataclass(frozen=True)
+class CloneFinished(Event):
+    """A Git repository was cloned.
+
+    Attributes:
+        url: Cloned URL.
+        ref: Checked out reference, if any.
+        path: Where it was cloned.
+        duration: Seconds the clone took.
+    """
+
+    kind: ClassVar[str] = "clone_finished"
+    url: str
+    ref: OptStr
+    path: Path
+    duration: float
+
+
+@dataclass(frozen=True)
+class GitInvoked(Event):
+    """A Git subprocess finished.
+
+    Attributes:
+        args: Arguments passed to `git`.
+        returncode: Exit code of the process.
+        duration: Seconds the process took.
+    """
+
+    kind: ClassVar[str] = "git_invoked"
+    args: Tuple[str, ...]
+    returncode: Optional[int]
+    duration: float
+
+
+@dataclass(frozen=True)
+class PhaseFinished(Event):
+    """A phase of the work finished, successfully or not.
+
+    Phases can be nested, e.g. `clone` usually happens while loading the
+    template before `ask`, and `jinja_compile` happens while rendering.
+
+    These are the phases:
+
+    -   `copy` and `update`, for the whole work.
+    -   `clone`, `checkout_latest_tag` and `version`, to get the template;
+        `snapshot` instead of `clone` when it's linked from the
+        [cache][krupy.cache].
+    -   `config`, to load [the `krupy.yml` file][the-krupyyml-file].
+    -   `ask`, `render` and `tasks`, for each copy.
+    -   `jinja_compile`, for each Jinja template compiled.
+    -   `update_render_old`, `update_render_current` and `update_render_new`,
+        for each of the copies done when updating; `update_diff` to get the
+        changes done in the subproject; `update_apply` to apply them and
+        `update_merge` to merge what could not be applied.
+
+    Attributes:
+        name: Name of the phase.
+        duration: Seconds the phase took.
+    """
+
+    kind: ClassVar[str] = "phase_finished"
+    name: str
+    duration: float
+
+
+EventSink = Callable[[Event], None]
+
+_sinks: "ContextVar[Sequence[EventSink]]" = ContextVar("krupy_event_sinks", default=())
+_track: "ContextVar[str]" = ContextVar("krupy_event_track", default="")
+
+
+@contextmanager
+def observe(sinks: Sequence[EventSink]) -> Iterator[None]:
+    """Send events emitted within this context to the given sinks.
+
+    The context is propagated as in [contextvars][], so events emitted in
+    other threads or asyncio tasks reach the sinks only if those were started
+    with a copy of this context.
+
+    Args:
+        sinks: Callables that receive each event.
+    """
+    token = _sinks.set(tuple(sinks))
+    try:
+        yield
+    finally:
+        _sinks.reset(token)
+
+
+def observed() -> bool:
+    """Tell if any sink would receive events emitted now.
+
+    Use it to avoid building events, or measuring times, for nobody.
+    """
+    return bool(_sinks.get())
+
+
+def emit(event: Event) -> None:
+    """Send an event to the sinks observing the current context."""
+    for sink in _sinks.get():
+        sink(event)
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """Emit a [PhaseFinished][krupy.events.PhaseFinished] event when exiting.
+
+    Args:
+        name: Name of the phase.
+    """
+    if not observed():
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        emit(PhaseFinished(name, time.perf_counter() - start))
+
+
+@contextmanager
+def track(name: str) -> Iterator[None]:
+    """Tell sinks that events emitted within this context belong together.
+
+    Sinks can read it with [current_track][krupy.events.current_track], e.g.
+    to draw each track separately.
+
+    Args:
+        name: Name of the track.
+    """
+    token = _track.set(name)
+    try:
+        yield
+    finally:
+        _track.reset(token)
+
+
+def current_track() -> str:
+    """Get the name of the track of events emitted now; empty if none."""
+    return _track.get()
+
+
+def to_dict(event: Event) -> AnyByStrDict:
+    """Convert an event to a dict, with its kind under the `event` key.
+
+    Fields hidden from the event's repr are left out, and its
+    [derived][krupy.events.Event] properties are added.
+    """
+    result = {"event": event.kind, **asdict(event)}
+    for item in fields(event):
+        if not item.repr:
+            del result[item.name]
+    for name in event.derived:
+        result[name] = getattr(event, name)
+    return result
+
+
+_VERDICT_STYLES: Dict[Type[Event], Tuple[str, IntSeq]] = {
+    FileCreated: ("create", Style.OK),
+    FileIdentical: ("identical", Style.IGNORE),
+    FileConflict: ("conflict", Style.DANGER),
+    FileSkipped: ("skip", Style.OK),
+    FileOverwritten: ("overwrite", Style.WARNING),
+}
+
+
+def print_event(event: Event, file_: Optional[TextIO] = None) -> bool:
+    """Print file verdicts and tasks, as Krupy's CLI does.
+
+    Args:
+        event: The event to print.
+        file_: Where to print it; stderr by default.
+
+    Returns:
+        Whether the event was printed; other events are ignored.
+    """
+    file_ = file_ or sys.stderr
+    try:
+        action, style = _VERDICT_STYLES[type(event)]
+    except KeyError:
+        if not isinstance(event, TaskStarted):
+            return False
+        print(
+            colors.info
+            | f" > Running task {event.index} of {event.total}: {event.command}",
+            file=file_,
+        )
+        return True
+    printf(action, cast(FileVerdict, event).path, style=style, file_=file_)
+    return True
+
+
+class ConsolePrinter:
+    """Sink that prints events to stderr in batches.
+
+    Printing each line on its own is slow on some terminals and log
+    collectors, so lines are buffered and written together when there are
+    enough of them, or periodically when stderr is a terminal. Before running
+    a task, everything is flushed, so its output appears in order.
+
+    Call [flush][krupy.events.ConsolePrinter.flush] before printing anything
+    else, or asking anything to the user.
+
+    Attributes:
+        summary:
+            Collapse consecutive identical files into a single line that
+            counts them.
+
+        interval:
+            Seconds between flushes when stderr is a terminal.
+
+        batch_size:
+            Lines to buffer before flushing.
+    """
+
+    def __init__(
+        self, summary: bool = False, interval: float = 0.1, batch_size: int = 100
+    ) -> None:
+        self.summary = summary
+        self.interval = interval
+        self.batch_size = batch_size
+        self._buffer = io.StringIO()
+        self._lines = 0
+        self._identical = 0
+        self._tty = sys.stderr.isatty()
+        self._last_flush = time.monotonic()
+
+    def __call__(self, event: Event) -> None:
+        """Buffer an event, flushing if needed."""
+        if not isinstance(event, TaskStarted) and type(event) not in _VERDICT_STYLES:
+            return
+        if self.summary and isinstance(event, FileIdentical):
+            self._identical += 1
+            return
+        self._count_identical()
+        print_event(event, self._buffer)
+        self._lines += 1
+        if (
+            isinstance(event, TaskStarted)
+            or self._lines >= self.batch_size
+            or (self._tty and time.monotonic() - self._last_flush >= self.interval)
+        ):
+            self._write()
+
+    def flush(self) -> None:
+        """Print everything pending."""
+        self._count_identical()
+        self._write()
+
+    def _count_identical(self) -> None:
+        if self._identical:
+            count, self._identical = self._identical, 0
+            paths = "path" if count == 1 else "paths"
+            printf(
+                "identical",
+                f"{count} {paths}",
+                style=Style.IGNORE,
+                file_=self._buffer,
+            )
+            self._lines += 1
+
+    def _write(self) -> None:
+        text = self._buffer.getvalue()
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        self._lines = 0
+        self._last_flush = time.monotonic()
+        if text:
+            sys.stderr.write(text)
+            sys.stderr.flush()
+
+
+class JsonLinesWriter:
+    """Sink that writes each event as a line of JSON.
+
+    Each object has the fields of [to_dict][krupy.events.to_dict], plus the
+    `time` when it was written, in seconds since the epoch. Lines are flushed
+    as they are written, so nothing accumulates in memory.
+
+    Attributes:
+        file_:
+            Text stream where to write.
+    """
+
+    def __init__(self, file_: TextIO) -> None:
+        self.file_ = file_
+
+    def __call__(self, event: Event) -> None:
+        """Write an event."""
+        line = json.dumps({**to_dict(event), "time": time.time()}, default=str)
+        self.file_.write(line + "\n")
+        self.file_.flush()
+
+
+class Timings:
+    """Sink that adds up how long each phase took, and how many times.
+
+    Git subprocesses are counted by subcommand, and renders of each file
+    together. Phases can be nested, so totals overlap.
+    """
+
+    def __init__(self) -> None:
+        self.calls: Dict[str, int] = {}
+        self.totals: Dict[str, float] = {}
+
+    def __call__(self, event: Event) -> None:
+        """Count an event, if it has a duration."""
+        if isinstance(event, PhaseFinished):
+            self.add(event.name, event.duration)
+        elif isinstance(event, GitInvoked):
+            self.add(f"git {_git_subcommand(event.args)}", event.duration)
+        elif isinstance(event, FileRendered):
+            self.add("render_file", event.duration)
+
+    def add(self, name: str, duration: float) -> None:
+        """Count a call to an operation."""
+        self.calls[name] = self.calls.get(name, 0) + 1
+        self.totals[name] = self.totals.get(name, 0.0) + duration
+
+    def table(self) -> str:
+        """Format all operations in a table, the slowest first."""
+        names = sorted(self.totals, key=self.totals.__getitem__, reverse=True)
+        width = max(map(len, names), default=0)
+        lines = [f"{'operation':<{width}}  {'calls':>6}  {'total':>9}  {'mean':>9}"]
+        for name in names:
+            calls, total = self.calls[name], self.totals[name]
+            lines.append(
+                f"{name:<{width}}  {calls:>6}  {total:>8.3f}s  {total / calls:>8.3f}s"
+            )
+        return "\n".join(lines)
+
+
+class TraceWriter:
+    """Sink that records events as spans in the Chrome Trace Event format.
+
+    Open the file with [Perfetto](https://ui.perfetto.dev/) or
+    `chrome://tracing` to see phases, file renders, Git subprocesses and
+    tasks over time. Each thread gets its own track, and so does each
+    [track][krupy.events.track] within it, such as the renders done by an
+    update.
+
+    Spans are written as events arrive, so nothing accumulates in memory. Call
+    [close][krupy.events.TraceWriter.close] when done, to finish the file.
+
+    Attributes:
+        file_:
+            Text stream where to write.
+    """
+
+    def __init__(self, file_: TextIO) -> None:
+        self.file_ = file_
+        self._origin = time.perf_counter()
+        self._pid = os.getpid()
+        self._tids: Dict[Tuple[int, str], int] = {}
+        self._lock = threading.Lock()
+        self._separator = "[\n"
+
+    def __call__(self, event: Event) -> None:
+        """Write a span for an event, if it has a duration."""
+        end = time.perf_counter()
+        args: AnyByStrDict = {}
+        if isinstance(event, PhaseFinished):
+            name, cat = event.name, "phase"
+        elif isinstance(event, FileRendered):
+            name, cat = str(event.path), "render"
+            args = {"size": event.size}
+        elif isinstance(event, GitInvoked):
+            name, cat = f"git {_git_subcommand(event.args)}", "git"
+            args = {"args": event.args, "returncode": event.returncode}
+        elif isinstance(event, TaskFinished):
+            name, cat = f"task {event.index}", "task"
+            args = {"command": event.command, "returncode": event.returncode}
+        else:
+            return
+        self._write(
+            {
+                "name": name,
+                "cat": cat,
+                "ph": "X",
+                "ts": (end - event.duration - self._origin) * 1e6,
+                "dur": event.duration * 1e6,
+                "pid": self._pid,
+                "tid": self._tid(),
+                "args": args,
+            }
+        )
+
+    def close(self) -> None:
+        """Finish the trace."""
+        with self._lock:
+            self.file_.write("[]\n" if self._separator == "[\n" else "\n]\n")
+            self.file_.flush()
+
+    def _tid(self) -> int:
+        """Get the number of the current track, naming it if it's new."""
+        key = (threading.get_ident(), current_track())
+        with self._lock:
+            tid = self._tids.get(key)
+            if tid is not None:
+                return tid
+            tid = self._tids[key] = len(self._tids) + 1
+        name = " / ".join(filter(None, (threading.current_thread().name, key[1])))
+        self._write(
+            {
+                "name": "thread_name",
+                "ph": "M",
+                "pid": self._pid,
+                "tid": tid,
+                "args": {"name": name},
+            }
+        )
+        return tid
+
+    def _write(self, entry: AnyByStrDict) -> None:
+        line = json.dumps(entry, default=str)
+        with self._lock:
+            self.file_.write(self._separator + line)
+            self._separator = ",\n"
+
+
+class MemoryProfile:
+    """Sink that traces memory allocations with [tracemalloc][].
+
+    Traced memory is measured at the end of each phase, and the peak is
+    attributed to the first phase that ends after reaching it. It is also
+    measured after rendering each file, while its contents are still in
+    memory. A snapshot of allocation sites is kept for a moment when traced
+    memory was highest, give or take `step`, because taking one is slow. The
+    largest rendered files are recorded too.
+
+    Tracing memory makes Python much slower, so use it only to investigate.
+    Compiling Jinja templates is not measured, because it happens too often.
+
+    Attributes:
+        top:
+            How many allocation sites and files to report.
+        step:
+            Bytes that traced memory must grow by since the last snapshot
+            to take another one.
+    """
+
+    def __init__(self, top: int = 10, step: int = 1 << 20) -> None:
+        self.top = top
+        self.step = step
+        self.peak = 0
+        self.peak_phase = ""
+        # Traced memory at the end of each phase, and times it ended
+        self.phases: Dict[str, Tuple[int, int]] = {}
+        self._snapshot: Optional[tracemalloc.Snapshot] = None
+        self._snapshot_moment = ""
+        self._snapshot_size = 0
+        self._files: List[Tuple[int, str]] = []
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        """Start tracing memory allocations."""
+        tracemalloc.start()
+
+    def stop(self) -> None:
+        """Stop tracing memory allocations."""
+        tracemalloc.stop()
+
+    def __call__(self, event: Event) -> None:
+        """Measure memory after a phase or a file render."""
+        if isinstance(event, FileRendered):
+            with self._lock:
+                item = (event.size, str(event.path))
+                if len(self._files) < self.top:
+                    heapq.heappush(self._files, item)
+                else:
+                    heapq.heappushpop(self._files, item)
+            self._measure(f"rendering {event.path}")
+        elif isinstance(event, PhaseFinished) and event.name != "jinja_compile":
+            current = self._measure(f"the end of {event.name}")
+            with self._lock:
+                _, times = self.phases.get(event.name, (0, 0))
+                self.phases[event.name] = current, times + 1
+                peak = tracemalloc.get_traced_memory()[1]
+                if peak > self.peak:
+                    self.peak, self.peak_phase = peak, event.name
+
+    def _measure(self, moment: str) -> int:
+        """Get traced memory, taking a snapshot if it grew enough since the last."""
+        if not tracemalloc.is_tracing():
+            return 0
+        current = tracemalloc.get_traced_memory()[0]
+        with self._lock:
+            if self._snapshot_moment and current < self._snapshot_size + self.step:
+                return current
+            self._snapshot_size, self._snapshot_moment = current, moment
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            (tracemalloc.Filter(False, tracemalloc.__file__),)
+        )
+        with self._lock:
+            self._snapshot = snapshot
+        return current
+
+    def report(self) -> str:
+        """Format what was measured."""
+        lines = [
+            f"Peak traced memory: {format_size(self.peak)}, before the end of "
+            f"{self.peak_phase or 'the work'}",
+            "",
+            "Traced memory at the end of each phase:",
+        ]
+        for name, (current, times) in self.phases.items():
+            lines.append(f"  {name:<24} {format_size(current):>10}  ({times}x)")
+        if self._snapshot:
+            lines += [
+                "",
+                f"Top allocation sites, after {self._snapshot_moment}:",
+            ]
+            for stat in self._snapshot.statistics("lineno")[: self.top]:
+                frame = stat.traceback[0]
+                lines.append(
+                    f"  {format_size(stat.size):>10} in {stat.count:>6} blocks  "
+                    f"{frame.filename}:{frame.lineno}"
+                )
+        if self._files:
+            lines += ["", "Largest rendered files:"]
+            for size, path in sorted(self._files, reverse=True):
+                lines.append(f"  {format_size(size):>10}  {path}")
+        return "\n".join(lines)
+
+
+def _git_subcommand(args: Sequence[str]) -> str:
+    """Get the subcommand from the arguments passed to Git."""
+    args_iter = iter(args)
+    for arg in args_iter:
+        if arg in {"-C", "-c"}:
+            next(args_iter, None)
+        elif not arg.startswith("-"):
+            return arg
+    return ""
@@ -1,11 +1,14 @@
 """Main functions and classes, used to generate or update projects."""
 
+import contextvars
 import os
 import platform
 import subprocess
 import sys
-from contextlib import suppress
-from dataclasses import asdict, field, replace
+import time
+from contextlib import contextmanager, suppress
+from copy import deepcopy
+from dataclasses import asdict, field, fields, is_dataclass, replace
 from filecmp import dircmp
 from functools import cached_property, partial
 from itertools import chain
@@ -13,19 +16,26 @@ from pathlib import Path
 from shutil import rmtree
 from tempfile import TemporaryDirectory
 from typing import (
+    Any,
     Callable,
+    Dict,
     Iterable,
+    Iterator,
     List,
     Literal,
     Mapping,
     Optional,
     Sequence,
     Set,
+    Tuple,
+    Type,
+    TypeVar,
     Union,
     get_args,
 )
 from unicodedata import normalize
 
+from jinja2 import Template as JinjaTemplate
 from jinja2.loaders import FileSystemLoader
 from jinja2.sandbox import SandboxedEnvironment
 from pathspec import PathSpec
@@ -36,16 +46,35 @@ from pydantic import ConfigDict, PositiveInt
 from pydantic.dataclasses import dataclass
 from pydantic_core import to_jsonable_python
 
-from .questionary import unsafe_prompt
 from .errors import (
     KrupyAnswersInterrupt,
     ExtensionNotFoundError,
     UnsafeTemplateError,
     UserMessageError,
 )
+from .events import (
+    ConsolePrinter,
+    EventSink,
+    FileConflict,
+    FileCreated,
+    FileIdentical,
+    FileOverwritten,
+    FilePlanned,
+    FileRendered,
+    FileSkipped,
+    FileWritten,
+    JsonLinesWriter,
+    TaskFinished,
+    TaskStarted,
+    emit,
+    observe,
+    observed,
+    phase,
+    track,
+)
 from .subproject import Subproject
 from .template import Task, Template
-from .tools import OS, Style, printf, readlink
+from .tools import OS, readlink
 from .types import (
     MISSING,
     AnyByStrDict,
@@ -58,6 +87,27 @@ from .types import (
 from .user_data import DEFAULT_DATA, AnswersMap, Question
 from .vcs import get_git
 
+_T = TypeVar("_T")
+
+
+class _SandboxedEnvironment(SandboxedEnvironment):
+    """Sandboxed Jinja environment that reports how long compiling takes."""
+
+    def compile(self, *args, **kwargs):  # type: ignore[override]
+        with phase("jinja_compile"):
+            return super().compile(*args, **kwargs)
+
+
+def unsafe_prompt(questions: Sequence[AnyByStrDict], **kwargs) -> AnyByStrDict:
+    """Ask questions interactively, with the vendored questionary lib.
+
+    The prompt toolkit behind it is slow to import, so it's imported only
+    when a question is actually asked.
+    """
+    from .questionary import unsafe_prompt
+
+    return unsafe_prompt(questions, **kwargs)
+
 
 @dataclass(config=ConfigDict(extra="forbid"))
 class Worker:
@@ -151,6 +201,11 @@ class Worker:
 
             See [quiet][].
 
+        summary:
+            When `True`, count identical files instead of listing them.
+
+            See [summary][].
+
         conflict:
             One of "inline" (default), "rej".
 
@@ -167,6 +222,15 @@ class Worker:
             When `True`, allow usage of unsafe templates.
 
             See [unsafe][]
+
+        event_sinks:
+            Callables that receive [events][krupy.events] about the progress
+            of the work, such as each file rendered or task run.
+
+        log_file:
+            Append all [events][krupy.events] to this file, as JSON lines.
+
+            See [log_file][].
     """
 
     src_path: Optional[str] = None
@@ -183,13 +247,19 @@ class Worker:
     overwrite: bool = False
     pretend: bool = False
     quiet: bool = False
+    summary: bool = False
     conflict: Literal["inline", "rej"] = "inline"
     context_lines: PositiveInt = 3
     unsafe: bool = False
     skip_answered: bool = False
+    event_sinks: Sequence[EventSink] = ()
+    log_file: Optional[Path] = None
 
     answers: AnswersMap = field(default_factory=AnswersMap, init=False)
     _cleanup_hooks: List[Callable] = field(default_factory=list, init=False)
+    _render_context_cache: Optional[Tuple[AnswersMap, Mapping]] = field(
+        default=None, init=False
+    )
 
     def __enter__(self):
         """Allow using worker as a context manager."""
@@ -211,6 +281,44 @@ class Worker:
         for method in self._cleanup_hooks:
             method()
 
+    @cached_property
+    def _console(self) -> ConsolePrinter:
+        """Printer of file verdicts and tasks to the console."""
+        return ConsolePrinter(summary=self.summary)
+
+    @cached_property
+    def _log(self) -> Optional[JsonLinesWriter]:
+        """Writer of events to the log file, if any."""
+        if self.log_file is None:
+            return None
+        log = self.log_file.open("a", encoding="utf-8")
+        self._cleanup_hooks.append(log.close)
+        return JsonLinesWriter(log)
+
+    @property
+    def _event_sinks(self) -> Tuple[EventSink, ...]:
+        """Sinks to observe this worker, including the console unless quiet."""
+        sinks: Tuple[EventSink, ...] = tuple(self.event_sinks)
+        if self._log:
+            sinks += (self._log,)
+        if not self.quiet:
+            sinks += (self._console,)
+        return sinks
+
+    @contextmanager
+    def _observing(self) -> Iterator[None]:
+        """Send events emitted within this context to this worker's sinks."""
+        with observe(self._event_sinks):
+            try:
+                yield
+            finally:
+                self._flush_console()
+
+    def _flush_console(self) -> None:
+        """Print pending console output, before printing or asking anything."""
+        if not self.quiet:
+            self._console.flush()
+
     def _check_unsafe(self, mode: Literal["copy", "update"]) -> None:
         """Check whether a template uses unsafe features."""
         if self.unsafe:
@@ -234,6 +342,7 @@ class Worker:
 
     def _print_message(self, message: str) -> None:
         if message and not self.quiet:
+            self._flush_console()
             print(self._render_string(message), file=sys.stderr)
 
     def _answers_to_remember(self) -> Mapping:
@@ -265,30 +374,106 @@ class Worker:
             tasks: The list of tasks to run.
         """
         for i, task in enumerate(tasks):
-            task_cmd = task.cmd
-            if isinstance(task_cmd, str):
-                task_cmd = self._render_string(task_cmd)
-                use_shell = True
-            else:
-                task_cmd = [self._render_string(str(part)) for part in task_cmd]
-                use_shell = False
-            if not self.quiet:
-                print(
-                    colors.info
-                    | f" > Running task {i + 1} of {len(tasks)}: {task_cmd}",
-                    file=sys.stderr,
-                )
+            task_cmd, use_shell = self._render_task(task, i, len(tasks))
             if self.pretend:
+                emit(TaskFinished(i + 1, len(tasks), task_cmd, None, 0.0))
                 continue
-            with local.cwd(self.subproject.local_abspath), local.env(**task.extra_env):
-                subprocess.run(task_cmd, shell=use_shell, check=True, env=local.env)
+            start = time.perf_counter()
+            # Pass cwd and env explicitly instead of changing them globally,
+            # so several workers can run at once in different threads
+            retcode = subprocess.run(
+                task_cmd,
+                shell=use_shell,
+                cwd=self.subproject.local_abspath,
+                env={**local.env.getdict(), **task.extra_env},
+            ).returncode
+            self._finish_task(i, len(tasks), task_cmd, retcode, start)
+
+    async def _aexecute_tasks(self, tasks: Sequence[Task]) -> None:
+        """Run the given tasks without blocking the event loop.
+
+        Arguments:
+            tasks: The list of tasks to run.
+        """
+        # Only asyncio programs get here, and they imported it already
+        import asyncio
+
+        for i, task in enumerate(tasks):
+            task_cmd, use_shell = self._render_task(task, i, len(tasks))
+            if self.pretend:
+                emit(TaskFinished(i + 1, len(tasks), task_cmd, None, 0.0))
+                continue
+            start = time.perf_counter()
+            kwargs: AnyByStrDict = {
+                "cwd": self.subproject.local_abspath,
+                "env": {**local.env.getdict(), **task.extra_env},
+            }
+            if isinstance(task_cmd, str):
+                process = await asyncio.create_subprocess_shell(task_cmd, **kwargs)
+            else:
+                process = await asyncio.create_subprocess_exec(*task_cmd, **kwargs)
+            try:
+                retcode = await process.wait()
+            except asyncio.CancelledError:
+                with suppress(ProcessLookupError):
+                    process.kill()
+                await process.wait()
+                raise
+            self._finish_task(i, len(tasks), task_cmd, retcode, start)
+
+    def _render_task(
+        self, task: Task, index: int, total: int
+    ) -> Tuple[Union[str, List[str]], bool]:
+        """Render the command of a task, and announce it.
+
+        Returns:
+            The command, and whether it must run in a shell.
+        """
+        task_cmd: Union[str, List[str]]
+        if isinstance(task.cmd, str):
+            task_cmd = self._render_string(task.cmd)
+            use_shell = True
+        else:
+            task_cmd = [self._render_string(str(part)) for part in task.cmd]
+            use_shell = False
+        emit(TaskStarted(index + 1, total, task_cmd))
+        return task_cmd, use_shell
+
+    def _finish_task(
+        self,
+        index: int,
+        total: int,
+        task_cmd: Union[str, List[str]],
+        retcode: int,
+        start: float,
+    ) -> None:
+        """Announce a finished task, and fail if it did."""
+        duration = time.perf_counter() - start
+        emit(TaskFinished(index + 1, total, task_cmd, retcode, duration))
+        if retcode:
+            raise subprocess.CalledProcessError(retcode, task_cmd)
 
     def _render_context(self) -> Mapping:
-        """Produce render context for Jinja."""
+        """Produce render context for Jinja.
+
+        It only changes when answers change, so it's cached until then.
+        """
+        cached = self._render_context_cache
+        if cached is not None and cached[0] is self.answers:
+            return cached[1]
+        self._render_context_cache = None
         # Backwards compatibility
         # FIXME Remove it?
-        conf = asdict(self)
-        conf.pop("_cleanup_hooks")
+        # Like asdict(self), but sinks may hold resources that can't be copied
+        conf: AnyByStrDict = {}
+        for item in fields(self):
+            if item.name in {"_cleanup_hooks", "_render_context_cache", "event_sinks"}:
+                continue
+            value = getattr(self, item.name)
+            if is_dataclass(value) and not isinstance(value, type):
+                conf[item.name] = asdict(value)
+            else:
+                conf[item.name] = deepcopy(value)
         conf.update(
             {
                 "answers_file": self.answers_relpath,
@@ -299,7 +484,7 @@ class Worker:
             }
         )
 
-        return dict(
+        result = dict(
             DEFAULT_DATA,
             **self.answers.combined,
             _krupy_answers=self._answers_to_remember(),
@@ -307,6 +492,8 @@ class Worker:
             _folder_name=self.subproject.local_abspath.name,
             _krupy_python=sys.executable,
         )
+        self._render_context_cache = (self.answers, result)
+        return result
 
     def _path_matcher(self, patterns: Iterable[str]) -> Callable[[Path], bool]:
         """Produce a function that matches against specified patterns."""
@@ -321,31 +508,14 @@ class Worker:
         It can ask the user if running in interactive mode.
         """
         assert not dst_relpath.is_absolute()
-        printf(
-            "conflict",
-            dst_relpath,
-            style=Style.DANGER,
-            quiet=self.quiet,
-            file_=sys.stderr,
-        )
+        emit(FileConflict(dst_relpath))
         if self.match_skip(dst_relpath):
-            printf(
-                "skip",
-                dst_relpath,
-                style=Style.OK,
-                quiet=self.quiet,
-                file_=sys.stderr,
-            )
+            emit(FileSkipped(dst_relpath))
             return False
         if self.overwrite or dst_relpath == self.answers_relpath:
-            printf(
-                "overwrite",
-                dst_relpath,
-                style=Style.WARNING,
-                quiet=self.quiet,
-                file_=sys.stderr,
-            )
+            emit(FileOverwritten(dst_relpath))
             return True
+        self._flush_console()
         return bool(ask(f" Overwrite {dst_relpath}?", default=True))
 
     def _render_allowed(
@@ -380,13 +550,7 @@ class Worker:
             else:
                 previous_content = dst_abspath.read_bytes()
         except FileNotFoundError:
-            printf(
-                "create",
-                dst_relpath,
-                style=Style.OK,
-                quiet=self.quiet,
-                file_=sys.stderr,
-            )
+            emit(FileCreated(dst_relpath))
             return True
         except PermissionError as error:
             # HACK https://bugs.python.org/issue43095
@@ -395,13 +559,7 @@ class Worker:
         except IsADirectoryError:
             assert is_dir
         if is_dir or previous_content == expected_contents:
-            printf(
-                "identical",
-                dst_relpath,
-                style=Style.IGNORE,
-                quiet=self.quiet,
-                file_=sys.stderr,
-            )
+            emit(FileIdentical(dst_relpath))
             return True
         return self._solve_render_conflict(dst_relpath)
 
@@ -500,7 +658,7 @@ class Worker:
         # Of course we still have the post-copy tasks to worry about, but at least
         # they are more visible to the final user.
         try:
-            env = SandboxedEnvironment(
+            env = _SandboxedEnvironment(
                 loader=loader, extensions=extensions, **self.template.envops
             )
         except ModuleNotFoundError as error:
@@ -556,8 +714,11 @@ class Worker:
         src_relpath = src_abspath.relative_to(self.template.local_abspath).as_posix()
         src_renderpath = src_abspath.relative_to(self.template_copy_root)
         dst_relpath = self._render_path(src_renderpath)
-        if dst_relpath is None:
+        # Don't even render excluded files
+        if dst_relpath is None or self.match_exclude(dst_relpath):
             return
+        emit(FilePlanned(src_abspath, dst_relpath))
+        start, cpu_start = time.perf_counter(), time.thread_time()
         if src_abspath.name.endswith(self.template.templates_suffix):
             try:
                 tpl = self.jinja_env.get_template(src_relpath)
@@ -571,6 +732,14 @@ class Worker:
                 new_content = tpl.render(**self._render_context()).encode()
         else:
             new_content = src_abspath.read_bytes()
+        if observed():
+            duration = time.perf_counter() - start
+            cpu_time = time.thread_time() - cpu_start
+            emit(
+                FileRendered(
+                    dst_relpath, len(new_content), duration, cpu_time, new_content
+                )
+            )
         dst_abspath = Path(self.subproject.local_abspath, dst_relpath)
         src_mode = src_abspath.stat().st_mode
         if not self._render_allowed(dst_relpath, expected_contents=new_content):
@@ -579,6 +748,7 @@ class Worker:
             dst_abspath.parent.mkdir(parents=True, exist_ok=True)
             dst_abspath.write_bytes(new_content)
             dst_abspath.chmod(src_mode)
+            emit(FileWritten(dst_relpath, len(new_content)))
 
     def _render_symlink(self, src_abspath: Path) -> None:
         """Render one symlink.
@@ -591,8 +761,9 @@ class Worker:
         assert src_abspath.is_absolute()
         src_relpath = src_abspath.relative_to(self.template_copy_root)
         dst_relpath = self._render_path(src_relpath)
-        if dst_relpath is None:
+        if dst_relpath is None or self.match_exclude(dst_relpath):
             return
+        emit(FilePlanned(src_abspath, dst_relpath))
         dst_abspath = Path(self.subproject.local_abspath, dst_relpath)
 
         src_target = readlink(src_abspath)
@@ -632,18 +803,21 @@ class Worker:
         dst_relpath = self._render_path(src_relpath)
         if dst_relpath is None:
             return
+        if dst_relpath != Path(".") and self.match_exclude(dst_relpath):
+            return
+        emit(FilePlanned(src_abspath, dst_relpath))
         if not self._render_allowed(dst_relpath, is_dir=True):
             return
         dst_abspath = Path(self.subproject.local_abspath, dst_relpath)
         if not self.pretend:
             dst_abspath.mkdir(parents=True, exist_ok=True)
-        for file in src_abspath.iterdir():
-            if file.is_symlink() and self.template.preserve_symlinks:
-                self._render_symlink(file)
-            elif file.is_dir():
-                self._render_folder(file)
+        for entry in self.template.listdir(src_abspath):
+            if entry.is_symlink and self.template.preserve_symlinks:
+                self._render_symlink(entry.path)
+            elif entry.is_dir:
+                self._render_folder(entry.path)
             else:
-                self._render_file(file)
+                self._render_file(entry.path)
 
     def _render_path(self, relpath: Path) -> Optional[Path]:
         """Render one relative path.
@@ -657,7 +831,9 @@ class Worker:
             self.template.local_abspath / f"{relpath}{self.template.templates_suffix}"
         )
         # With an empty suffix, the templated sibling always exists.
-        if templated_sibling.exists() and self.template.templates_suffix:
+        if self.template.templates_suffix and self.template.source_exists(
+            templated_sibling
+        ):
             return None
         if self.template.templates_suffix and is_template:
             relpath = relpath.with_suffix("")
@@ -678,7 +854,7 @@ class Worker:
                 self.template.local_abspath
                 / f"{result}{self.template.templates_suffix}"
             )
-            if templated_sibling.exists():
+            if self.template.source_exists(templated_sibling):
                 return None
         return result
 
@@ -689,9 +865,17 @@ class Worker:
             string:
                 The template source string.
         """
-        tpl = self.jinja_env.from_string(string)
+        try:
+            tpl = self._string_templates[string]
+        except KeyError:
+            tpl = self._string_templates[string] = self.jinja_env.from_string(string)
         return tpl.render(**self._render_context())
 
+    @cached_property
+    def _string_templates(self) -> Dict[str, JinjaTemplate]:
+        """Cache of templated strings, compiled by [jinja_env][krupy.main.Worker.jinja_env]."""
+        return {}
+
     @cached_property
     def subproject(self) -> Subproject:
         """Get related subproject."""
@@ -736,47 +920,124 @@ class Worker:
 
         See [generating a project][generating-a-project].
         """
+        with self._observing(), phase("copy"):
+            self._prepare_copy()
+            with self._cleanup_on_error():
+                self._copy_files()
+                with phase("tasks"):
+                    self._execute_tasks(self.template.tasks)
+            self._finish_copy()
+
+    async def arun_copy(self) -> None:
+        """Like [run_copy][krupy.main.Worker.run_copy], for asyncio programs.
+
+        Resolving the template, asking and rendering happen in the default
+        executor of the running loop, and tasks run as asyncio subprocesses,
+        so the event loop is never blocked.
+
+        If cancelled, the current step finishes, running tasks are killed
+        and everything is cleaned up as if it had failed.
+        """
+        import asyncio
+
+        with self._observing(), phase("copy"):
+            await self._in_thread(self._prepare_copy)
+            with self._cleanup_on_error((Exception, asyncio.CancelledError)):
+                await self._in_thread(self._copy_files)
+                with phase("tasks"):
+                    await self._aexecute_tasks(self.template.tasks)
+            self._finish_copy()
+
+    def _prepare_copy(self) -> None:
         self._check_unsafe("copy")
         self._print_message(self.template.message_before_copy)
-        self._ask()
+        with phase("ask"):
+            self._ask()
+
+    def _copy_files(self) -> None:
+        if not self.quiet:
+            # TODO Unify printing tools
+            print(
+                f"\nCopying from template version {self.template.version}",
+                file=sys.stderr,
+            )
+        with phase("render"):
+            self._render_folder(self.template_copy_root)
+        if not self.quiet:
+            self._flush_console()
+            # TODO Unify printing tools
+            print("")  # padding space
+
+    def _finish_copy(self) -> None:
+        self._print_message(self.template.message_after_copy)
+        if not self.quiet:
+            # TODO Unify printing tools
+            print("")  # padding space
+
+    @contextmanager
+    def _cleanup_on_error(
+        self, errors: Tuple[Type[BaseException], ...] = (Exception,)
+    ) -> Iterator[None]:
+        """Remove the destination on errors, if it was created meanwhile."""
         was_existing = self.subproject.local_abspath.exists()
-        src_abspath = self.template_copy_root
         try:
-            if not self.quiet:
-                # TODO Unify printing tools
-                print(
-                    f"\nCopying from template version {self.template.version}",
-                    file=sys.stderr,
-                )
-            self._render_folder(src_abspath)
-            if not self.quiet:
-                # TODO Unify printing tools
-                print("")  # padding space
-            self._execute_tasks(self.template.tasks)
-        except Exception:
+            yield
+        except errors:
             if not was_existing and self.cleanup_on_error:
                 rmtree(self.subproject.local_abspath)
             raise
-        self._print_message(self.template.message_after_copy)
-        if not self.quiet:
-            # TODO Unify printing tools
-            print("")  # padding space
+
+    async def _in_thread(self, func: Callable[[], _T]) -> _T:
+        """Run a blocking step in the default executor of the running loop.
+
+        Threads can't be interrupted, so on cancellation this waits for the
+        step to finish before letting cleanup happen.
+
+        Args:
+            func:
+                The step to run.
+        """
+
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(None, contextvars.copy_context().run, func)
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            await asyncio.wait({future})
+            raise
 
     def run_recopy(self) -> None:
         """Update a subproject, keeping answers but discarding evolution."""
+        with self._recopy_worker() as new_worker:
+            return new_worker.run_copy()
+
+    async def arun_recopy(self) -> None:
+        """Like [run_recopy][krupy.main.Worker.run_recopy], for asyncio programs.
+
+        See [arun_copy][krupy.main.Worker.arun_copy].
+        """
+        with self._recopy_worker() as new_worker:
+            await new_worker.arun_copy()
+
+    def _recopy_worker(self) -> "Worker":
         if self.subproject.template is None:
             raise UserMessageError(
                 "Cannot recopy because cannot obtain old template references "
                 f"from `{self.subproject.answers_relpath}`."
             )
-        with replace(self, src_path=self.subproject.template.url) as new_worker:
-            return new_worker.run_copy()
+        return replace(self, src_path=self.subproject.template.url)
 
     def run_update(self) -> None:
         """Update a subproject that was already generated.
 
         See [updating a project][updating-a-project].
         """
+        with self._observing(), phase("update"):
+            self._update()
+
+    def _update(self) -> None:
         self._check_unsafe("update")
         # Check all you need is there
         if self.subproject.vcs != "git":
@@ -822,6 +1083,17 @@ class Worker:
         self._apply_update()
         self._print_message(self.template.message_after_update)
 
+    async def arun_update(self) -> None:
+        """Like [run_update][krupy.main.Worker.run_update], for asyncio programs.
+
+        The whole update runs in the default executor of the running loop.
+        Its Git commands never change the current directory, so many
+        subprojects can be updated concurrently.
+
+        If cancelled, the update finishes before cleaning up.
+        """
+        await self._in_thread(self.run_update)
+
     def _apply_update(self):
         git = get_git()
         subproject_top = Path(
@@ -838,7 +1110,7 @@ class Worker:
             prefix=f"{__name__}.old_copy."
         ) as old_copy, TemporaryDirectory(prefix=f"{__name__}.new_copy.") as new_copy:
             # Copy old template into a temporary destination
-            with replace(
+            with track("old"), phase("update_render_old"), replace(
                 self,
                 dst_path=old_copy / subproject_subdir,
                 data=self.subproject.last_answers,
@@ -849,11 +1121,12 @@ class Worker:
             ) as old_worker:
                 old_worker.run_copy()
             # Extract diff between temporary destination and real destination
-            with local.cwd(old_copy):
-                self._git_initialize_repo()
-                git("remote", "add", "real_dst", "file://" + str(subproject_top))
-                git("fetch", "--depth=1", "real_dst", "HEAD")
-                diff_cmd = git[
+            with phase("update_diff"):
+                self._git_initialize_repo(old_copy)
+                old_git = get_git(old_copy)
+                old_git("remote", "add", "real_dst", "file://" + str(subproject_top))
+                old_git("fetch", "--depth=1", "real_dst", "HEAD")
+                diff_cmd = old_git[
                     "diff-tree", f"--unified={self.context_lines}", "HEAD...FETCH_HEAD"
                 ]
                 try:
@@ -866,16 +1139,17 @@ class Worker:
                     )
                     diff = diff_cmd("--inter-hunk-context=0")
             # Run pre-migration tasks
-            self._execute_tasks(
-                self.template.migration_tasks("before", self.subproject.template)
-            )
+            with phase("tasks"):
+                self._execute_tasks(
+                    self.template.migration_tasks("before", self.subproject.template)
+                )
             # Clear last answers cache to load possible answers migration, if skip_answered flag is not set
             if self.skip_answered is False:
                 self.answers = AnswersMap()
                 with suppress(AttributeError):
                     del self.subproject.last_answers
             # Do a normal update in final destination
-            with replace(
+            with track("current"), phase("update_render_current"), replace(
                 self,
                 # Files can change due to the historical diff, and those
                 # changes are not detected in this process, so it's better to
@@ -886,7 +1160,7 @@ class Worker:
                 current_worker.run_copy()
                 self.answers = current_worker.answers
             # Render with the same answers in an empty dir to avoid pollution
-            with replace(
+            with track("new"), phase("update_render_new"), replace(
                 self,
                 dst_path=new_copy / subproject_subdir,
                 data=self.answers.combined,
@@ -897,15 +1171,21 @@ class Worker:
                 new_worker.run_copy()
             compared = dircmp(old_copy, new_copy)
             # Try to apply cached diff into final destination
-            with local.cwd(subproject_top):
-                apply_cmd = git["apply", "--reject", "--exclude", self.answers_relpath]
+            subproject_git = get_git(subproject_top)
+            with phase("update_apply"):
+                apply_cmd = subproject_git[
+                    "apply", "--reject", "--exclude", self.answers_relpath
+                ]
                 for skip_pattern in chain(
                     self.skip_if_exists, self.template.skip_if_exists
                 ):
                     apply_cmd = apply_cmd["--exclude", skip_pattern]
                 (apply_cmd << diff)(retcode=None)
-                if self.conflict == "inline":
-                    status = git("status", "--porcelain").strip().splitlines()
+            if self.conflict == "inline":
+                with phase("update_merge"):
+                    status = (
+                        subproject_git("status", "--porcelain").strip().splitlines()
+                    )
                     for line in status:
                         # Find merge rejections
                         if not (line.startswith("?? ") and line.endswith(".rej")):
@@ -913,9 +1193,9 @@ class Worker:
                         # FIXME Test with a file named '`â ñ"', see it fail, fix it
                         fname = line[3:-4]
                         # Undo possible non-rejected chunks
-                        git("checkout", "--", fname)
+                        subproject_git("checkout", "--", fname)
                         # 3-way-merge the file directly
-                        git(
+                        subproject_git(
                             "merge-file",
                             "-L",
                             "before updating",
@@ -929,18 +1209,19 @@ class Worker:
                             retcode=None,
                         )
                         # Remove rejection witness
-                        Path(f"{fname}.rej").unlink()
+                        Path(subproject_top, f"{fname}.rej").unlink()
             # Trigger recursive removal of deleted files in last template version
             _remove_old_files(subproject_top, compared)
 
         # Run post-migration tasks
-        self._execute_tasks(
-            self.template.migration_tasks("after", self.subproject.template)
-        )
+        with phase("tasks"):
+            self._execute_tasks(
+                self.template.migration_tasks("after", self.subproject.template)
+            )
 
-    def _git_initialize_repo(self):
-        """Initialize a git repository in the current directory."""
-        git = get_git()
+    def _git_initialize_repo(self, path: StrOrPath):
+        """Initialize a git repository in the given directory."""
+        git = get_git(path)
         git("init", retcode=None)
         git("add", ".")
         git("config", "user.name", "Krupy")
@@ -953,6 +1234,172 @@ class Worker:
         git("config", "--unset", "user.email")
 
 
+@dataclass(config=ConfigDict(extra="forbid"))
+class TemplateSession:
+    """A template prepared once, to be rendered many times.
+
+    Resolving a template implies cloning it, parsing its configuration and
+    building its Jinja environment. Doing it for every copy is a waste when
+    rendering the same template with different data, so this class does it
+    only once and shares the result among all renders.
+
+    Every render gets its own [Worker][krupy.main.Worker], so renders can
+    run concurrently in different threads after the session is prepared.
+
+    Example:
+        ```python
+        with TemplateSession(
+            src_path="gh:Krunal-Kevadiya/krupytest", settings={"defaults": True}
+        ) as session:
+            for name in ("foo", "bar"):
+                session.render(f"output/{name}", data={"project_name": name})
+        ```
+
+    Attributes:
+        src_path:
+            String that can be resolved to a template path, be it local or remote.
+
+            See [krupy.vcs.get_repo][].
+
+        vcs_ref:
+            Specify the VCS tag/commit to use in the template.
+
+        use_prereleases:
+            Consider prereleases when detecting the *latest* one?
+
+            See [use_prereleases][].
+
+        exclude:
+            User-chosen additional [file exclusion patterns][exclude].
+
+        settings:
+            Other [Worker][krupy.main.Worker] fields, used by default on every
+            render.
+    """
+
+    src_path: str
+    vcs_ref: OptStr = None
+    use_prereleases: bool = False
+    exclude: StrSeq = ()
+    settings: AnyByStrDict = field(default_factory=dict)
+
+    def __enter__(self):
+        """Prepare the session when used as a context manager."""
+        return self.prepare()
+
+    def __exit__(self, type, value, traceback):
+        """Clean up the template clone when the session ends."""
+        self.close()
+
+    def close(self) -> None:
+        """Remove temporary files created by the session."""
+        if "template" in self.__dict__:
+            self.template._cleanup()
+
+    def prepare(self) -> "TemplateSession":
+        """Resolve everything that doesn't depend on render data.
+
+        It's done lazily on the first render otherwise, but preparing
+        explicitly is needed before rendering from several threads at once.
+        """
+        for name in (
+            "local_abspath",
+            "config_data",
+            "questions_data",
+            "secret_questions",
+            "answers_relpath",
+            "envops",
+            "envquestions",
+            "exclude",
+            "jinja_extensions",
+            "message_before_copy",
+            "message_after_copy",
+            "metadata",
+            "preserve_symlinks",
+            "skip_if_exists",
+            "subdirectory",
+            "tasks",
+            "templates_suffix",
+            "commit_hash",
+            "version",
+        ):
+            getattr(self.template, name)
+        self._shared_state
+        return self
+
+    def render(
+        self,
+        dst_path: StrOrPath = ".",
+        data: Optional[AnyByStrDict] = None,
+        **kwargs,
+    ) -> Worker:
+        """Copy the prepared template to a destination, from zero.
+
+        This is the equivalent of [run_copy][krupy.main.Worker.run_copy].
+
+        Args:
+            dst_path:
+                Destination path where to render the subproject.
+            data:
+                Answers to the questionary defined in the template.
+            **kwargs:
+                Other [Worker][krupy.main.Worker] fields, overriding
+                [settings][krupy.main.TemplateSession.settings]. Fields that
+                define the session's template can't be overridden.
+        """
+        settings = {**self.settings, **kwargs}
+        fixed = {"src_path", "vcs_ref", "use_prereleases", "exclude"} & set(settings)
+        if fixed:
+            names = ", ".join(sorted(fixed))
+            raise TypeError(f"Session fields can't change on each render: {names}")
+        if data is not None:
+            settings["data"] = data
+        with self._worker(dst_path=Path(dst_path), **settings) as worker:
+            worker.run_copy()
+        return worker
+
+    @cached_property
+    def template(self) -> Template:
+        """Get related template."""
+        return Template(
+            url=self.src_path, ref=self.vcs_ref, use_prereleases=self.use_prereleases
+        )
+
+    @cached_property
+    def _shared_state(self) -> Mapping[str, Any]:
+        """Data-independent worker properties, shared by all renders."""
+        worker = self._worker()
+        env = worker.jinja_env
+        # Templates don't change while the session lives, so compile each one
+        # once and keep it, instead of checking for changes on every render
+        env.auto_reload = False
+        env.cache = {}
+        return {
+            "template": self.template,
+            "jinja_env": env,
+            "all_exclusions": worker.all_exclusions,
+            "match_exclude": worker.match_exclude,
+            "_string_templates": worker._string_templates,
+        }
+
+    def _worker(self, **kwargs) -> Worker:
+        """Get a worker for this session's template."""
+        worker = Worker(
+            src_path=self.src_path,
+            vcs_ref=self.vcs_ref,
+            use_prereleases=self.use_prereleases,
+            exclude=self.exclude,
+            **kwargs,
+        )
+        # Populate cached properties directly, so the template isn't resolved
+        # again, nor cleaned up when the worker finishes
+        if "_shared_state" in self.__dict__:
+            worker.__dict__.update(self._shared_state)
+        else:
+            worker.__dict__["template"] = self.template
+        return worker
+
+
 def run_copy(
     src_path: str,
     dst_path: StrOrPath = ".",
@@ -1006,6 +1453,59 @@ def run_update(
     return worker
 
 
+async def arun_copy(
+    src_path: str,
+    dst_path: StrOrPath = ".",
+    data: Optional[AnyByStrDict] = None,
+    **kwargs,
+) -> Worker:
+    """Copy a template to a destination, from zero, for asyncio programs.
+
+    This is a shortcut for [arun_copy][krupy.main.Worker.arun_copy].
+
+    See [Worker][krupy.main.Worker] fields to understand this function's args.
+    """
+    if data is not None:
+        kwargs["data"] = data
+    with Worker(src_path=src_path, dst_path=Path(dst_path), **kwargs) as worker:
+        await worker.arun_copy()
+    return worker
+
+
+async def arun_recopy(
+    dst_path: StrOrPath = ".", data: Optional[AnyByStrDict] = None, **kwargs
+) -> Worker:
+    """Update a subproject from its template, discarding subproject evolution.
+
+    This is a shortcut for [arun_recopy][krupy.main.Worker.arun_recopy].
+
+    See [Worker][krupy.main.Worker] fields to understand this function's args.
+    """
+    if data is not None:
+        kwargs["data"] = data
+    with Worker(dst_path=Path(dst_path), **kwargs) as worker:
+        await worker.arun_recopy()
+    return worker
+
+
+async def arun_update(
+    dst_path: StrOrPath = ".",
+    data: Optional[AnyByStrDict] = None,
+    **kwargs,
+) -> Worker:
+    """Update a subproject, from its template, for asyncio programs.
+
+    This is a shortcut for [arun_update][krupy.main.Worker.arun_update].
+
+    See [Worker][krupy.main.Worker] fields to understand this function's args.
+    """
+    if data is not None:
+        kwargs["data"] = data
+    with Worker(dst_path=Path(dst_path), **kwargs) as worker:
+        await worker.arun_update()
+    return worker
+
+
 def _remove_old_files(prefix: Path, cmp: dircmp, rm_common: bool = False) -> None:
     """Remove files and directories only found in "old" template.
 
@@ -0,0 +1,143 @@
+"""Find out which files and filters of a template are slow to render.
+
+The template is rendered into a temporary folder, using default answers
+unless other data is given. Tasks and migrations are never run, so profiling
+templates that have them is safe.
+
+Each file is timed while it renders, so the cost of templates it includes,
+imports or extends, and of the macros and filters it calls, is part of its
+cost. To know how much of it comes from each filter, count filter calls too:
+
+```python
+from krupy.profiler import profile_template
+
+profile = profile_template("path/to/template", filters=True)
+print(profile.table())
+```
+"""
+
+import time
+from functools import wraps
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from typing import TYPE_CHECKING, Any, Callable, Dict, Tuple
+
+from .errors import UnsafeTemplateError
+from .events import Event, FileRendered
+from .tools import format_size
+
+# The main module is imported when profiling, so the CLI starts faster
+if TYPE_CHECKING:
+    from jinja2 import Environment
+
+DEFAULT_TOP = 10
+
+
+class TemplateProfile:
+    """Sink that collects the cost of rendering each file and calling filters.
+
+    Attributes:
+        files:
+            Wall time, CPU time and bytes rendered, by destination path.
+
+        filters:
+            Calls and seconds spent, by filter name. Filters that call other
+            filters count the time of both.
+    """
+
+    def __init__(self) -> None:
+        self.files: Dict[Path, Tuple[float, float, int]] = {}
+        self.filters: Dict[str, Tuple[int, float]] = {}
+
+    def __call__(self, event: Event) -> None:
+        """Record the cost of a rendered file."""
+        if isinstance(event, FileRendered):
+            self.files[event.path] = event.duration, event.cpu_time, event.size
+
+    def count_filters(self, env: "Environment") -> None:
+        """Wrap all filters of a Jinja environment, to count their calls.
+
+        Args:
+            env: Environment whose filters will be replaced.
+        """
+        for name, func in list(env.filters.items()):
+            env.filters[name] = self._counted(name, func)
+
+    def _counted(self, name: str, func: Callable) -> Callable:
+        # Copies attributes such as `jinja_pass_arg`, so Jinja calls it alike
+        @wraps(func)
+        def _filter(*args: Any, **kwargs: Any) -> Any:
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                calls, total = self.filters.get(name, (0, 0.0))
+                self.filters[name] = calls + 1, total + time.perf_counter() - start
+
+        return _filter
+
+    def table(self, top: int = DEFAULT_TOP) -> str:
+        """Format the most expensive files and filters in tables.
+
+        Args:
+            top: How many files and filters to list.
+        """
+        files = sorted(self.files.items(), key=lambda item: item[1], reverse=True)
+        lines = [
+            f"Slowest files, out of {len(files)}:",
+            f"  {'wall':>9}  {'cpu':>9}  {'size':>10}  path",
+        ]
+        for path, (wall, cpu, size) in files[:top]:
+            lines.append(
+                f"  {wall:>8.4f}s  {cpu:>8.4f}s  {format_size(size):>10}  {path}"
+            )
+        if self.filters:
+            filters = sorted(
+                self.filters.items(), key=lambda item: item[1][1], reverse=True
+            )
+            lines += [
+                "",
+                "Slowest filters:",
+                f"  {'calls':>9}  {'total':>9}  filter",
+            ]
+            for name, (calls, total) in filters[:top]:
+                lines.append(f"  {calls:>9}  {total:>8.4f}s  {name}")
+        return "\n".join(lines)
+
+
+def profile_template(src_path: str, filters: bool = False, **kwargs) -> TemplateProfile:
+    """Render a template into a temporary folder, measuring its cost.
+
+    Args:
+        src_path:
+            String that can be resolved to a template path, be it local or remote.
+        filters:
+            Count calls to each Jinja filter too. It adds some overhead to
+            each call.
+        **kwargs:
+            Other [Worker][krupy.main.Worker] fields, such as `data` or
+            `vcs_ref`. Default answers are used for missing data.
+
+    Returns:
+        The collected costs.
+    """
+    from .main import Worker
+
+    profile = TemplateProfile()
+    settings = {"defaults": True, "quiet": True, **kwargs}
+    with TemporaryDirectory(prefix=f"{__name__}.") as dst, Worker(
+        src_path=src_path,
+        dst_path=Path(dst),
+        overwrite=True,
+        event_sinks=[profile],
+        **settings,
+    ) as worker:
+        # Tasks and migrations never run, so only extensions are unsafe
+        if worker.template.jinja_extensions and not worker.unsafe:
+            raise UnsafeTemplateError(["jinja_extensions"])
+        if filters:
+            profile.count_filters(worker.jinja_env)
+        with worker._observing():
+            worker._ask()
+            worker._render_folder(worker.template_copy_root)
+    return profile
@@ -0,0 +1,428 @@
+"""Long-lived render server, that keeps prepared templates in memory.
+
+Starting Krupy, importing its dependencies and resolving a template takes much
+longer than rendering a small template. The server pays those costs once, and
+then renders each request with a cached
+[TemplateSession][krupy.main.TemplateSession].
+
+Clients connect to a Unix socket or to a localhost TCP port and send requests
+as JSON objects, one per line. For each request, the server answers with a
+stream of JSON events, one per line, and the last one is always either
+`finished` or `error`. Several requests can be sent through the same
+connection, one after the other.
+
+A request looks like this:
+
+```json
+{
+    "id": "any value, repeated in all events",
+    "op": "copy",
+    "src_path": "gh:Krunal-Kevadiya/krupytest",
+    "vcs_ref": "v1.0.0",
+    "dst_path": "/path/to/destination",
+    "data": {"project_name": "foo"},
+    "settings": {"overwrite": true},
+    "refresh": false,
+    "events": false
+}
+```
+
+Valid operations are:
+
+-   `copy`: Equivalent to [run_copy][krupy.main.run_copy].
+-   `plan`: Like `copy`, but without writing anything; see [pretend][].
+-   `update`: Equivalent to [run_update][krupy.main.run_update]. `src_path`
+    and `vcs_ref` are optional, like in the CLI. Its templates are not cached.
+
+`settings` contains other [Worker][krupy.main.Worker] fields. Requests never
+ask questions, so [defaults][] is always enabled. Use `refresh` to discard
+the cached template and resolve it again.
+
+Enable `events` to receive progress [events][krupy.events] too, before the
+last one. Each one has its kind under the `event` key, like `file_created`,
+plus its attributes.
+
+The server doesn't authenticate clients: whoever can connect to it can read
+templates and write files anywhere the server's user can. The Unix socket is
+only accessible by that user, but any local user can connect to the TCP
+port, so prefer the socket on shared machines. Unless the server is started
+with `unsafe` enabled, requests can't enable [unsafe][] either, so templates
+with tasks, migrations or Jinja extensions are rejected, and clients can't
+run commands through them.
+"""
+
+import json
+import os
+import socket
+import socketserver
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager, suppress
+from pathlib import Path
+from time import perf_counter
+from typing import (
+    IO,
+    TYPE_CHECKING,
+    Callable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Union,
+    cast,
+)
+
+from .errors import UserMessageError
+from .events import Event, EventSink, to_dict
+from .types import AnyByStrDict, StrOrPath
+
+# The main module is imported when serving, so the CLI starts faster
+if TYPE_CHECKING:
+    from .main import TemplateSession
+
+Address = Union[str, Tuple[str, int]]
+
+DEFAULT_MAX_TEMPLATES = 16
+DEFAULT_MAX_BYTES = 512 * 1024**2
+
+
+class _CacheEntry:
+    """A prepared session, and how many requests are using it."""
+
+    def __init__(self, session: "TemplateSession", size: int) -> None:
+        self.session = session
+        self.size = size
+        self.users = 0
+        self.evicted = False
+
+
+class SessionCache:
+    """Prepared template sessions, evicted by least recent use.
+
+    Attributes:
+        max_entries:
+            Maximum amount of templates to keep.
+
+        max_bytes:
+            Maximum total estimated size of kept templates.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_MAX_TEMPLATES,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def size(self) -> int:
+        """Total estimated size of kept templates, in bytes."""
+        return sum(entry.size for entry in self._entries.values())
+
+    @contextmanager
+    def session(self, refresh: bool = False, **kwargs) -> Iterator["TemplateSession"]:
+        """Use a prepared session, creating it if needed.
+
+        Sessions evicted while in use are closed when the last user finishes.
+
+        Args:
+            refresh:
+                Discard the cached session, if any, and prepare a new one.
+            **kwargs:
+                [TemplateSession][krupy.main.TemplateSession] fields.
+        """
+        key = json.dumps(kwargs, sort_keys=True, default=str)
+        with self._lock:
+            if refresh:
+                self._evict(key)
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                entry.users += 1
+        if entry is None:
+            entry = self._prepare(key, kwargs)
+        try:
+            yield entry.session
+        finally:
+            with self._lock:
+                entry.users -= 1
+                if entry.evicted and not entry.users:
+                    entry.session.close()
+
+    def clear(self) -> None:
+        """Discard all sessions."""
+        with self._lock:
+            for key in list(self._entries):
+                self._evict(key)
+
+    def _prepare(self, key: str, kwargs: AnyByStrDict) -> _CacheEntry:
+        from .main import TemplateSession
+
+        session = TemplateSession(**kwargs)
+        try:
+            session.prepare()
+        except BaseException:
+            session.close()
+            raise
+        entry = _CacheEntry(session, _estimate_size(session))
+        entry.users += 1
+        with self._lock:
+            # Another request could have prepared the same template meanwhile
+            self._evict(key)
+            self._entries[key] = entry
+            while len(self._entries) > 1 and (
+                len(self._entries) > self.max_entries or self.size > self.max_bytes
+            ):
+                self._evict(next(iter(self._entries)))
+        return entry
+
+    def _evict(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        entry.evicted = True
+        if not entry.users:
+            entry.session.close()
+
+
+def _estimate_size(session: "TemplateSession") -> int:
+    """Estimate the memory used by a prepared session.
+
+    It's the size of the template files, which get loaded and compiled.
+    """
+    result = 0
+    for root, dirs, files in os.walk(session.template.local_abspath):
+        with suppress(ValueError):
+            dirs.remove(".git")
+        for name in files:
+            with suppress(OSError):
+                result += os.lstat(os.path.join(root, name)).st_size
+    return result
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """Answer all requests received through one connection."""
+
+    def handle(self) -> None:
+        server = cast(_ServerMixin, self.server)
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+                if not isinstance(request, dict):
+                    raise ValueError("Requests must be JSON objects")
+            except ValueError as error:
+                self._send({"event": "error", "error": f"Invalid request: {error}"})
+                continue
+            try:
+                server.handle_request_data(request, self._send)
+            except (BrokenPipeError, ConnectionResetError):
+                return
+
+    def _send(self, event: AnyByStrDict) -> None:
+        self.wfile.write(json.dumps(event, default=str).encode() + b"\n")
+        self.wfile.flush()
+
+
+class _ServerMixin:
+    """Common logic for Unix and TCP servers."""
+
+    daemon_threads = True
+    cache: SessionCache
+    unsafe: bool
+
+    def handle_request_data(
+        self, request: AnyByStrDict, send: Callable[[AnyByStrDict], None]
+    ) -> None:
+        """Run one request, sending its events through `send`."""
+        base = {"id": request.get("id")}
+        op = request.get("op")
+        start = perf_counter()
+        send({**base, "event": "started", "op": op})
+        sinks: List[EventSink] = []
+        if request.get("events"):
+
+            def _send_event(event: Event) -> None:
+                send({**base, **to_dict(event)})
+
+            sinks.append(_send_event)
+        try:
+            if op in {"copy", "plan"}:
+                self._copy(request, sinks, pretend=op == "plan")
+            elif op == "update":
+                self._update(request, sinks)
+            else:
+                raise ValueError(f"Unknown operation: {op!r}")
+        except Exception as error:
+            send(
+                {
+                    **base,
+                    "event": "error",
+                    "error": f"{type(error).__name__}: {error}",
+                    "duration": perf_counter() - start,
+                }
+            )
+            return
+        send({**base, "event": "finished", "duration": perf_counter() - start})
+
+    def _copy(
+        self, request: AnyByStrDict, sinks: List[EventSink], pretend: bool
+    ) -> None:
+        if not request.get("src_path"):
+            raise ValueError("Missing `src_path`")
+        settings = self._settings(request, sinks)
+        if pretend:
+            settings["pretend"] = True
+        with self.cache.session(
+            refresh=bool(request.get("refresh")),
+            src_path=request.get("src_path"),
+            vcs_ref=request.get("vcs_ref"),
+            use_prereleases=settings.pop("use_prereleases", False),
+            exclude=settings.pop("exclude", ()),
+        ) as session:
+            session.render(self._dst_path(request), **settings)
+
+    def _update(self, request: AnyByStrDict, sinks: List[EventSink]) -> None:
+        from .main import Worker
+
+        settings = self._settings(request, sinks)
+        settings.setdefault("overwrite", True)
+        with Worker(
+            src_path=request.get("src_path"),
+            vcs_ref=request.get("vcs_ref"),
+            dst_path=self._dst_path(request),
+            **settings,
+        ) as worker:
+            worker.run_update()
+
+    def _settings(self, request: AnyByStrDict, sinks: List[EventSink]) -> AnyByStrDict:
+        settings = request.get("settings", {})
+        if settings.get("unsafe") and not self.unsafe:
+            raise UserMessageError(
+                "This server doesn't let requests enable `unsafe`. Start it with "
+                "`--trust` if all its clients are trusted."
+            )
+        return {
+            **settings,
+            "data": request.get("data", {}),
+            "defaults": True,
+            "quiet": True,
+            "event_sinks": sinks,
+        }
+
+    def _dst_path(self, request: AnyByStrDict) -> Path:
+        # Make it absolute now, before any other thread changes directory
+        return Path(request.get("dst_path", ".")).absolute()
+
+
+if hasattr(socket, "AF_UNIX"):
+
+    class UnixRenderServer(_ServerMixin, socketserver.ThreadingUnixStreamServer):
+        """Render server listening on a Unix socket."""
+
+        def __init__(
+            self,
+            path: StrOrPath,
+            cache: Optional[SessionCache] = None,
+            unsafe: bool = False,
+        ):
+            self.cache = cache or SessionCache()
+            self.unsafe = unsafe
+            self.path = str(path)
+            super().__init__(self.path, _RequestHandler)
+
+        def server_bind(self) -> None:
+            """Bind the socket, so only the current user can connect to it."""
+            super().server_bind()
+            # It isn't listening yet, so nobody could connect before this
+            os.chmod(self.path, 0o600)
+
+        def server_close(self) -> None:
+            """Close the server and remove its socket file."""
+            super().server_close()
+            with suppress(FileNotFoundError):
+                os.unlink(self.path)
+
+
+class TCPRenderServer(_ServerMixin, socketserver.ThreadingTCPServer):
+    """Render server listening on a localhost TCP port."""
+
+    allow_reuse_address = True
+
+    def __init__(
+        self, port: int = 0, cache: Optional[SessionCache] = None, unsafe: bool = False
+    ):
+        self.cache = cache or SessionCache()
+        self.unsafe = unsafe
+        super().__init__(("127.0.0.1", port), _RequestHandler)
+
+
+def serve(
+    address: Address,
+    max_templates: int = DEFAULT_MAX_TEMPLATES,
+    max_bytes: int = DEFAULT_MAX_BYTES,
+    on_ready: Optional[Callable[[str], None]] = None,
+    unsafe: bool = False,
+) -> None:
+    """Serve render requests until interrupted.
+
+    Args:
+        address:
+            Path of the Unix socket to listen on, or `(host, port)` tuple.
+            Only localhost is supported as host.
+        max_templates:
+            How many prepared templates to keep in memory, at most.
+        max_bytes:
+            Maximum total estimated size of templates kept in memory.
+        on_ready:
+            Called once the server is listening, with a description of the
+            address it is bound to. Useful to know the port when it was `0`.
+        unsafe:
+            Let requests enable [unsafe][], so they can render templates that
+            run tasks or migrations. Only for servers whose clients are trusted.
+    """
+    cache = SessionCache(max_entries=max_templates, max_bytes=max_bytes)
+    server: socketserver.BaseServer
+    if isinstance(address, tuple):
+        server = TCPRenderServer(address[1], cache=cache, unsafe=unsafe)
+        bound = "{}:{}".format(*server.server_address)
+    elif hasattr(socket, "AF_UNIX"):
+        server = UnixRenderServer(address, cache=cache, unsafe=unsafe)
+        bound = server.path
+    else:
+        raise UserMessageError("Unix sockets are not supported in this platform.")
+    try:
+        if on_ready:
+            on_ready(bound)
+        server.serve_forever()
+    finally:
+        server.server_close()
+        cache.clear()
+
+
+def send_request(address: Address, request: AnyByStrDict) -> Iterator[AnyByStrDict]:
+    """Send one request to a render server, and yield its events.
+
+    Args:
+        address:
+            Path of the Unix socket, or `(host, port)` tuple.
+        request:
+            The request to send. See the module docs for its format.
+    """
+    family = socket.AF_INET if isinstance(address, tuple) else socket.AF_UNIX
+    with socket.socket(family, socket.SOCK_STREAM) as sock:
+        sock.connect(address)
+        sock.sendall(json.dumps(request).encode() + b"\n")
+        reader: IO[bytes] = sock.makefile("rb")
+        for line in reader:
+            event = json.loads(line)
+            yield event
+            if event["event"] in {"finished", "error"}:
+                return
@@ -0,0 +1,303 @@
+"""Describe the shape and estimated cost of a template, without rendering it.
+
+The template is walked like a copy would walk it, using default answers
+unless other data is given, so excluded and skipped entries are left out.
+File contents are parsed, but never rendered, and tasks never run.
+
+```python
+from krupy.stats import template_stats
+
+stats = template_stats("path/to/template")
+print(stats.table())
+```
+"""
+
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from typing import TYPE_CHECKING, Any, Dict, List, Tuple
+
+from jinja2 import meta, nodes
+
+from .errors import UnsafeTemplateError
+from .profiler import DEFAULT_TOP
+from .tools import format_size
+from .types import AnyByStrDict
+
+# The main module is imported when analyzing, so the CLI starts faster
+if TYPE_CHECKING:
+    from jinja2 import Environment
+
+    from .main import Worker
+
+
+@dataclass
+class FileStats:
+    """What is known about a file before rendering it.
+
+    Attributes:
+        size:
+            Bytes in the template file.
+
+        templated:
+            Indicate if its contents are rendered, or copied verbatim.
+
+        variables:
+            Variables its contents use, which aren't defined in it.
+
+        nodes:
+            Jinja syntax nodes in its contents, an estimate of its render work.
+            Loops count once.
+    """
+
+    size: int
+    templated: bool
+    variables: List[str] = field(default_factory=list)
+    nodes: int = 0
+
+
+@dataclass
+class TemplateStats:
+    """Shape and estimated cost of a template.
+
+    Attributes:
+        files:
+            Stats of each file that a copy would produce, by its path
+            relative to the template.
+
+        dirs:
+            Folders that a copy would produce, not counting the root.
+
+        symlinks:
+            Symlinks that a copy would preserve.
+
+        path_templated:
+            Paths of files and folders whose name is templated.
+
+        exclude_patterns:
+            How many exclusion patterns apply, including default ones.
+
+        excluded:
+            Entries left out by those patterns. Contents of excluded folders
+            aren't counted.
+
+        questions:
+            How many questions the template has.
+
+        templated_when:
+            Questions that have a templated `when`.
+
+        templated_default:
+            Questions that have a templated `default`.
+
+        templated_choices:
+            Questions that have templated `choices`.
+    """
+
+    files: Dict[str, FileStats] = field(default_factory=dict)
+    dirs: int = 0
+    symlinks: int = 0
+    path_templated: List[str] = field(default_factory=list)
+    exclude_patterns: int = 0
+    excluded: int = 0
+    questions: int = 0
+    templated_when: int = 0
+    templated_default: int = 0
+    templated_choices: int = 0
+
+    @property
+    def templated(self) -> int:
+        """How many files are rendered."""
+        return sum(stats.templated for stats in self.files.values())
+
+    @property
+    def templated_ratio(self) -> float:
+        """Ratio of rendered files, among all files."""
+        return self.templated / len(self.files) if self.files else 0.0
+
+    @property
+    def total_size(self) -> int:
+        """Bytes in all template files."""
+        return sum(stats.size for stats in self.files.values())
+
+    @property
+    def render_nodes(self) -> int:
+        """Jinja syntax nodes in all rendered files."""
+        return sum(stats.nodes for stats in self.files.values())
+
+    def largest(self, top: int = DEFAULT_TOP) -> List[Tuple[str, FileStats]]:
+        """Get the largest files, the largest first.
+
+        Args:
+            top: How many files to get.
+        """
+        return sorted(self.files.items(), key=lambda item: -item[1].size)[:top]
+
+    def costliest(self, top: int = DEFAULT_TOP) -> List[Tuple[str, FileStats]]:
+        """Get the rendered files with most syntax nodes, the costliest first.
+
+        Args:
+            top: How many files to get.
+        """
+        templated = [item for item in self.files.items() if item[1].templated]
+        return sorted(templated, key=lambda item: -item[1].nodes)[:top]
+
+    def to_dict(self) -> AnyByStrDict:
+        """Get all stats, including computed ones, in a JSON-compatible dict."""
+        return {
+            **asdict(self),
+            "verbatim": len(self.files) - self.templated,
+            "templated": self.templated,
+            "templated_ratio": self.templated_ratio,
+            "total_size": self.total_size,
+            "render_nodes": self.render_nodes,
+        }
+
+    def table(self, top: int = DEFAULT_TOP) -> str:
+        """Format a summary and the largest and costliest files in tables.
+
+        Args:
+            top: How many files to list in each table.
+        """
+        verbatim = len(self.files) - self.templated
+        largest = self.largest(top)
+        lines = [
+            f"{'files':<17}  {len(self.files)} ({self.templated} templated, "
+            f"{verbatim} verbatim, {self.templated_ratio:.0%} templated)",
+            f"{'folders':<17}  {self.dirs}",
+            f"{'symlinks':<17}  {self.symlinks}",
+            f"{'size':<17}  {format_size(self.total_size)} total, "
+            f"{format_size(largest[0][1].size if largest else 0)} largest",
+            f"{'templated paths':<17}  {len(self.path_templated)}",
+            f"{'exclude patterns':<17}  {self.exclude_patterns} "
+            f"({self.excluded} entries excluded)",
+            f"{'questions':<17}  {self.questions} ({self.templated_when} templated "
+            f"when, {self.templated_default} templated default, "
+            f"{self.templated_choices} templated choices)",
+            f"{'render work':<17}  {self.render_nodes} Jinja nodes",
+            "",
+            f"Largest files, out of {len(self.files)}:",
+            f"  {'size':>10}  path",
+        ]
+        for path, stats in largest:
+            lines.append(f"  {format_size(stats.size):>10}  {path}")
+        lines += [
+            "",
+            f"Costliest files, out of {self.templated}:",
+            f"  {'nodes':>10}  path  (variables)",
+        ]
+        for path, stats in self.costliest(top):
+            lines.append(f"  {stats.nodes:>10}  {path}  ({', '.join(stats.variables)})")
+        return "\n".join(lines)
+
+
+class _Analyzer:
+    """Walk a template as [Worker][krupy.main.Worker] renders it."""
+
+    def __init__(self, worker: "Worker", stats: TemplateStats) -> None:
+        self.worker = worker
+        self.stats = stats
+        self.env: "Environment" = worker.jinja_env
+
+    def is_templated(self, value: Any) -> bool:
+        """Tell if a string, or any string within a collection, is templated."""
+        if isinstance(value, str):
+            return (
+                self.env.variable_start_string in value
+                or self.env.block_start_string in value
+            )
+        if isinstance(value, dict):
+            return any(map(self.is_templated, [*value.keys(), *value.values()]))
+        if isinstance(value, (list, tuple)):
+            return any(map(self.is_templated, value))
+        return False
+
+    def questions(self) -> None:
+        """Count questions, and which of their settings are templated."""
+        for details in self.worker.template.questions_data.values():
+            self.stats.questions += 1
+            self.stats.templated_when += self.is_templated(details.get("when"))
+            self.stats.templated_default += self.is_templated(details.get("default"))
+            self.stats.templated_choices += self.is_templated(details.get("choices"))
+
+    def walk(
+        self, src_abspath: Path, is_dir: bool = True, is_symlink: bool = False
+    ) -> None:
+        """Count an entry, and all entries within it if it's a folder."""
+        worker = self.worker
+        src_relpath = src_abspath.relative_to(worker.template_copy_root)
+        dst_relpath = worker._render_path(src_relpath)
+        if dst_relpath is None:
+            return
+        if dst_relpath != Path(".") and worker.match_exclude(dst_relpath):
+            self.stats.excluded += 1
+            return
+        name = src_abspath.relative_to(worker.template.local_abspath).as_posix()
+        if self.is_templated(src_relpath.name):
+            self.stats.path_templated.append(name)
+        if is_symlink:
+            self.stats.symlinks += 1
+        elif not is_dir:
+            self.file(src_abspath, name)
+        else:
+            if dst_relpath != Path("."):
+                self.stats.dirs += 1
+            preserve_symlinks = worker.template.preserve_symlinks
+            for entry in worker.template.listdir(src_abspath):
+                self.walk(
+                    entry.path,
+                    entry.is_dir,
+                    entry.is_symlink and preserve_symlinks,
+                )
+
+    def file(self, src_abspath: Path, name: str) -> None:
+        """Measure a file, and parse it if it's templated."""
+        suffix = self.worker.template.templates_suffix
+        stats = FileStats(
+            size=src_abspath.stat().st_size,
+            templated=not suffix or src_abspath.name.endswith(suffix),
+        )
+        if stats.templated:
+            try:
+                source = src_abspath.read_text()
+            except UnicodeDecodeError:
+                if suffix:
+                    raise
+                # Without a suffix, binary files are copied verbatim
+                stats.templated = False
+            else:
+                ast = self.env.parse(source, name, str(src_abspath))
+                stats.variables = sorted(meta.find_undeclared_variables(ast))
+                stats.nodes = sum(1 for _ in ast.find_all(nodes.Node))
+        self.stats.files[name] = stats
+
+
+def template_stats(src_path: str, **kwargs) -> TemplateStats:
+    """Analyze a template, without rendering it.
+
+    Args:
+        src_path:
+            String that can be resolved to a template path, be it local or remote.
+        **kwargs:
+            Other [Worker][krupy.main.Worker] fields, such as `data` or
+            `vcs_ref`. Default answers are used for missing data.
+
+    Returns:
+        The template stats.
+    """
+    from .main import Worker
+
+    stats = TemplateStats()
+    settings = {"defaults": True, "quiet": True, **kwargs}
+    with TemporaryDirectory(prefix=f"{__name__}.") as dst, Worker(
+        src_path=src_path, dst_path=Path(dst), **settings
+    ) as worker:
+        # Tasks and migrations never run, so only extensions are unsafe
+        if worker.template.jinja_extensions and not worker.unsafe:
+            raise UnsafeTemplateError(["jinja_extensions"])
+        analyzer = _Analyzer(worker, stats)
+        analyzer.questions()
+        worker._ask()
+        stats.exclude_patterns = len(worker.all_exclusions)
+        analyzer.walk(worker.template_copy_root)
+    return stats
@@ -9,7 +9,6 @@ from pathlib import Path
 from typing import Callable, List, Optional
 
 import yaml
-from plumbum.machines import local
 from pydantic.dataclasses import dataclass
 
 from .template import Template
@@ -40,8 +39,8 @@ class Subproject:
         Only applicable for VCS-tracked templates.
         """
         if self.vcs == "git":
-            with local.cwd(self.local_abspath):
-                return bool(get_git()("status", "--porcelain").strip())
+            git = get_git(self.local_abspath)
+            return bool(git("status", "--porcelain").strip())
         return False
 
     def _cleanup(self):
@@ -1,23 +1,42 @@
 """Tools related to template management."""
+import os
 import re
 from collections import ChainMap, defaultdict
-from contextlib import suppress
+from contextlib import ExitStack, suppress
 from dataclasses import field
 from functools import cached_property
 from pathlib import Path
 from shutil import rmtree
-from typing import List, Literal, Mapping, Optional, Sequence, Set, Tuple
+from tempfile import mkdtemp
+from typing import (
+    Dict,
+    List,
+    Literal,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
 from warnings import warn
 
-import dunamai
-import packaging.version
 import yaml
 from funcy import lflatten
 from packaging.version import Version, parse
-from plumbum.machines import local
 from pydantic.dataclasses import dataclass
 from yamlinclude import YamlIncludeConstructor
 
+from .cache import (
+    Snapshot,
+    find_ref,
+    find_snapshot,
+    link_snapshot,
+    lock,
+    record,
+    save_ref,
+    store_snapshot,
+)
 from .errors import (
     InvalidConfigFileError,
     MultipleConfigFilesError,
@@ -25,9 +44,24 @@ from .errors import (
     UnknownKrupyVersionWarning,
     UnsupportedVersionError,
 )
-from .tools import krupy_version, handle_remove_readonly
+from .events import phase
+from .tools import OS, krupy_version, handle_remove_readonly
 from .types import AnyByStrDict, Env, OptStr, StrSeq, Union, VCSTypes
-from .vcs import checkout_latest_tag, clone, get_git, get_repo
+from .vcs import (
+    GitMetadata,
+    GitTree,
+    ObjectReader,
+    checkout_latest_tag,
+    clone,
+    get_repo,
+    git_metadata,
+    is_immutable_ref,
+    is_remote,
+    latest_tag,
+    mirror,
+    open_object_reader,
+    resolve_commit,
+)
 
 # Default list of files in the template to exclude from the rendered project
 DEFAULT_EXCLUDE: Tuple[str, ...] = (
@@ -138,6 +172,30 @@ def verify_krupy_version(version_str: str) -> None:
         )
 
 
+class SourceEntry(NamedTuple):
+    """One entry found in a template folder.
+
+    Attributes:
+        path:
+            Absolute path to the entry.
+
+        is_dir:
+            Indicate if the entry is a directory, following symlinks.
+
+        is_symlink:
+            Indicate if the entry is a symlink.
+
+        exists:
+            Indicate if the entry exists, following symlinks. Only broken
+            symlinks don't exist.
+    """
+
+    path: Path
+    is_dir: bool
+    is_symlink: bool
+    exists: bool = True
+
+
 @dataclass
 class Task:
     """Object that represents a task to execute.
@@ -196,13 +254,17 @@ class Template:
     use_prereleases: bool = False
 
     def _cleanup(self) -> None:
-        temp_clone = self._temp_clone()
-        if temp_clone:
-            rmtree(
-                temp_clone,
-                ignore_errors=False,
-                onerror=handle_remove_readonly,
-            )
+        for reader in self._object_readers:
+            reader.close()
+        self._object_readers.clear()
+        with self._locks:
+            temp_clone = self._temp_clone()
+            if temp_clone:
+                rmtree(
+                    temp_clone,
+                    ignore_errors=False,
+                    onerror=handle_remove_readonly,
+                )
 
     def _temp_clone(self) -> Optional[Path]:
         """Get the path to the temporary clone of the template.
@@ -220,6 +282,72 @@ class Template:
             return clone_path
         return None
 
+    @cached_property
+    def _locks(self) -> ExitStack:
+        """Cache entries in use while the template is, until cleaned up."""
+        return ExitStack()
+
+    @cached_property
+    def _object_readers(self) -> List[ObjectReader]:
+        """Git processes reading objects of the template, until cleaned up."""
+        return []
+
+    @cached_property
+    def _source_index(self) -> Dict[Path, Dict[str, SourceEntry]]:
+        """Cache of folder listings, filled by [listdir][krupy.template.Template.listdir]."""
+        return {}
+
+    def listdir(self, path: Path) -> Tuple[SourceEntry, ...]:
+        """List a template folder.
+
+        Listings are cached, so every folder is read from disk only once.
+
+        Args:
+            path: Absolute path to a folder within the template.
+        """
+        return tuple(self._listdir(path).values())
+
+    def source_exists(self, path: Path) -> bool:
+        """Tell if a path exists within the template, using cached listings.
+
+        Args:
+            path: Absolute path within the template.
+        """
+        entry = self._listdir(path.parent).get(path.name)
+        return entry is not None and entry.exists
+
+    def forget(self, path: Path) -> None:
+        """Drop cached listings of a folder and all its subfolders.
+
+        Use it after template sources change on disk.
+
+        Args:
+            path: Absolute path to a folder within the template.
+        """
+        for cached in list(self._source_index):
+            if cached == path or path in cached.parents:
+                self._source_index.pop(cached, None)
+
+    def _listdir(self, path: Path) -> Dict[str, SourceEntry]:
+        """Get the cached listing of a folder; empty if it isn't a folder."""
+        try:
+            return self._source_index[path]
+        except KeyError:
+            pass
+        result: Dict[str, SourceEntry] = {}
+        with suppress(NotADirectoryError, FileNotFoundError):
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    is_symlink = entry.is_symlink()
+                    result[entry.name] = SourceEntry(
+                        path=path / entry.name,
+                        is_dir=entry.is_dir(),
+                        is_symlink=is_symlink,
+                        exists=not is_symlink or os.path.exists(entry.path),
+                    )
+        self._source_index[path] = result
+        return result
+
     @cached_property
     def _raw_config(self) -> AnyByStrDict:
         """Get template configuration, raw.
@@ -234,7 +362,8 @@ class Template:
         if len(conf_paths) > 1:
             raise MultipleConfigFilesError(conf_paths)
         elif len(conf_paths) == 1:
-            return load_template_config(conf_paths[0])
+            with phase("config"):
+                return load_template_config(conf_paths[0])
         return {}
 
     @cached_property
@@ -249,18 +378,31 @@ class Template:
         assert not result.is_absolute()
         return result
 
+    @cached_property
+    def _git_metadata(self) -> Optional[GitMetadata]:
+        """If the template is VCS-tracked, get version info of its commit.
+
+        It's gathered at once for [commit][krupy.template.Template.commit],
+        [commit_hash][krupy.template.Template.commit_hash] and
+        [version][krupy.template.Template.version].
+        """
+        if self.vcs == "git":
+            local_abspath = self.local_abspath
+            with phase("version"):
+                return git_metadata(local_abspath)
+        return None
+
     @cached_property
     def commit(self) -> OptStr:
         """If the template is VCS-tracked, get its commit description."""
-        if self.vcs == "git":
-            with local.cwd(self.local_abspath):
-                return get_git()("describe", "--tags", "--always").strip()
+        metadata = self._git_metadata
+        return None if metadata is None else metadata.describe
 
     @cached_property
     def commit_hash(self) -> OptStr:
         """If the template is VCS-tracked, get its commit full hash."""
-        if self.vcs == "git":
-            return get_git()("-C", self.local_abspath, "rev-parse", "HEAD").strip()
+        metadata = self._git_metadata
+        return None if metadata is None else metadata.commit_hash
 
     @cached_property
     def config_data(self) -> AnyByStrDict:
@@ -493,16 +635,99 @@ class Template:
         Dirty changes for local VCS-tracked templates will be copied.
         """
         result = Path(self.url)
-        if self.vcs == "git":
-            result = Path(clone(self.url_expanded, self.ref))
+        if self.vcs == "git" and is_remote(self.url_expanded):
+            result = self._checkout_remote()
+        elif self.vcs == "git":
+            with phase("clone"):
+                result = Path(clone(self.url_expanded, self.ref))
             if self.ref is None:
-                checkout_latest_tag(result, self.use_prereleases)
+                with phase("checkout_latest_tag"):
+                    checkout_latest_tag(result, self.use_prereleases)
         if not result.is_dir():
             raise ValueError("Local template must be a directory.")
         with suppress(OSError):
             result = result.resolve()
         return result
 
+    def _checkout_remote(self) -> Path:
+        """Check out a remote template, from a snapshot if possible.
+
+        A tag or commit used before is linked from its snapshot without running
+        Git. Other refs are resolved in the mirror, fetching it if needed, and
+        linked from the snapshot of their commit if there's one. Otherwise, the
+        files of the commit are written from the mirror's object store into a
+        new snapshot, by one process at a time, and linked. Only commits with
+        submodules or `.gitattributes` files are cloned instead.
+
+        See [krupy.cache][].
+        """
+        url, ref = self.url_expanded, self.ref
+        known_hash = find_ref(url, ref) if ref else None
+        if known_hash:
+            with lock(known_hash, shared=True):
+                snapshot = find_snapshot(known_hash)
+                if snapshot is not None:
+                    return self._link_snapshot(snapshot)
+        with ExitStack() as stack:
+            with phase("clone"):
+                repo = stack.enter_context(mirror(url, ref))
+            reader = open_object_reader(repo)
+            self._object_readers.append(reader)
+            if ref is None:
+                with phase("checkout_latest_tag"):
+                    ref = latest_tag(repo, self.use_prereleases)
+            commit_hash = resolve_commit(repo, ref)
+            if commit_hash is None:
+                raise ValueError(f"Reference {ref!r} not found in template {url}.")
+            if is_immutable_ref(repo, ref):
+                save_ref(url, ref, commit_hash)
+            with lock(commit_hash, shared=True):
+                snapshot = find_snapshot(commit_hash)
+                if snapshot is not None:
+                    return self._link_snapshot(snapshot)
+            with lock(commit_hash):
+                # Another process may have stored it while waiting for the lock
+                snapshot = find_snapshot(commit_hash)
+                if snapshot is not None:
+                    return self._link_snapshot(snapshot)
+                record("snapshot", hit=False)
+                tree = GitTree(reader, commit_hash)
+                # Git on Windows may convert line endings or symlinks on checkout
+                if OS != "windows" and not tree.needs_checkout:
+                    with phase("version"):
+                        metadata = git_metadata(repo, commit_hash)
+                    version = (
+                        None if metadata.version is None else str(metadata.version)
+                    )
+                    with phase("clone"):
+                        snapshot = store_snapshot(
+                            tree.write, commit_hash, metadata.describe, version
+                        )
+                    return self._link_snapshot(snapshot, hit=False)
+                with phase("clone"):
+                    result = Path(clone(url, commit_hash, repo))
+                # The clone borrows objects from the mirror, so keep it until cleanup
+                self._locks.enter_context(stack.pop_all())
+                # This clone is used now, so other properties use Git on it
+                self.__dict__["local_abspath"] = result.resolve()
+                version = None if self.version is None else str(self.version)
+                store_snapshot(result, commit_hash, self.commit or "", version)
+                return result
+
+    def _link_snapshot(self, snapshot: Snapshot, hit: bool = True) -> Path:
+        """Link a snapshot into a temporary folder, and use its metadata."""
+        if hit:
+            record("snapshot", hit=True)
+        result = Path(mkdtemp(prefix=f"{__name__}.snapshot."))
+        with phase("snapshot"):
+            link_snapshot(snapshot, result)
+        self.__dict__.update(
+            commit=snapshot.commit,
+            commit_hash=snapshot.commit_hash,
+            version=None if snapshot.version is None else Version(snapshot.version),
+        )
+        return result
+
     @cached_property
     def url_expanded(self) -> str:
         """Get usable URL.
@@ -516,30 +741,8 @@ class Template:
     @cached_property
     def version(self) -> Optional[Version]:
         """PEP440-compliant version object."""
-        if self.vcs != "git" or not self.commit:
-            return None
-        try:
-            with local.cwd(self.local_abspath):
-                # Leverage dunamai by default; usually it gets best results.
-                # `dunamai.Version.from_git` needs `Pattern.DefaultUnprefixed`
-                # to be PEP440 compliant on version reading
-                return Version(
-                    dunamai.Version.from_git(
-                        pattern=dunamai.Pattern.DefaultUnprefixed
-                    ).serialize(style=dunamai.Style.Pep440)
-                )
-        except ValueError:
-            # A fully descriptive commit can be easily detected converted into a
-            # PEP440 version, because it has the format "<tag>-<count>-g<hash>"
-            if re.match(r"^.+-\d+-g\w+$", self.commit):
-                base, count, git_hash = self.commit.rsplit("-", 2)
-                return Version(f"{base}.post{count}+{git_hash}")
-        # If we get here, the commit string is a tag
-        try:
-            return Version(self.commit)
-        except packaging.version.InvalidVersion:
-            # appears to not be a version
-            return None
+        metadata = self._git_metadata
+        return None if metadata is None else metadata.version
 
     @cached_property
     def vcs(self) -> Optional[VCSTypes]:
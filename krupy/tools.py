@@ -5,22 +5,32 @@ import os
 import platform
 import stat
 import sys
-from contextlib import suppress
+import time
+from contextlib import contextmanager, suppress
 from decimal import Decimal
 from enum import Enum
 from importlib.metadata import version
 from pathlib import Path
 from types import TracebackType
-from typing import Any, Callable, Literal, Optional, TextIO, Tuple, Union, cast
+from typing import (
+    Any,
+    Callable,
+    Iterator,
+    Literal,
+    Optional,
+    TextIO,
+    Tuple,
+    Union,
+    cast,
+)
 
 import colorama
+from funcy import once
 from packaging.version import Version
 from pydantic import StrictBool
 
 from .types import IntSeq
 
-colorama.init()
-
 
 class Style:
     """Common color styles."""
@@ -59,6 +69,12 @@ def krupy_version() -> Version:
     return Version(version("krupy"))
 
 
+@once
+def _init_colors() -> None:
+    """Make colors work in old Windows consoles, when first printed."""
+    colorama.init()
+
+
 def printf(
     action: str,
     msg: Any = "",
@@ -75,6 +91,7 @@ def printf(
     if not style:
         return action + _msg
 
+    _init_colors()
     out = style + [action] + Style.RESET + [INDENT, _msg]  # type: ignore
     print(*out, sep="", file=file_)
     return None  # HACK: Satisfy MyPy
@@ -147,6 +164,19 @@ def force_str_end(original_str: str, end: str = "\n") -> str:
     return original_str
 
 
+def format_size(size: float) -> str:
+    """Format a size in bytes for humans, e.g. `1.5 KiB`.
+
+    Params:
+        size: Amount of bytes.
+    """
+    for unit in ("B", "KiB", "MiB"):
+        if size < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GiB"
+
+
 def handle_remove_readonly(
     func: Callable, path: str, exc: Tuple[BaseException, OSError, TracebackType]
 ) -> None:
@@ -177,3 +207,57 @@ def readlink(link: Path) -> Path:
         return link.readlink()
     else:
         return Path(os.readlink(link))
+
+
+@contextmanager
+def file_lock(
+    path: Path, shared: bool = False, blocking: bool = True
+) -> Iterator[bool]:
+    """Lock a file, to coordinate with other processes.
+
+    Shared locks only exclude exclusive ones, so readers don't wait for each
+    other. On Windows, all locks are exclusive.
+
+    Locks are held by open files, so a process must not lock the same file
+    twice in a nested way, unless both locks are shared.
+
+    Args:
+        path: File to lock. It's created if needed, and never removed.
+        shared: Lock it for reading, instead of writing.
+        blocking: Wait until it can be locked.
+
+    Yields:
+        Whether the file was locked, which is always true when blocking.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a") as file:
+        if sys.platform == "win32":
+            import msvcrt
+
+            # Processes must lock the same byte
+            file.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(file.fileno(), msvcrt.LK_NBLCK, 1)
+                    locked = True
+                except OSError:
+                    locked = False
+                if locked or not blocking:
+                    break
+                time.sleep(0.05)
+            try:
+                yield locked
+            finally:
+                if locked:
+                    msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+
+            flags = fcntl.LOCK_SH if shared else fcntl.LOCK_EX
+            try:
+                fcntl.flock(file, flags if blocking else flags | fcntl.LOCK_NB)
+                locked = True
+            except BlockingIOError:
+                locked = False
+            # Closing the file releases the lock
+            yield locked
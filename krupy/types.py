@@ -4,12 +4,15 @@ import sys
 from pathlib import Path
 from typing import (
     Any,
+    Callable,
     Dict,
+    List,
     Literal,
     Mapping,
     NewType,
     Optional,
     Sequence,
+    Tuple,
     TypeVar,
     Union,
 )
@@ -42,6 +45,14 @@ VCSTypes = Literal["git"]
 Env = Mapping[str, str]
 MissingType = NewType("MissingType", object)
 MISSING = MissingType(object())
+# Same as `krupy.questionary.prompts.common.AnyFormattedText`, which can't be
+# imported without loading the whole prompt toolkit
+AnyFormattedText = Union[
+    str,
+    List[Tuple[str, str]],
+    List[Tuple[str, str, Callable[[Any], None]]],
+    None,
+]
 
 
 # Validators
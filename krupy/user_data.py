@@ -8,28 +8,41 @@ from functools import cached_property
 from hashlib import sha512
 from os import urandom
 from pathlib import Path
-from typing import Any, Callable, Dict, Mapping, Optional, Sequence, Set, Union
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Set,
+    Union,
+)
 
 import yaml
 from jinja2 import UndefinedError
 from jinja2.sandbox import SandboxedEnvironment
-from prompt_toolkit.lexers import PygmentsLexer
-from prompt_toolkit.validation import ValidationError
 from pydantic import ConfigDict, Field, field_validator
 from pydantic.dataclasses import dataclass
 from pydantic_core.core_schema import ValidationInfo
-from pygments.lexers.data import JsonLexer, YamlLexer
-from prompt_toolkit.styles import Style
-
-from .questionary.styles import merge_styles_default
-from .questionary.prompts.common import Choice, AnyFormattedText
-from .questionary.constants import (
-    DEFAULT_STYLE,
-    DEFAULT_QUESTION_PREFIX,
-)
+
 from .errors import InvalidTypeError, UserMessageError
 from .tools import cast_to_bool, cast_to_str
-from .types import MISSING, AnyByStrDict, MissingType, OptStr, OptStrOrPath, StrOrPath
+from .types import (
+    MISSING,
+    AnyByStrDict,
+    AnyFormattedText,
+    MissingType,
+    OptStr,
+    OptStrOrPath,
+    StrOrPath,
+)
+
+# The prompt toolkit is slow to import, and only needed to show prompts
+if TYPE_CHECKING:
+    from .questionary.prompts.common import Choice
 
 
 # TODO Remove these two functions as well as DEFAULT_DATA in a future release
@@ -259,7 +272,7 @@ class Question:
         result = self.cast_answer(result)
         return result
 
-    def get_default_rendered(self) -> Union[bool, str, Choice, None, MissingType]:
+    def get_default_rendered(self) -> Union[bool, str, "Choice", None, MissingType]:
         """Get default answer rendered for the questionary lib.
 
         The questionary lib expects some specific data types, and returns
@@ -294,9 +307,13 @@ class Question:
         return str(default)
 
     @cached_property
-    def _formatted_choices(self) -> Sequence[Choice]:
+    def _formatted_choices(self) -> Sequence["Choice"]:
         """Obtain choices rendered and properly formatted."""
-        result = []
+        result: List["Choice"] = []
+        if not self.choices:
+            return result
+        from .questionary.prompts.common import Choice
+
         choices = self.choices
         if isinstance(self.choices, dict):
             choices = list(self.choices.items())
@@ -342,6 +359,8 @@ class Question:
             return self.render_value(self.qmark)
         if self.secret:
             return "🕵️ "
+        from .questionary.constants import DEFAULT_QUESTION_PREFIX
+
         return DEFAULT_QUESTION_PREFIX
 
     def get_placeholder(self) -> AnyFormattedText:
@@ -385,6 +404,13 @@ class Question:
 
     def get_questionary_structure(self, questionQCount: Any) -> AnyByStrDict:
         """Get the question in a format that the questionary lib understands."""
+        from prompt_toolkit.lexers import PygmentsLexer
+        from prompt_toolkit.styles import Style
+        from pygments.lexers.data import JsonLexer, YamlLexer
+
+        from .questionary.constants import DEFAULT_STYLE
+        from .questionary.styles import merge_styles_default
+
         lexer = None
         result: AnyByStrDict = {
             "filter": self.cast_answer,
@@ -452,9 +478,9 @@ class Question:
         try:
             err_msg = self.render_value(self.validator, {self.var_name: ans}).strip()
         except Exception as error:
-            raise ValidationError(message=str(error)) from error
+            raise _validation_error(str(error)) from error
         if err_msg:
-            raise ValidationError(message=err_msg)
+            raise _validation_error(err_msg)
         return True
 
     def get_when(self) -> bool:
@@ -498,6 +524,13 @@ class Question:
         )
 
 
+def _validation_error(message: str) -> Exception:
+    """Get the error that makes prompts show a message and ask again."""
+    from prompt_toolkit.validation import ValidationError
+
+    return ValidationError(message=message)
+
+
 def parse_yaml_string(string: str) -> Any:
     """Parse a YAML string and raise a ValueError if parsing failed.
 
@@ -1,10 +1,18 @@
 """Utilities related to VCS."""
+
 import os
 import re
 import sys
-from contextlib import suppress
+import threading
+import time
+from contextlib import ExitStack, contextmanager, suppress
+from dataclasses import dataclass
+from functools import cached_property
 from pathlib import Path
+from shutil import rmtree
+from subprocess import DEVNULL, PIPE, Popen, TimeoutExpired
 from tempfile import TemporaryDirectory, mkdtemp
+from typing import Dict, Iterator, List, Optional, Tuple, cast
 from warnings import warn
 
 from packaging import version
@@ -12,13 +20,50 @@ from packaging.version import InvalidVersion, Version
 from plumbum import TF, ProcessExecutionError, colors, local
 from plumbum.machines import LocalCommand
 
-from .errors import DirtyLocalWarning, ShallowCloneWarning
+from .cache import is_offline, lock, mirror_path, record
+from .errors import (
+    DirtyLocalWarning,
+    OfflineError,
+    ShallowCloneWarning,
+    UserMessageError,
+)
+from .events import CloneFinished, GitInvoked, emit, observed
 from .types import OptBool, OptStr, OptStrOrPath, StrOrPath
 
 
+class _GitCommand(LocalCommand):
+    """Git command that emits [GitInvoked][krupy.events.GitInvoked] events.
+
+    In [offline mode][krupy.cache.is_offline], it can only reach local repos.
+    """
+
+    __slots__ = ()
+
+    def popen(self, args=(), cwd=None, env=None, **kwargs):
+        if is_offline():
+            env = {**(env or {}), "GIT_ALLOW_PROTOCOL": "file"}
+        proc = super().popen(args, cwd, env, **kwargs)
+        if not observed():
+            return proc
+        start = time.perf_counter()
+        verify = proc.verify
+
+        # Plumbum verifies every process it waits for, whatever its exit code
+        def _verify(*args, **kwargs) -> None:
+            try:
+                verify(*args, **kwargs)
+            finally:
+                duration = time.perf_counter() - start
+                argv = tuple(map(str, proc.argv[1:]))
+                emit(GitInvoked(argv, proc.returncode, duration))
+
+        proc.verify = _verify  # type: ignore[method-assign]
+        return proc
+
+
 def get_git(context_dir: OptStrOrPath = None) -> LocalCommand:
     """Gets `git` command, or fails if it's not available"""
-    command = local["git"]
+    command: LocalCommand = _GitCommand(local.which("git"))
     if context_dir:
         command = command["-C", context_dir]
     return command
@@ -30,6 +75,270 @@ def get_git_version() -> Version:
     return Version(re.findall(r"\d+\.\d+\.\d+", git("version"))[0])
 
 
+@dataclass(frozen=True)
+class GitObject:
+    """An object read from a Git repo.
+
+    Attributes:
+        object_hash: Its full hash.
+        type: `blob`, `tree`, `commit` or `tag`.
+        data: Its raw contents.
+    """
+
+    object_hash: str
+    type: str
+    data: bytes
+
+
+@dataclass(frozen=True)
+class TreeEntry:
+    """An entry of a Git tree.
+
+    Attributes:
+        name: File or folder name.
+        mode: Git file mode, such as `0o100644`, `0o120000` for symlinks or
+            `0o40000` for folders.
+        object_hash: Full hash of its blob or tree.
+    """
+
+    name: str
+    mode: int
+    object_hash: str
+
+    @property
+    def is_dir(self) -> bool:
+        """Indicate if it's a folder."""
+        return self.mode == 0o40000
+
+    @property
+    def is_symlink(self) -> bool:
+        """Indicate if it's a symlink, whose blob is its target."""
+        return self.mode == 0o120000
+
+
+class ObjectReader:
+    """Long-lived `git cat-file --batch` process, to read objects of a repo.
+
+    Spawning Git for each query is slow, compared with asking a process that
+    is already running. While a reader is [open][krupy.vcs.open_object_reader],
+    the functions of this module that read objects of its repo use it.
+
+    It can be used from several threads at once.
+
+    Attributes:
+        repo: Absolute path to the repo, which can be bare.
+    """
+
+    def __init__(self, repo: Path) -> None:
+        self.repo = repo
+        self._users = 0
+        self._lock = threading.Lock()
+        self._process = cast(
+            "Popen[bytes]",
+            get_git(repo)["cat-file", "--batch"].popen(
+                stdin=PIPE, stdout=PIPE, stderr=DEVNULL
+            ),
+        )
+        assert self._process.stdin and self._process.stdout
+        self._stdin, self._stdout = self._process.stdin, self._process.stdout
+
+    def read(self, name: str) -> Optional[GitObject]:
+        """Read an object.
+
+        Args:
+            name: Any expression that Git resolves to an object, such as a
+                hash, `v1^{commit}` or `HEAD:path/to/file`.
+
+        Returns:
+            The object, or `None` if it's missing or ambiguous.
+        """
+        if "\n" in name:
+            return None
+        stdin, stdout = self._stdin, self._stdout
+        with self._lock:
+            stdin.write(f"{name}\n".encode())
+            stdin.flush()
+            header = stdout.readline().split()
+            if not header:
+                raise OSError(f"git cat-file exited in {self.repo}")
+            if len(header) != 3:
+                return None
+            object_hash, type_, size = (part.decode() for part in header)
+            data = stdout.read(int(size))
+            # Each object ends with a newline
+            stdout.read(1)
+        return GitObject(object_hash, type_, data)
+
+    def tree(self, name: str) -> Optional[List[TreeEntry]]:
+        """List a tree.
+
+        Args:
+            name: Any expression that Git resolves to a tree or commit, such
+                as `HEAD^{tree}` or `v1:path/to/folder`.
+
+        Returns:
+            Its entries, sorted like Git does, or `None` if it's missing or
+            not a tree.
+        """
+        obj = self.read(f"{name}^{{tree}}")
+        if obj is None:
+            return None
+        result = []
+        hash_size = len(obj.object_hash) // 2
+        data, start = obj.data, 0
+        while start < len(data):
+            space = data.index(b" ", start)
+            end = data.index(b"\0", space)
+            result.append(
+                TreeEntry(
+                    os.fsdecode(data[space + 1 : end]),
+                    int(data[start:space], 8),
+                    data[end + 1 : end + 1 + hash_size].hex(),
+                )
+            )
+            start = end + 1 + hash_size
+        return result
+
+    def close(self) -> None:
+        """Stop using the reader, and stop its process if nobody else uses it."""
+        with _readers_lock:
+            self._users -= 1
+            if self._users > 0:
+                return
+            if _readers.get(self.repo) is self:
+                del _readers[self.repo]
+        # Git exits when its input ends
+        self._stdin.close()
+        try:
+            self._process.wait(timeout=5)
+        except TimeoutExpired:
+            self._process.kill()
+            self._process.wait()
+        self._stdout.close()
+
+
+_readers: Dict[Path, ObjectReader] = {}
+_readers_lock = threading.Lock()
+
+
+def open_object_reader(repo: StrOrPath) -> ObjectReader:
+    """Start a [object reader][krupy.vcs.ObjectReader] for a repo, or reuse a running one.
+
+    Each call must be followed by [closing][krupy.vcs.ObjectReader.close] it, e.g.
+    from the `_cleanup` of the object that uses it.
+
+    Args:
+        repo: A git repository in the local filesystem. It can be bare.
+    """
+    path = Path(repo).absolute()
+    with _readers_lock:
+        reader = _readers.get(path)
+        if reader is None:
+            reader = _readers[path] = ObjectReader(path)
+        reader._users += 1
+        return reader
+
+
+def get_object_reader(repo: StrOrPath) -> Optional[ObjectReader]:
+    """Get the open [object reader][krupy.vcs.ObjectReader] for a repo, if there's one."""
+    return _readers.get(Path(repo).absolute())
+
+
+def resolve_commit(repo: StrOrPath, ref: str) -> OptStr:
+    """Get the full hash of the commit a reference points to.
+
+    Args:
+        repo: A git repository in the local filesystem. It can be bare.
+        ref: Any reference to a commit, such as a tag, branch or hash.
+
+    Returns:
+        The hash, or `None` if the repo hasn't that commit.
+    """
+    reader = get_object_reader(repo)
+    if reader is not None:
+        obj = reader.read(f"{ref}^{{commit}}")
+        return None if obj is None else obj.object_hash
+    retcode, stdout, _ = get_git(repo)[
+        "rev-parse", "--verify", "--quiet", f"{ref}^{{commit}}"
+    ].run(retcode=None)
+    return stdout.strip() if retcode == 0 else None
+
+
+class GitTree:
+    """Files of a commit, read from the object store of a repo.
+
+    It's what a checkout of the commit contains, with file modes and symlinks
+    taken from the tree entries, but writing it needs no worktree, index or
+    `.git` folder, and no Git process besides the reader.
+
+    Attributes:
+        reader: Reader of the repo objects.
+        commit_hash: Full hash of the commit.
+    """
+
+    def __init__(self, reader: ObjectReader, commit_hash: str) -> None:
+        self.reader = reader
+        self.commit_hash = commit_hash
+
+    @cached_property
+    def entries(self) -> List[Tuple[str, TreeEntry]]:
+        """All entries of the commit, parents before children.
+
+        Each one comes with its path relative to the repo root, in POSIX form.
+        """
+        result: List[Tuple[str, TreeEntry]] = []
+        pending = [("", self.commit_hash)]
+        while pending:
+            prefix, name = pending.pop()
+            tree = self.reader.tree(name)
+            if tree is None:
+                raise OSError(f"Tree {name} not found in {self.reader.repo}")
+            for entry in tree:
+                relpath = f"{prefix}{entry.name}"
+                result.append((relpath, entry))
+                if entry.is_dir:
+                    pending.append((f"{relpath}/", entry.object_hash))
+        return result
+
+    @property
+    def needs_checkout(self) -> bool:
+        """Indicate if only Git can write the files as a checkout would.
+
+        That happens with submodules, and with `.gitattributes` files, which
+        may ask for filters or line ending conversions.
+        """
+        return any(
+            entry.mode == 0o160000 or entry.name == ".gitattributes"
+            for _, entry in self.entries
+        )
+
+    def write(self, destination: Path) -> None:
+        """Write the files of the commit into a new folder.
+
+        Args:
+            destination: Where to write them. It must not exist.
+        """
+        destination.mkdir()
+        for relpath, entry in self.entries:
+            path = destination / relpath
+            if entry.is_dir:
+                path.mkdir()
+                continue
+            blob = self.reader.read(entry.object_hash)
+            if blob is None:
+                raise OSError(
+                    f"Blob {entry.object_hash} not found in {self.reader.repo}"
+                )
+            if entry.is_symlink:
+                os.symlink(os.fsdecode(blob.data), path)
+                continue
+            # Like Git, the umask decides the permissions
+            flags = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0)
+            fd = os.open(path, flags, 0o777 if entry.mode == 0o100755 else 0o666)
+            with open(fd, "wb") as file:
+                file.write(blob.data)
+
+
 GIT_PREFIX = ("git@", "git://", "git+", "https://github.com/", "https://gitlab.com/")
 GIT_POSTFIX = ".git"
 REPLACEMENTS = (
@@ -43,8 +352,10 @@ REPLACEMENTS = (
 def is_git_repo_root(path: StrOrPath) -> bool:
     """Indicate if a given path is a git repo root directory."""
     try:
-        with local.cwd(Path(path, ".git")):
-            return get_git()("rev-parse", "--is-inside-git-dir").strip() == "true"
+        git_dir = Path(path, ".git")
+        if not git_dir.is_dir():
+            return False
+        return get_git(git_dir)("rev-parse", "--is-inside-git-dir").strip() == "true"
     except OSError:
         return False
 
@@ -74,9 +385,8 @@ def is_git_bundle(path: Path) -> bool:
     with suppress(OSError):
         path = path.resolve()
     with TemporaryDirectory(prefix=f"{__name__}.is_git_bundle.") as dirname:
-        with local.cwd(dirname):
-            get_git()("init")
-            return bool(get_git()["bundle", "verify", path] & TF)
+        get_git(dirname)("init")
+        return bool(get_git(dirname)["bundle", "verify", path] & TF)
 
 
 def get_repo(url: str) -> OptStr:
@@ -115,6 +425,59 @@ def get_repo(url: str) -> OptStr:
     return None
 
 
+def read_refs(repo: StrOrPath) -> Tuple[OptStr, Dict[str, str]]:
+    """Get the `HEAD` commit of a repo, and the commit each tag points to.
+
+    It takes a single Git call.
+
+    Args:
+        repo: A git repository in the local filesystem. It can be bare.
+
+    Returns:
+        The full hash of `HEAD`, or `None` if it has no commits yet, and the
+        full hash of the commit each tag points to, by tag name.
+    """
+    show_ref = get_git(repo)["show-ref", "--head", "--dereference", "--tags"]
+    # It fails when nothing is found
+    _, stdout, _ = show_ref.run(retcode=(0, 1))
+    head, tags = None, {}
+    for line in stdout.splitlines():
+        object_hash, ref = line.split(" ", 1)
+        if ref == "HEAD":
+            head = object_hash
+            continue
+        # Annotated tags are listed twice; the `^{}` line has their target
+        name = ref[len("refs/tags/") :]
+        tags[name[:-3] if name.endswith("^{}") else name] = object_hash
+    return head, tags
+
+
+def latest_tag(repo: StrOrPath, use_prereleases: OptBool = False) -> str:
+    """Get the latest git tag of a repo, sorted by PEP 440.
+
+    Parameters:
+        repo:
+            A git repository in the local filesystem. It can be bare.
+        use_prereleases:
+            If `False`, skip prerelease git tags.
+
+    Returns:
+        The tag, or `HEAD` if there are none.
+    """
+    all_tags = filter(valid_version, read_refs(repo)[1])
+    if not use_prereleases:
+        all_tags = filter(lambda tag: not version.parse(tag).is_prerelease, all_tags)
+    sorted_tags = sorted(all_tags, key=version.parse, reverse=True)
+    try:
+        return str(sorted_tags[0])
+    except IndexError:
+        print(
+            colors.warn | "No git tags found in template; using HEAD as ref",
+            file=sys.stderr,
+        )
+        return "HEAD"
+
+
 def checkout_latest_tag(local_repo: StrOrPath, use_prereleases: OptBool = False) -> str:
     """Checkout latest git tag and check it out, sorted by PEP 440.
 
@@ -124,44 +487,227 @@ def checkout_latest_tag(local_repo: StrOrPath, use_prereleases: OptBool = False)
         use_prereleases:
             If `False`, skip prerelease git tags.
     """
-    git = get_git()
-    with local.cwd(local_repo):
-        all_tags = filter(valid_version, git("tag").split())
-        if not use_prereleases:
-            all_tags = filter(
-                lambda tag: not version.parse(tag).is_prerelease, all_tags
-            )
-        sorted_tags = sorted(all_tags, key=version.parse, reverse=True)
-        try:
-            latest_tag = str(sorted_tags[0])
-        except IndexError:
-            print(
-                colors.warn | "No git tags found in template; using HEAD as ref",
-                file=sys.stderr,
-            )
-            latest_tag = "HEAD"
-        git("checkout", "--force", latest_tag)
-        git("submodule", "update", "--checkout", "--init", "--recursive", "--force")
-        return latest_tag
+    git = get_git(local_repo)
+    tag = latest_tag(local_repo, use_prereleases)
+    git("checkout", "--force", tag)
+    git("submodule", "update", "--checkout", "--init", "--recursive", "--force")
+    return tag
+
+
+@dataclass(frozen=True)
+class GitMetadata:
+    """Version info of the checked out commit of a repo.
+
+    Attributes:
+        commit_hash:
+            Full hash of `HEAD`.
+
+        describe:
+            What `git describe --tags --always` outputs.
+
+        version:
+            PEP 440 version of `HEAD`, or `None` if it isn't tagged or described
+            with one.
+    """
+
+    commit_hash: str
+    describe: str
+    version: Optional[Version]
+
+
+def git_metadata(local_repo: StrOrPath, rev: str = "HEAD") -> GitMetadata:
+    """Get version info of a commit of a repo.
+
+    When the commit is the only one of a tag, as after checking out the latest
+    tag, it takes a single Git call. Otherwise, it takes one more to describe
+    it, and another one if it has no tag with a version.
+
+    Tags are parsed as [PEP 440][] versions with `packaging`, so they can
+    have a `v` prefix. Commits after a tag are development releases of a
+    post-release of it, and untagged commits are post-releases of `0.0.0`.
+
+    [PEP 440]: https://peps.python.org/pep-0440/
+
+    Args:
+        local_repo: A git repository in the local filesystem. It can be bare.
+        rev: The commit, `HEAD` by default.
+
+    Raises:
+        UserMessageError: The repo doesn't have that commit, or has none.
+    """
+    git = get_git(local_repo)
+    head, tags = read_refs(local_repo)
+    if rev != "HEAD":
+        head = resolve_commit(local_repo, rev)
+    if head is None:
+        raise UserMessageError(f"Git repository `{local_repo}` has no commit `{rev}`.")
+    exact = [tag for tag, target in tags.items() if target == head]
+    if len(exact) == 1 and valid_version(exact[0]):
+        return GitMetadata(head, exact[0], Version(exact[0]))
+    describe = git("describe", "--tags", "--always", "--long", head).strip()
+    match = re.fullmatch(r"(.+)-(\d+)-g([0-9a-f]+)", describe)
+    tag: OptStr = None
+    if match is None:
+        # There are no tags, so it's the abbreviated hash
+        distance, abbrev_hash = 0, describe
+    else:
+        tag, distance, abbrev_hash = match[1], int(match[2]), match[3]
+        if not distance:
+            # Without `--long`, only the tag is shown then
+            describe = tag
+    if tag is not None and valid_version(tag):
+        if not distance:
+            return GitMetadata(head, describe, Version(tag))
+        base = Version(tag).public
+    else:
+        base, distance = "0.0.0", int(git("rev-list", "--count", head))
+    try:
+        version_ = Version(f"{base}.post{distance}.dev0+{abbrev_hash}")
+    except InvalidVersion:
+        version_ = None
+    return GitMetadata(head, describe, version_)
+
+
+def is_remote(url: str) -> bool:
+    """Indicate if a repo isn't in the local filesystem, so it's used from the cache.
+
+    Args:
+        url:
+            Git-parseable URL of the repo. As returned by
+            [get_repo][krupy.vcs.get_repo].
+    """
+    return not os.path.exists(url)
+
+
+def is_immutable_ref(repo: StrOrPath, ref: OptStr) -> bool:
+    """Indicate if a reference is a tag or commit that a repo already has.
+
+    Fetching can't change what those point to, unless a tag is moved, which is
+    not supported.
+
+    Args:
+        repo:
+            A git repository in the local filesystem.
+        ref:
+            Reference to look for. `None` means the latest tag, which can
+            change on every fetch.
+    """
+    if not ref:
+        return False
+    if resolve_commit(repo, f"refs/tags/{ref}"):
+        return True
+    return bool(re.fullmatch(r"[0-9a-fA-F]{7,64}", ref) and resolve_commit(repo, ref))
+
+
+def _fetched_since(path: Path, moment: float) -> bool:
+    """Indicate if a mirror was created or fetched after some moment."""
+    try:
+        return (path / "krupy-fetched").stat().st_mtime >= moment
+    except OSError:
+        return False
+
 
+@contextmanager
+def mirror(url: str, ref: OptStr = None) -> Iterator[Path]:
+    """Use an up-to-date bare mirror of a remote repo, from the cache.
 
-def clone(url: str, ref: OptStr = None) -> str:
+    The mirror is created the first time. Later, it's only fetched if `ref`
+    isn't an [immutable ref][krupy.vcs.is_immutable_ref] it already has.
+
+    It's safe to use from several processes at once. Only one of them creates
+    or fetches a mirror at a time, and others waiting for it reuse the result.
+    While in use, the mirror is never evicted, although it can be fetched.
+
+    In [offline mode][krupy.cache.is_offline], the mirror is used as it is.
+
+    Args:
+        url:
+            Git-parseable URL of the repo. As returned by
+            [get_repo][krupy.vcs.get_repo].
+        ref:
+            Reference that is going to be checked out.
+
+    Yields:
+        The path to the mirror, in the [cache][krupy.cache].
+
+    Raises:
+        OfflineError: If offline, and the mirror or `ref` isn't in the cache.
+    """
+    path = mirror_path(url)
+    offline = is_offline()
+    requested = time.time()
+    hit = True
+    while True:
+        with lock(path.name, shared=True):
+            if path.is_dir() and (
+                offline
+                or not hit
+                or _fetched_since(path, requested)
+                or is_immutable_ref(path, ref)
+            ):
+                if offline and ref and not resolve_commit(path, ref):
+                    raise OfflineError(
+                        f"Reference {ref!r} of template {url} is not in the cache, "
+                        "so it can't be used offline."
+                    )
+                record("mirror", hit)
+                # Mark it as used, for eviction
+                with suppress(OSError):
+                    os.utime(path)
+                yield path
+                return
+        with lock(path.name):
+            # Another process may have done it while waiting for the lock
+            if _fetched_since(path, requested):
+                continue
+            if offline:
+                raise OfflineError(
+                    f"Template {url} is not in the cache, so it can't be used offline."
+                )
+            hit = False
+            if path.is_dir():
+                get_git(path)("fetch", "--prune", "--tags", "origin")
+            else:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                # Clone aside, so an interrupted clone never looks like a mirror
+                partial = Path(mkdtemp(prefix=f"{path.name}.", dir=path.parent))
+                try:
+                    get_git()("clone", "--mirror", url, partial)
+                    partial.rename(path)
+                finally:
+                    rmtree(partial, ignore_errors=True)
+            (path / "krupy-fetched").touch()
+
+
+def clone(url: str, ref: OptStr = None, source: OptStrOrPath = None) -> str:
     """Clone repo into some temporary destination.
 
     Includes dirty changes for local templates by copying into a temp
     directory and applying a wip commit there.
 
+    Remote repos are cloned from their [mirror][krupy.vcs.mirror] in the
+    cache, so they're only downloaded again when needed. Clones of a given
+    `source` mirror share its objects, instead of copying them, so they only
+    write the checked out files. Otherwise, the mirror can be evicted once
+    this returns, so the clone copies the objects it needs.
+
     Args:
         url:
             Git-parseable URL of the repo. As returned by
             [get_repo][krupy.vcs.get_repo].
         ref:
             Reference to checkout. For Git repos, defaults to `HEAD`.
+        source:
+            Mirror of a remote `url` that the caller already uses, to clone
+            from it instead of using the mirror again. The caller must keep
+            using it while it uses the clone.
     """
+    start = time.perf_counter()
     git = get_git()
     git_version = get_git_version()
     location = mkdtemp(prefix=f"{__name__}.clone.")
-    _clone = git["clone", "--no-checkout", url, location]
+    remote = is_remote(url)
+    _clone = git["clone", "--no-checkout"]
     # Faster clones if possible
     if git_version >= Version("2.27"):
         url_match = re.match("(file://)?(.*)", url)
@@ -175,20 +721,31 @@ def clone(url: str, ref: OptStr = None) -> str:
                 "failure or unusually high resource consumption.",
                 ShallowCloneWarning,
             )
-        else:
+        # Clones of the mirror share its objects already
+        elif not remote:
             _clone = _clone["--filter=blob:none"]
-    _clone()
-    # Include dirty changes if checking out a local HEAD
-    if ref in {None, "HEAD"} and os.path.exists(url) and Path(url).is_dir():
-        is_dirty = False
-        with local.cwd(url):
-            is_dirty = bool(git("status", "--porcelain").strip())
-        if is_dirty:
-            url_abspath = Path(url).absolute()
-            with local.cwd(location):
-                git("--git-dir=.git", f"--work-tree={url_abspath}", "add", "-A")
-                git(
-                    "--git-dir=.git",
+    with ExitStack() as stack:
+        if remote:
+            # Borrow objects from the mirror, so checkouts of any ref are cheap;
+            # it isn't evicted until checked out
+            if source is None:
+                source = stack.enter_context(mirror(url, ref))
+                _clone = _clone["--dissociate"]
+            _clone = _clone["--shared", source, location]
+        else:
+            _clone = _clone[url, location]
+        _clone()
+        if remote:
+            # Look like a clone of the original repo, not of the mirror
+            git("-C", location, "remote", "set-url", "origin", url)
+        # Include dirty changes if checking out a local HEAD
+        if ref in {None, "HEAD"} and os.path.exists(url) and Path(url).is_dir():
+            is_dirty = bool(get_git(url)("status", "--porcelain").strip())
+            if is_dirty:
+                url_abspath = Path(url).absolute()
+                draft = get_git(location)["--git-dir=.git"]
+                draft(f"--work-tree={url_abspath}", "add", "-A")
+                draft(
                     f"--work-tree={url_abspath}",
                     "commit",
                     "-m",
@@ -200,10 +757,13 @@ def clone(url: str, ref: OptStr = None) -> str:
                     DirtyLocalWarning,
                 )
 
-    with local.cwd(location):
-        git("checkout", "-f", ref or "HEAD")
-        git("submodule", "update", "--checkout", "--init", "--recursive", "--force")
+        checkout_git = get_git(location)
+        checkout_git("checkout", "-f", ref or "HEAD")
+        checkout_git(
+            "submodule", "update", "--checkout", "--init", "--recursive", "--force"
+        )
 
+    emit(CloneFinished(url, ref, Path(location), time.perf_counter() - start))
     return location
 
 
@@ -0,0 +1,271 @@
+"""Render a template again and again, while its author edits it.
+
+The first render is a normal [run_copy][krupy.main.Worker.run_copy]. Then, the
+template folder is polled for changes, and only changed files are rendered
+again, along with any other files that include, import or extend them.
+
+Changing [the `krupy.yml` file][the-krupyyml-file] makes everything render
+again, because any answer or setting could have changed.
+
+Local Git templates are rendered from a temporary clone. Changes in the
+original folder are mirrored into that clone, except for files ignored by Git.
+"""
+
+import os
+import shutil
+import stat
+import sys
+import time
+from contextlib import suppress
+from dataclasses import replace
+from itertools import chain
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from jinja2 import TemplateSyntaxError, meta
+from plumbum import colors
+
+from .errors import UserMessageError
+from .main import Worker
+from .template import load_template_config
+from .vcs import get_git
+
+DEFAULT_INTERVAL = 0.25
+
+# Modification time, size and mode of each file, by relative path
+Snapshot = Dict[Path, Tuple[int, int, int]]
+
+
+def snapshot(root: Path) -> Snapshot:
+    """Get the state of all files in a folder, ignoring `.git`.
+
+    Args:
+        root: Folder to inspect.
+    """
+    result: Snapshot = {}
+    for folder, dirs, files in os.walk(root):
+        with suppress(ValueError):
+            dirs.remove(".git")
+        for name in chain(dirs, files):
+            path = Path(folder, name)
+            try:
+                info = os.lstat(path)
+            except FileNotFoundError:
+                continue
+            # Symlinks to folders are listed among dirs, but aren't walked
+            if not stat.S_ISDIR(info.st_mode):
+                result[path.relative_to(root)] = (
+                    info.st_mtime_ns,
+                    info.st_size,
+                    info.st_mode,
+                )
+    return result
+
+
+def changes(old: Snapshot, new: Snapshot) -> Set[Path]:
+    """Get relative paths added, removed or modified between two snapshots."""
+    return {path for path in old.keys() | new.keys() if old.get(path) != new.get(path)}
+
+
+class Watcher:
+    """Keep a subproject in sync with the template it was copied from.
+
+    Attributes:
+        worker:
+            The worker that produces the first full render. It must point to a
+            local template. If it's a Git repository, use `vcs_ref="HEAD"`, or
+            else edits will be applied to the latest tag. Without
+            [overwrite][], every change asks for confirmation.
+
+        interval:
+            Seconds to wait between checks for changes.
+    """
+
+    def __init__(self, worker: Worker, interval: float = DEFAULT_INTERVAL) -> None:
+        self.worker = worker
+        self.interval = interval
+        source = Path(worker.template.url).expanduser()
+        if not source.is_dir():
+            raise UserMessageError("Watch mode needs a local template.")
+        self.source = source.resolve()
+        self._owned: List[Worker] = []
+        self._snapshot: Snapshot = {}
+        # Templates referenced by each template; `None` if unknown
+        self._references: Dict[str, Optional[Set[str]]] = {}
+
+    def run(self) -> None:
+        """Render everything, then render changes until interrupted."""
+        self.worker.run_copy()
+        self._start()
+        self._echo(f"Watching {self.source} for changes; press Ctrl+C to stop")
+        try:
+            while True:
+                time.sleep(self.interval)
+                self.check()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        """Clean up the workers created while watching."""
+        while self._owned:
+            self._owned.pop()._cleanup()
+
+    def check(self) -> Set[Path]:
+        """Render again whatever changed since the last check.
+
+        Render errors are reported, but don't stop watching.
+
+        Returns:
+            Relative paths of the template files that were rendered again.
+        """
+        if not self._snapshot:
+            self._start()
+        changed = self._wait_until_stable()
+        if not changed:
+            return set()
+        start = time.perf_counter()
+        try:
+            self._mirror(changed)
+            if self._config_changed():
+                self._reload()
+                rendered = set(self._snapshot)
+            else:
+                rendered = self._render_changes(changed)
+        except Exception as error:
+            self._echo(f"Render failed: {error}", colors.warn)
+            return set()
+        self._echo(
+            f"Rendered {len(rendered)} files in {time.perf_counter() - start:.2f}s"
+        )
+        return rendered
+
+    def _start(self) -> None:
+        self._snapshot = snapshot(self.source)
+        self._references.clear()
+        for relpath in self._snapshot:
+            self._parse(relpath.as_posix())
+
+    def _wait_until_stable(self) -> Set[Path]:
+        """Collect changes until editors finish saving files."""
+        result: Set[Path] = set()
+        while True:
+            current = snapshot(self.source)
+            new_changes = changes(self._snapshot, current)
+            self._snapshot = current
+            if not new_changes:
+                return result
+            result |= new_changes
+            time.sleep(self.interval / 5)
+
+    def _mirror(self, changed: Set[Path]) -> None:
+        """Copy changes from the original folder into the template clone."""
+        target = self.worker.template.local_abspath
+        if target == self.source:
+            return
+        ignored: Set[str] = set()
+        check_ignore = get_git(self.source)["check-ignore", "--", *map(str, changed)]
+        retcode, stdout, _ = check_ignore.run(retcode=None)
+        if retcode in {0, 1}:
+            ignored.update(stdout.splitlines())
+        for relpath in changed:
+            if str(relpath) in ignored:
+                continue
+            src, dst = self.source / relpath, target / relpath
+            if dst.is_symlink() or dst.exists():
+                dst.unlink()
+            if src.is_symlink() or src.exists():
+                dst.parent.mkdir(parents=True, exist_ok=True)
+                shutil.copy2(src, dst, follow_symlinks=False)
+
+    def _config_changed(self) -> bool:
+        template = self.worker.template
+        conf_paths = list(template.local_abspath.glob("krupy.*"))
+        new_config = {}
+        for path in conf_paths:
+            if path.is_file() and path.suffix.lower() in {".yml", ".yaml"}:
+                new_config = load_template_config(path)
+        # Files included from the config are loaded again too
+        return new_config != template._raw_config
+
+    def _reload(self) -> None:
+        """Render everything with a new worker, keeping answers."""
+        data = dict(self.worker.data)
+        if not self.worker.defaults:
+            data.update(self.worker.answers.user)
+        worker = replace(self.worker, data=data, overwrite=True)
+        try:
+            worker.run_copy()
+        except BaseException:
+            worker._cleanup()
+            raise
+        self.close()
+        self._owned.append(worker)
+        self.worker = worker
+        self._start()
+
+    def _render_changes(self, changed: Set[Path]) -> Set[Path]:
+        worker = self.worker
+        template = worker.template
+        suffix = template.templates_suffix
+        for relpath in changed:
+            self._parse(relpath.as_posix())
+            template.forget(template.local_abspath / relpath.parent)
+        affected = {relpath.as_posix() for relpath in changed}
+        # Adding or removing a templated file changes how its sibling renders
+        if suffix:
+            for name in list(affected):
+                affected.add(
+                    name[: -len(suffix)] if name.endswith(suffix) else name + suffix
+                )
+        while True:
+            dependents = {
+                name
+                for name, references in self._references.items()
+                if name not in affected
+                and (references is None or references & affected)
+            }
+            if not dependents:
+                break
+            affected |= dependents
+        result = set()
+        with worker._observing():
+            for name in sorted(affected):
+                src_abspath = template.local_abspath / name
+                if worker.template_copy_root not in src_abspath.parents:
+                    continue
+                dst_relpath = worker._render_path(
+                    src_abspath.relative_to(worker.template_copy_root)
+                )
+                if dst_relpath is None or worker.match_exclude(dst_relpath):
+                    continue
+                if src_abspath.is_symlink() and template.preserve_symlinks:
+                    worker._render_symlink(src_abspath)
+                elif src_abspath.is_file():
+                    worker._render_file(src_abspath)
+                else:
+                    continue
+                result.add(Path(name))
+        return result
+
+    def _parse(self, name: str) -> None:
+        """Find which templates are referenced by another one."""
+        self._references.pop(name, None)
+        template = self.worker.template
+        if not name.endswith(template.templates_suffix):
+            return
+        try:
+            source = (template.local_abspath / name).read_text()
+            ast = self.worker.jinja_env.parse(source)
+        except (OSError, UnicodeDecodeError, TemplateSyntaxError):
+            return
+        references = set(meta.find_referenced_templates(ast))
+        # A dynamic reference could be anything
+        self._references[name] = (
+            None if None in references else {str(ref) for ref in references}
+        )
+
+    def _echo(self, message: str, style=colors.info) -> None:
+        if not self.worker.quiet:
+            print(style | message, file=sys.stderr)
@@ -1,11 +1,14 @@
 import platform
 import sys
+from pathlib import Path
 from typing import Optional, Tuple
 
 import pytest
 from coverage.tracer import CTracer
 from pexpect.popen_spawn import PopenSpawn
 
+from krupy.cache import CACHE_DIR_ENV
+
 from .helpers import Spawn
 
 
@@ -32,3 +35,13 @@ def spawn() -> Spawn:
         return PopenSpawn(cmd, timeout, logfile=sys.stderr.buffer)
 
     return _spawn
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(
+    tmp_path_factory: pytest.TempPathFactory, monkeypatch: pytest.MonkeyPatch
+) -> Path:
+    """Keep the template cache of tests away from the user's one."""
+    path = tmp_path_factory.mktemp("cache")
+    monkeypatch.setenv(CACHE_DIR_ENV, str(path))
+    return path
@@ -0,0 +1,138 @@
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+import yaml
+from plumbum import local
+
+from krupy import arun_copy, arun_recopy, arun_update
+
+from .helpers import build_file_tree, git_save
+
+
+@pytest.fixture
+def template_path(tmp_path_factory: pytest.TempPathFactory) -> Path:
+    src = tmp_path_factory.mktemp("src")
+    build_file_tree(
+        {
+            (src / "krupy.yml"): yaml.safe_dump(
+                {
+                    "name": "nobody",
+                    "delay": 0.2,
+                    "_tasks": [
+                        [
+                            sys.executable,
+                            "-c",
+                            "import time; time.sleep({{ delay }}); "
+                            "open('task.txt', 'w').write('{{ name }}')",
+                        ]
+                    ],
+                }
+            ),
+            (src / "{{ _krupy_conf.answers_file }}.jinja"): (
+                "{{ _krupy_answers|to_nice_yaml }}"
+            ),
+            (src / "hello.txt.jinja"): "Hello {{ name }}",
+        }
+    )
+    with local.cwd(src):
+        git_save(tag="v1")
+    return src
+
+
+def test_copy_concurrently(template_path: Path, tmp_path: Path) -> None:
+    names = [f"name{num}" for num in range(4)]
+    ticks = 0
+
+    async def tick() -> None:
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    async def main() -> None:
+        ticker = asyncio.ensure_future(tick())
+        await asyncio.gather(
+            *(
+                arun_copy(
+                    str(template_path),
+                    tmp_path / name,
+                    data={"name": name},
+                    defaults=True,
+                    quiet=True,
+                    unsafe=True,
+                )
+                for name in names
+            )
+        )
+        ticker.cancel()
+
+    asyncio.run(main())
+    for name in names:
+        assert (tmp_path / name / "hello.txt").read_text() == f"Hello {name}"
+        assert (tmp_path / name / "task.txt").read_text() == name
+    # The loop kept running while tasks were sleeping
+    assert ticks >= 10
+
+
+def test_cancel_copy(template_path: Path, tmp_path: Path) -> None:
+    dst = tmp_path / "dst"
+
+    async def main() -> None:
+        copy = asyncio.ensure_future(
+            arun_copy(
+                str(template_path),
+                dst,
+                data={"delay": 30},
+                defaults=True,
+                quiet=True,
+                unsafe=True,
+            )
+        )
+        while not (dst / "hello.txt").exists():
+            await asyncio.sleep(0.01)
+        copy.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await copy
+
+    asyncio.run(asyncio.wait_for(main(), 10))
+    assert not dst.exists()
+
+
+def test_recopy_and_update(template_path: Path, tmp_path: Path) -> None:
+    settings = {"defaults": True, "overwrite": True, "quiet": True, "unsafe": True}
+    asyncio.run(arun_copy(str(template_path), tmp_path, data={"delay": 0}, **settings))
+    with local.cwd(tmp_path):
+        git_save()
+    build_file_tree({(template_path / "hello.txt.jinja"): "Bye {{ name }}"})
+    with local.cwd(template_path):
+        git_save(tag="v2")
+    asyncio.run(arun_update(tmp_path, **settings))
+    assert (tmp_path / "hello.txt").read_text() == "Bye nobody"
+    (tmp_path / "hello.txt").write_text("changed")
+    asyncio.run(arun_recopy(tmp_path, data={"name": "again"}, **settings))
+    assert (tmp_path / "hello.txt").read_text() == "Bye again"
+    assert (tmp_path / "task.txt").read_text() == "again"
+
+
+def test_update_concurrently(template_path: Path, tmp_path: Path) -> None:
+    settings = {"defaults": True, "overwrite": True, "quiet": True, "unsafe": True}
+    names = [f"name{num}" for num in range(3)]
+    for name in names:
+        dst = tmp_path / name
+        asyncio.run(arun_copy(str(template_path), dst, data={"name": name}, **settings))
+        with local.cwd(dst):
+            git_save()
+    build_file_tree({(template_path / "hello.txt.jinja"): "Bye {{ name }}"})
+    with local.cwd(template_path):
+        git_save(tag="v2")
+
+    async def main() -> None:
+        await asyncio.gather(
+            *(arun_update(tmp_path / name, **settings) for name in names)
+        )
+
+    asyncio.run(main())
+    for name in names:
+        assert (tmp_path / name / "hello.txt").read_text() == f"Bye {name}"
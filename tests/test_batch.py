@@ -0,0 +1,158 @@
+from pathlib import Path
+
+import pytest
+import yaml
+from plumbum import local
+
+from krupy.batch import BatchJob, format_results, load_manifest, run_batch
+from krupy.cli import KrupyApp
+
+from .helpers import build_file_tree, git_save
+
+
+@pytest.fixture(scope="module")
+def template_path(tmp_path_factory: pytest.TempPathFactory) -> str:
+    src = tmp_path_factory.mktemp("src")
+    build_file_tree(
+        {
+            (src / "krupy.yml"): yaml.safe_dump(
+                {
+                    "name": {"type": "str", "default": "nobody"},
+                    "greeting": {"type": "str", "default": "Hello"},
+                }
+            ),
+            (src / "greeting.txt.jinja"): "{{ greeting }} {{ name }}",
+            (src / "{{ _krupy_conf.answers_file }}.jinja"): (
+                "{{ _krupy_answers|to_nice_yaml }}"
+            ),
+        }
+    )
+    with local.cwd(src):
+        git_save(tag="v1")
+        build_file_tree({"greeting.txt.jinja": "{{ greeting }}, {{ name }}!"})
+        git_save(tag="v2")
+    return str(src)
+
+
+def test_load_yaml_manifest(tmp_path: Path) -> None:
+    manifest = tmp_path / "manifest.yml"
+    manifest.write_text(
+        yaml.safe_dump(
+            [
+                {"template": "a", "destination": "x"},
+                {"template": "b", "destination": "y", "ref": "v1", "data": {"n": 1}},
+            ]
+        )
+    )
+    assert load_manifest(manifest) == [
+        BatchJob(template="a", destination="x"),
+        BatchJob(template="b", destination="y", ref="v1", data={"n": 1}),
+    ]
+
+
+def test_load_csv_manifest(tmp_path: Path) -> None:
+    manifest = tmp_path / "manifest.csv"
+    manifest.write_text(
+        "template,ref,destination,name,greeting\n"
+        "a,,x,foo,\n"
+        "b,v1,y,bar,Hi\n"
+    )
+    assert load_manifest(manifest) == [
+        BatchJob(template="a", destination="x", data={"name": "foo"}),
+        BatchJob(
+            template="b",
+            destination="y",
+            ref="v1",
+            data={"name": "bar", "greeting": "Hi"},
+        ),
+    ]
+
+
+@pytest.mark.parametrize("processes", [1, 2])
+def test_run_batch(template_path: str, tmp_path: Path, processes: int) -> None:
+    jobs = [
+        BatchJob(template_path, str(tmp_path / "a"), "v1", {"name": "a"}),
+        BatchJob(template_path, str(tmp_path / "b"), "v2", {"name": "b"}),
+        BatchJob(template_path, str(tmp_path / "c"), "v1", {"name": "c"}),
+        BatchJob(str(tmp_path / "missing"), str(tmp_path / "d")),
+        BatchJob(template_path, str(tmp_path / "e"), "v2", {"greeting": "Hi"}),
+    ]
+    results = run_batch(jobs, processes=processes, quiet=True)
+    assert [result.job for result in results] == jobs
+    assert [result.ok for result in results] == [True, True, True, False, True]
+    assert "Local template must be a directory" in str(results[3].error)
+    assert (tmp_path / "a" / "greeting.txt").read_text() == "Hello a"
+    assert (tmp_path / "b" / "greeting.txt").read_text() == "Hello, b!"
+    assert (tmp_path / "c" / "greeting.txt").read_text() == "Hello c"
+    assert not (tmp_path / "d").exists()
+    assert (tmp_path / "e" / "greeting.txt").read_text() == "Hi, nobody!"
+    answers = yaml.safe_load((tmp_path / "b" / ".krupy-answers.yml").read_text())
+    assert answers["_commit"] == "v2"
+    assert answers["_src_path"] == template_path
+    table = format_results(results)
+    assert "4 succeeded, 1 failed" in table
+    assert "FAILED" in table
+
+
+def test_run_batch_remote(tmp_path: Path) -> None:
+    # Like remote templates, it's only recognized with the `.git` suffix
+    src = tmp_path / "tpl.git"
+    build_file_tree(
+        {
+            (src / "greeting.txt.jinja"): "Hello {{ name }}",
+            (src / "{{ _krupy_conf.answers_file }}.jinja"): (
+                "{{ _krupy_answers|to_nice_yaml }}"
+            ),
+        }
+    )
+    with local.cwd(src):
+        git_save(tag="v1")
+    url = f"file://{src.as_posix()}"
+    jobs = [BatchJob(url, str(tmp_path / name), "v1", {"name": name}) for name in "ab"]
+    # Pool processes get the template as a snapshot, without Git metadata
+    results = run_batch(jobs, processes=2, quiet=True)
+    assert [result.error for result in results] == [None, None]
+    for name in "ab":
+        assert (tmp_path / name / "greeting.txt").read_text() == f"Hello {name}"
+        answers = yaml.safe_load((tmp_path / name / ".krupy-answers.yml").read_text())
+        assert answers["_commit"] == "v1"
+
+
+def test_cli(template_path: str, tmp_path: Path, capsys: pytest.CaptureFixture) -> None:
+    manifest = tmp_path / "manifest.csv"
+    manifest.write_text(
+        "template,destination,name\n"
+        f"{template_path},{tmp_path / 'a'},a\n"
+        f"{template_path},{tmp_path / 'b'},\n"
+    )
+    _, retcode = KrupyApp.run(
+        ["krupy", "batch", "-j", "1", "-r", "v1", "-d", "name=cli", str(manifest)],
+        exit=False,
+    )
+    assert retcode == 0
+    assert (tmp_path / "a" / "greeting.txt").read_text() == "Hello a"
+    assert (tmp_path / "b" / "greeting.txt").read_text() == "Hello cli"
+    assert "2 succeeded, 0 failed" in capsys.readouterr().out
+    # Options that only make sense for one subproject are rejected
+    for option in ("--timings", "--summary", "--trace=trace.json"):
+        _, retcode = KrupyApp.run(["krupy", "batch", option, str(manifest)], exit=False)
+        assert retcode == 2
+    assert not Path("trace.json").exists()
+
+
+def test_cli_failure(
+    template_path: str, tmp_path: Path, capsys: pytest.CaptureFixture
+) -> None:
+    manifest = tmp_path / "manifest.yml"
+    manifest.write_text(
+        yaml.safe_dump(
+            [
+                {"template": str(tmp_path / "missing"), "destination": "x"},
+                {"template": template_path, "destination": str(tmp_path / "a")},
+            ]
+        )
+    )
+    _, retcode = KrupyApp.run(["krupy", "batch", str(manifest)], exit=False)
+    assert retcode == 1
+    assert (tmp_path / "a" / "greeting.txt").read_text() == "Hello, nobody!"
+    assert "1 succeeded, 1 failed" in capsys.readouterr().out
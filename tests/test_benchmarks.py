@@ -0,0 +1,109 @@
+import re
+from pathlib import Path
+
+import pytest
+
+from benchmarks.__main__ import BenchmarksApp
+from benchmarks.generator import TemplateSpec, generate
+from benchmarks.runner import (
+    TRACKED,
+    Result,
+    compare,
+    load_baseline,
+    run_benchmarks,
+    save_baseline,
+    table,
+)
+from benchmarks.scenarios import SCENARIOS
+from krupy import run_copy
+
+
+def test_generated_template(tmp_path: Path) -> None:
+    spec = TemplateSpec(
+        files=20, depth=3, size=100, templated=0.25, path_templated=0.1, excluded=2
+    )
+    tree = spec.tree()
+    names = [path.name for path in tree]
+    assert sum(name.startswith("file-") for name in names) == 18
+    assert sum(name.endswith(".txt.jinja") for name in names) == 5
+    assert sum(name.startswith("{{ project }}-") for name in names) == 2
+    assert {path.parent for path in tree} >= {Path("d0", "d0", "d0"), Path("d1/d1/d1")}
+    bundle = generate(spec, tmp_path)
+    run_copy(str(bundle), tmp_path / "v1", defaults=True, vcs_ref="v1")
+    rendered = [path for path in (tmp_path / "v1").rglob("*") if path.is_file()]
+    assert len(rendered) == 21  # Including the answers file
+    assert all(path.stat().st_size >= 100 for path in rendered if "file-" in path.name)
+    assert len(list((tmp_path / "v1").rglob("bench-file-*.txt"))) == 2
+    assert not list((tmp_path / "v1").glob("skip-*"))
+    run_copy(str(bundle), tmp_path / "v2", defaults=True)
+    assert (tmp_path / "v2" / "added.txt").is_file()
+
+
+def test_run_benchmarks() -> None:
+    results = run_benchmarks(TemplateSpec(files=5, questions=2), rounds=2)
+    assert list(results) == list(SCENARIOS)
+    assert all(len(result.samples) == 2 for result in results.values())
+    assert results["copy"].items == 5
+    assert results["ask"].items == 3
+    assert table(results).splitlines()[0].split() == [
+        "scenario",
+        "rounds",
+        "median",
+        "iqr",
+        "items/s",
+    ]
+
+
+def test_regressions() -> None:
+    baseline = {
+        "copy": Result("copy", 10, [1.0, 1.1, 1.2]),
+        "copy_memory": Result("copy_memory", 10, [1000], "B"),
+    }
+    noisy = {
+        "copy": Result("copy", 10, [0.9, 1.3, 1.6]),
+        "copy_memory": Result("copy_memory", 10, [1000], "B"),
+    }
+    report, failed = compare(baseline, noisy, 0.1)
+    assert not failed
+    worse = {
+        "copy": Result("copy", 10, [1.5, 1.5, 1.6]),
+        "copy_memory": Result("copy_memory", 10, [1200], "B"),
+    }
+    report, failed = compare(baseline, worse, 0.1)
+    assert failed == ["copy", "copy_memory"]
+    assert "+36.4%  regressed" in report
+    assert "1.2 KiB" in report
+    assert compare(baseline, worse, 0.5)[1] == []
+    assert "improved" in compare(worse, baseline, 0.1)[0]
+    # Measurements added after the baseline was saved can't regress
+    report, failed = compare({"copy": baseline["copy"]}, worse, 0.1)
+    assert failed == ["copy"]
+    assert re.search(r"^copy_memory +- +1\.2 KiB +new$", report, re.MULTILINE)
+
+
+def test_baseline(tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    baseline = tmp_path / "baseline.json"
+    args = ["benchmarks", "--files", "3", "--rounds", "1"]
+    _, retcode = BenchmarksApp.run([*args, "--save", str(baseline)], exit=False)
+    assert retcode == 0
+    spec, results = load_baseline(baseline)
+    assert spec == TemplateSpec(files=3)
+    assert list(results) == list(TRACKED)
+    assert results["copy_memory"].unit == "B"
+    assert results["import"].median > 0
+    capsys.readouterr()
+    _, retcode = BenchmarksApp.run(
+        ["benchmarks", "--compare", str(baseline), "--tolerance", "100", "copy"],
+        exit=False,
+    )
+    assert retcode == 0
+    assert re.search(r"^copy .* [-+][\d.]+%$", capsys.readouterr().out, re.MULTILINE)
+    # Everything regresses against an impossibly fast baseline
+    for result in results.values():
+        result.samples = [sample / 1000 for sample in result.samples]
+    save_baseline(baseline, spec, results)
+    _, retcode = BenchmarksApp.run(
+        ["benchmarks", "--compare", str(baseline), "copy"], exit=False
+    )
+    assert retcode == 1
+    assert "Regressed: copy" in capsys.readouterr().out
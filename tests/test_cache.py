@@ -0,0 +1,235 @@
+import os
+import re
+import subprocess
+import sys
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, List
+
+import pytest
+import yaml
+from plumbum import local
+
+from krupy import run_copy
+from krupy.cache import (
+    entries,
+    find_snapshot,
+    hit_ratios,
+    lock,
+    mirror_path,
+    prune,
+    snapshots,
+    store_snapshot,
+)
+from krupy.cli import KrupyApp
+from krupy.errors import OfflineError
+from krupy.events import Event, GitInvoked
+from krupy.template import Template
+from krupy.tools import OS
+
+from .helpers import build_file_tree, git_save
+
+
+@pytest.fixture
+def template_url(tmp_path_factory: pytest.TempPathFactory) -> str:
+    # Like remote templates, it's only recognized with the `.git` suffix
+    src = tmp_path_factory.mktemp("src") / "template.git"
+    build_file_tree(
+        {
+            (src / "{{ _krupy_conf.answers_file }}.jinja"): (
+                "{{ _krupy_answers|to_nice_yaml }}"
+            ),
+            (src / "version.txt"): "v1",
+        }
+    )
+    with local.cwd(src):
+        git_save(tag="v1")
+    return f"file://{src.as_posix()}"
+
+
+def test_snapshot_reused(template_url: str, tmp_path: Path) -> None:
+    run_copy(template_url, tmp_path / "first", defaults=True, vcs_ref="v1")
+    (snapshot,) = snapshots()
+    assert (snapshot.tree / "version.txt").read_text() == "v1"
+    assert not (snapshot.tree / ".git").exists()
+    events: List[Event] = []
+    run_copy(
+        template_url,
+        tmp_path / "second",
+        defaults=True,
+        vcs_ref="v1",
+        event_sinks=[events.append],
+    )
+    # A known tag needs no Git at all
+    assert not [event for event in events if isinstance(event, GitInvoked)]
+    assert (tmp_path / "second" / "version.txt").read_text() == "v1"
+    answers = yaml.safe_load((tmp_path / "second" / ".krupy-answers.yml").read_text())
+    assert answers["_commit"] == "v1"
+    # The latest tag is looked up, but its snapshot is reused
+    run_copy(template_url, tmp_path / "third", defaults=True)
+    assert len(snapshots()) == 1
+
+
+@pytest.mark.skipif(OS == "windows", reason="Windows templates are cloned")
+@pytest.mark.parametrize("attributes", [False, True])
+def test_snapshot_from_objects(
+    tmp_path_factory: pytest.TempPathFactory, attributes: bool
+) -> None:
+    src = tmp_path_factory.mktemp("src") / "template.git"
+    dst = tmp_path_factory.mktemp("dst")
+    build_file_tree(
+        {
+            (src / "krupy.yml"): "_preserve_symlinks: true",
+            (src / "{{ _krupy_conf.answers_file }}.jinja"): (
+                "{{ _krupy_answers|to_nice_yaml }}"
+            ),
+            (src / "sub" / "run.sh"): "#!/bin/sh",
+            (src / "sub" / "data.txt"): "data",
+        }
+    )
+    if attributes:
+        (src / ".gitattributes").write_text("*.txt text\n")
+    (src / "sub" / "run.sh").chmod(0o755)
+    (src / "link.txt").symlink_to("sub/data.txt")
+    with local.cwd(src):
+        git_save(tag="v1")
+    events: List[Event] = []
+    run_copy(f"file://{src.as_posix()}", dst, event_sinks=[events.append])
+    assert (dst / "sub" / "data.txt").read_text() == "data"
+    assert os.access(dst / "sub" / "run.sh", os.X_OK)
+    assert not os.access(dst / "sub" / "data.txt", os.X_OK)
+    assert os.readlink(dst / "link.txt") == "sub/data.txt"
+    answers = yaml.safe_load((dst / ".krupy-answers.yml").read_text())
+    assert answers["_commit"] == "v1"
+    # Files are written from the mirror's objects, unless Git must check them out
+    checkouts = [
+        event
+        for event in events
+        if isinstance(event, GitInvoked) and "checkout" in event.args
+    ]
+    assert bool(checkouts) is attributes
+
+
+def test_clone_locks_mirror_once(
+    template_url: str, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    # On Windows, all locks are exclusive, so locking a mirror twice would hang
+    @contextmanager
+    def exclusive_lock(
+        name: str, shared: bool = False, blocking: bool = True
+    ) -> Iterator[bool]:
+        with lock(name, blocking=False) as acquired:
+            assert acquired, f"{name} is locked already"
+            yield acquired
+
+    monkeypatch.setattr("krupy.vcs.lock", exclusive_lock)
+    # Windows templates are cloned
+    monkeypatch.setattr("krupy.template.OS", "windows")
+    run_copy(template_url, tmp_path, defaults=True, vcs_ref="v1")
+    assert (tmp_path / "version.txt").read_text() == "v1"
+
+
+def test_clone_keeps_mirror(template_url: str, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr("krupy.template.OS", "windows")
+    template = Template(url=template_url, ref="v1")
+    name = mirror_path(template.url_expanded).name
+    assert (template.local_abspath / "version.txt").read_text() == "v1"
+    # The clone borrows objects from the mirror, so it can't be evicted yet
+    with lock(name, blocking=False) as acquired:
+        assert not acquired
+    assert template.commit == "v1"
+    template._cleanup()
+    with lock(name, blocking=False) as acquired:
+        assert acquired
+
+
+def test_prune(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    checkout = tmp_path / "checkout"
+    build_file_tree({(checkout / "file.txt"): "x" * 100})
+    old = store_snapshot(checkout, "a" * 40, "v1", "1")
+    new = store_snapshot(checkout, "b" * 40, "v2", "2")
+    os.utime(old.path / "snapshot.json", (1, 1))
+    # Using a snapshot makes it the most recent
+    assert find_snapshot(old.commit_hash) == old
+    (evicted,) = prune(max_size=150)
+    assert evicted.path == new.path
+    assert snapshots() == [old]
+    # Entries in use are kept
+    with lock(old.commit_hash, shared=True):
+        assert not prune(max_size=0)
+    # Limits come from the environment by default
+    monkeypatch.setenv("KRUPY_CACHE_MAX_AGE", "1")
+    assert not prune()
+    os.utime(old.path / "snapshot.json", (1, 1))
+    assert prune()
+    assert not snapshots()
+
+
+def test_cache_cli(
+    template_url: str, tmp_path: Path, capsys: pytest.CaptureFixture[str]
+) -> None:
+    for num in range(3):
+        run_copy(template_url, tmp_path / str(num), defaults=True, vcs_ref="v1")
+    assert hit_ratios() == {"mirror": (0, 1), "snapshot": (2, 3)}
+    _, retcode = KrupyApp.run(["krupy", "cache", "info"], exit=False)
+    assert retcode == 0
+    info = capsys.readouterr().out
+    assert re.search(r"mirror +1 .* 0% of 1", info)
+    assert re.search(r"snapshot +1 .* 67% of 3", info)
+    _, retcode = KrupyApp.run(["krupy", "cache", "prune", "--max-age", "0"], exit=False)
+    assert retcode == 0
+    assert "Evicted 2 entries" in capsys.readouterr().out
+    assert not entries()
+    run_copy(template_url, tmp_path / "again", defaults=True, vcs_ref="v1")
+    assert entries()
+    _, retcode = KrupyApp.run(["krupy", "cache", "clear"], exit=False)
+    assert retcode == 0
+    assert not entries()
+    assert not hit_ratios()
+
+
+def test_offline(
+    template_url: str, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setenv("KRUPY_OFFLINE", "1")
+    with pytest.raises(OfflineError):
+        run_copy(template_url, tmp_path / "missing", defaults=True, vcs_ref="v1")
+    with pytest.raises(OfflineError):
+        run_copy("https://example.com/template.git", tmp_path / "remote", defaults=True)
+    monkeypatch.setenv("KRUPY_OFFLINE", "0")
+    run_copy(template_url, tmp_path / "online", defaults=True)
+    src = Path(template_url[len("file://") :])
+    build_file_tree({(src / "version.txt"): "v2"})
+    with local.cwd(src):
+        git_save(tag="v2")
+    # The latest tag is the one in the cache, since nothing is fetched
+    _, retcode = KrupyApp.run(
+        ["krupy", "copy", "--offline", "--defaults", template_url, str(tmp_path / "a")],
+        exit=False,
+    )
+    assert retcode == 0
+    assert (tmp_path / "a" / "version.txt").read_text() == "v1"
+    with pytest.raises(OfflineError, match="'v2'"):
+        run_copy(template_url, tmp_path / "b", defaults=True, vcs_ref="v2")
+
+
+def test_concurrent_processes(template_url: str, tmp_path: Path) -> None:
+    script = (
+        "import sys; from krupy import run_copy; "
+        "run_copy(sys.argv[1], sys.argv[2], defaults=True, vcs_ref='v1', quiet=True)"
+    )
+    processes = [
+        subprocess.Popen(
+            [sys.executable, "-c", script, template_url, str(tmp_path / str(num))]
+        )
+        for num in range(12)
+    ]
+    # A deadlock fails the test instead of hanging it
+    assert [process.wait(timeout=120) for process in processes] == [0] * 12
+    for num in range(12):
+        assert (tmp_path / str(num) / "version.txt").read_text() == "v1"
+    assert len(entries()) == 2
+    # Only one process downloaded and cloned; the others waited for it
+    ratios = hit_ratios()
+    assert ratios["mirror"][1] - ratios["mirror"][0] == 1
+    assert ratios["snapshot"] == (11, 12)
@@ -1,5 +1,8 @@
+import json
+import re
 import subprocess
 import sys
+import tracemalloc
 from pathlib import Path
 from typing import Callable, Generator
 
@@ -10,7 +13,7 @@ from plumbum.cmd import git
 
 from krupy.cli import KrupyApp
 
-from .helpers import KRUPY_CMD, build_file_tree
+from .helpers import KRUPY_CMD, build_file_tree, git_save
 
 
 @pytest.fixture(scope="module")
@@ -364,3 +367,99 @@ def test_skip_fileexists(template_path: str, tmp_path: Path) -> None:
     assert a_txt.read_text() == "PREVIOUS_CONTENT"
     answers = yaml.safe_load((tmp_path / "altered-answers.yml").read_text())
     assert answers["_src_path"] == str(template_path)
+
+
+@pytest.fixture
+def outdated_subproject(tmp_path_factory: pytest.TempPathFactory) -> Path:
+    src, dst = map(tmp_path_factory.mktemp, ["src", "dst"])
+    build_file_tree(
+        {
+            (src / "{{ _krupy_conf.answers_file }}.jinja"): (
+                "{{ _krupy_answers|to_nice_yaml }}"
+            ),
+            (src / "a.txt.jinja"): "{{ 1 + 1 }}",
+        }
+    )
+    with local.cwd(src):
+        git_save(tag="v1")
+    KrupyApp.run(["krupy", "copy", "--quiet", str(src), str(dst)], exit=False)
+    with local.cwd(dst):
+        git_save()
+    build_file_tree({(src / "b.txt"): "new"})
+    with local.cwd(src):
+        git_save(tag="v2")
+    return dst
+
+
+def test_timings(outdated_subproject: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    capsys.readouterr()
+    _, retcode = KrupyApp.run(
+        ["krupy", "update", "--quiet", "--timings", str(outdated_subproject)],
+        exit=False,
+    )
+    assert retcode == 0
+    assert (outdated_subproject / "b.txt").read_text() == "new"
+    calls = {
+        match.group(1): int(match.group(2))
+        for match in re.finditer(
+            r"^(\S+(?: \S+)?) +(\d+) +[\d.]+s +[\d.]+s$",
+            capsys.readouterr().err,
+            re.MULTILINE,
+        )
+    }
+    assert calls["update_render_old"] == 1
+    assert calls["update_render_current"] == 1
+    assert calls["update_render_new"] == 1
+    for name in ("version", "update_diff", "update_apply", "update_merge"):
+        assert name in calls
+    assert calls["git clone"] >= 3
+    assert calls["git diff-tree"] == 1
+    assert calls["git apply"] == 1
+    assert calls["jinja_compile"] >= 3
+
+
+def test_trace(outdated_subproject: Path, tmp_path: Path) -> None:
+    trace = tmp_path / "trace.json"
+    _, retcode = KrupyApp.run(
+        ["krupy", "update", "--quiet", "--trace", str(trace), str(outdated_subproject)],
+        exit=False,
+    )
+    assert retcode == 0
+    entries = json.loads(trace.read_text())
+    tracks = {
+        entry["tid"]: entry["args"]["name"]
+        for entry in entries
+        if entry["ph"] == "M" and entry["name"] == "thread_name"
+    }
+    spans = {
+        entry["name"]: tracks[entry["tid"]] for entry in entries if entry["ph"] == "X"
+    }
+    assert spans["update"] == "MainThread"
+    assert spans["update_render_old"] == "MainThread / old"
+    assert spans["update_render_current"] == "MainThread / current"
+    assert spans["update_render_new"] == "MainThread / new"
+    assert spans["git apply"] == "MainThread"
+    assert spans["a.txt"] == "MainThread / new"
+    assert all(
+        entry["dur"] >= 0 and entry["ts"] >= 0
+        for entry in entries
+        if entry["ph"] == "X"
+    )
+
+
+def test_memory_profile(
+    outdated_subproject: Path, capsys: pytest.CaptureFixture[str]
+) -> None:
+    capsys.readouterr()
+    _, retcode = KrupyApp.run(
+        ["krupy", "update", "--quiet", "--memory-profile", str(outdated_subproject)],
+        exit=False,
+    )
+    assert retcode == 0
+    assert not tracemalloc.is_tracing()
+    report = capsys.readouterr().err
+    size = r"[\d.]+ (?:B|KiB|MiB|GiB)"
+    assert re.search(rf"^Peak traced memory: {size}", report, re.MULTILINE)
+    assert re.search(rf"^  update_render_old +{size}  \(1x\)$", report, re.MULTILINE)
+    assert "Top allocation sites, after " in report
+    assert re.search(rf"^ +{size}  a\.txt$", report, re.MULTILINE)
@@ -0,0 +1,229 @@
+import json
+import sys
+from hashlib import sha256
+from pathlib import Path
+from typing import List
+
+import pytest
+import yaml
+from plumbum import local
+
+from krupy import run_copy
+from krupy.cli import KrupyApp
+from krupy.events import (
+    CloneFinished,
+    ConsolePrinter,
+    Event,
+    FileConflict,
+    FileCreated,
+    FileIdentical,
+    FileOverwritten,
+    FilePlanned,
+    FileRendered,
+    FileSkipped,
+    FileWritten,
+    TaskFinished,
+    TaskStarted,
+    to_dict,
+)
+
+from .helpers import build_file_tree, git_save
+
+
+@pytest.fixture
+def template_path(tmp_path_factory: pytest.TempPathFactory) -> Path:
+    src = tmp_path_factory.mktemp("src")
+    build_file_tree(
+        {
+            (src / "krupy.yml"): yaml.safe_dump(
+                {
+                    "name": "world",
+                    "_skip_if_exists": ["skipped.txt"],
+                    "_tasks": [[sys.executable, "-c", "print('{{ name }}')"]],
+                }
+            ),
+            (src / "hello.txt.jinja"): "Hello {{ name }}",
+            (src / "skipped.txt.jinja"): "{{ name }}",
+            (src / "sub" / "static.txt"): "static",
+        }
+    )
+    return src
+
+
+def test_copy_events(template_path: Path, tmp_path: Path) -> None:
+    events: List[Event] = []
+    run_copy(
+        str(template_path),
+        tmp_path,
+        defaults=True,
+        unsafe=True,
+        event_sinks=[events.append],
+    )
+    assert FilePlanned(template_path / "hello.txt.jinja", Path("hello.txt")) in events
+    rendered = [event for event in events if isinstance(event, FileRendered)]
+    assert {event.path: event.size for event in rendered} == {
+        Path("hello.txt"): 11,
+        Path("skipped.txt"): 5,
+        Path("sub", "static.txt"): 6,
+    }
+    assert all(event.duration >= 0 for event in rendered)
+    assert FileCreated(Path("sub")) in events
+    assert FileCreated(Path("hello.txt")) in events
+    assert FileWritten(Path("hello.txt"), 11) in events
+    assert events.index(FileCreated(Path("hello.txt"))) < events.index(
+        FileWritten(Path("hello.txt"), 11)
+    )
+    command = [sys.executable, "-c", "print('world')"]
+    assert TaskStarted(1, 1, command) in events
+    (finished,) = [event for event in events if isinstance(event, TaskFinished)]
+    assert finished.returncode == 0
+    assert finished.command == command
+    # Render again with other data
+    events.clear()
+    run_copy(
+        str(template_path),
+        tmp_path,
+        data={"name": "again"},
+        defaults=True,
+        overwrite=True,
+        unsafe=True,
+        event_sinks=[events.append],
+    )
+    assert FileIdentical(Path("sub", "static.txt")) in events
+    assert FileConflict(Path("hello.txt")) in events
+    assert FileOverwritten(Path("hello.txt")) in events
+    assert FileSkipped(Path("skipped.txt")) in events
+    assert FileWritten(Path("skipped.txt"), 5) not in events
+    assert to_dict(FileSkipped(Path("skipped.txt"))) == {
+        "event": "file_skipped",
+        "path": Path("skipped.txt"),
+    }
+
+
+def test_clone_and_pretend_events(template_path: Path, tmp_path: Path) -> None:
+    with local.cwd(template_path):
+        git_save(tag="v1")
+    events: List[Event] = []
+    with open(tmp_path / "log.txt", "w") as log:
+
+        def sink(event: Event) -> None:
+            # Sinks holding resources must not be copied
+            log.write(f"{event.kind}\n")
+            events.append(event)
+
+        run_copy(
+            str(template_path),
+            tmp_path / "dst",
+            defaults=True,
+            pretend=True,
+            quiet=True,
+            unsafe=True,
+            event_sinks=[sink],
+        )
+    (clone,) = [event for event in events if isinstance(event, CloneFinished)]
+    assert clone.url == str(template_path)
+    assert clone.duration > 0
+    assert not any(isinstance(event, FileWritten) for event in events)
+    (finished,) = [event for event in events if isinstance(event, TaskFinished)]
+    assert finished.returncode is None
+    assert "file_created" in (tmp_path / "log.txt").read_text()
+
+
+def test_console_output_is_a_sink(
+    template_path: Path, tmp_path: Path, capsys: pytest.CaptureFixture
+) -> None:
+    events: List[Event] = []
+    run_copy(
+        str(template_path),
+        tmp_path,
+        defaults=True,
+        quiet=True,
+        unsafe=True,
+        event_sinks=[events.append],
+    )
+    assert events
+    assert "create" not in capsys.readouterr().err
+    run_copy(str(template_path), tmp_path / "loud", defaults=True, unsafe=True)
+    err = capsys.readouterr().err
+    assert "create" in err
+    assert "Running task 1 of 1" in err
+
+
+def test_console_printer_batches(capsys: pytest.CaptureFixture) -> None:
+    printer = ConsolePrinter(summary=True, batch_size=3)
+    for name in ("a", "b"):
+        printer(FileIdentical(Path(name)))
+    printer(FileCreated(Path("c")))
+    printer(FileRendered(Path("c"), 1, 0.1, 0.1, b""))
+    assert capsys.readouterr().err == ""
+    printer(FileIdentical(Path("d")))
+    printer(FileOverwritten(Path("e")))
+    err = capsys.readouterr().err
+    assert "2 paths" in err
+    assert "1 path" in err
+    assert err.index("2 paths") < err.index("  c") < err.index("1 path")
+    printer(FileIdentical(Path("f")))
+    printer.flush()
+    assert "1 path" in capsys.readouterr().err
+
+
+def test_log_file(
+    template_path: Path, tmp_path: Path, capsys: pytest.CaptureFixture
+) -> None:
+    with local.cwd(template_path):
+        git_save(tag="v1")
+    log_file = tmp_path / "log.jsonl"
+    run_copy(
+        str(template_path),
+        tmp_path / "dst",
+        defaults=True,
+        unsafe=True,
+        log_file=log_file,
+    )
+    events = [json.loads(line) for line in log_file.read_text().splitlines()]
+    assert all(event["time"] > 0 for event in events)
+    phases = [
+        event["name"]
+        for event in events
+        if event["event"] == "phase_finished" and event["name"] != "jinja_compile"
+    ]
+    assert phases == [
+        "clone",
+        "checkout_latest_tag",
+        "config",
+        "version",
+        "ask",
+        "render",
+        "tasks",
+        "copy",
+    ]
+    git_args = [event["args"] for event in events if event["event"] == "git_invoked"]
+    assert any(args[-3:] == ["checkout", "--force", "v1"] for args in git_args)
+    assert {
+        "event": "file_rendered",
+        "path": "hello.txt",
+        "size": 11,
+        "sha256": sha256(b"Hello world").hexdigest(),
+    }.items() <= next(
+        event
+        for event in events
+        if event["event"] == "file_rendered" and event["path"] == "hello.txt"
+    ).items()
+    # The CLI can print the same lines instead of the usual output
+    capsys.readouterr()
+    KrupyApp.run(
+        [
+            "krupy",
+            "copy",
+            "--UNSAFE",
+            "--defaults",
+            "--overwrite",
+            "--log-format=jsonl",
+            str(template_path),
+            str(tmp_path / "dst"),
+        ],
+        exit=False,
+    )
+    events = [json.loads(line) for line in capsys.readouterr().err.splitlines()]
+    identical = [event for event in events if event["event"] == "file_identical"]
+    assert "hello.txt" in {event["path"] for event in identical}
@@ -1,11 +1,20 @@
+import json
+import sys
+
 import pytest
 import yaml
+from plumbum import local
 
 import krupy
 from krupy.types import AnyByStrDict
 
 from .helpers import build_file_tree
 
+# Seconds that `import krupy` may take, with a wide margin for slow machines
+IMPORT_BUDGET = 0.5
+# Modules that are slow to import, and only needed by some commands
+LAZY_MODULES = {"asyncio", "krupy.main", "krupy.questionary", "prompt_toolkit"}
+
 
 @pytest.mark.parametrize(
     "subdir, settings",
@@ -149,3 +158,32 @@ def test_import_macro(
     assert (dst / "the-name.txt").exists()
     assert (dst / "the-name" / "test.txt").exists()
     assert not (dst / "includes").exists()
+
+
+def test_import_budget(tmp_path_factory: pytest.TempPathFactory) -> None:
+    src, dst = map(tmp_path_factory.mktemp, ("src", "dst"))
+    build_file_tree(
+        {
+            (src / "krupy.yml"): yaml.safe_dump(
+                {"name": {"type": "yaml", "default": "world", "validator": ""}}
+            ),
+            (src / "hello.txt.jinja"): "Hello {{ name }}",
+        }
+    )
+    script = f"""\
+import json, sys, time
+start = time.perf_counter()
+import krupy
+elapsed = time.perf_counter() - start
+import krupy.cli
+loaded = set(sys.modules)
+krupy.run_copy({str(src)!r}, {str(dst)!r}, defaults=True, quiet=True)
+print(json.dumps([elapsed, sorted(loaded), sorted(sys.modules)]))
+"""
+    elapsed, loaded, after_copy = json.loads(local[sys.executable]("-c", script))
+    assert elapsed < IMPORT_BUDGET
+    assert not LAZY_MODULES & set(loaded)
+    # Prompts and their lexers are not needed without asking
+    assert "krupy.main" in after_copy
+    assert not {"asyncio", "prompt_toolkit", "pygments"} & set(after_copy)
+    assert (dst / "hello.txt").read_text() == "Hello world"
@@ -50,6 +50,16 @@ def test_output_skip(capsys: pytest.CaptureFixture[str], tmp_path: Path) -> None
     assert re.search(r"identical[^\s]*  doc[/\\]images[/\\]nslogo\.gif", err)
 
 
+def test_output_summary(capsys: pytest.CaptureFixture[str], tmp_path: Path) -> None:
+    render(tmp_path)
+    capsys.readouterr()
+    render(tmp_path, quiet=False, overwrite=True, summary=True)
+    _, err = capsys.readouterr()
+    assert re.search(r"overwrite[^\s]*  config\.py", err)
+    assert re.search(r"identical[^\s]*  \d+ paths", err)
+    assert not re.search(r"identical[^\s]*  pyproject\.toml", err)
+
+
 def test_output_quiet(capsys: pytest.CaptureFixture[str], tmp_path: Path) -> None:
     render(tmp_path, quiet=True)
     out, err = capsys.readouterr()
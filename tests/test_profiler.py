@@ -0,0 +1,86 @@
+import re
+import sys
+from pathlib import Path
+
+import pytest
+import yaml
+
+from krupy.cli import KrupyApp
+from krupy.errors import UnsafeTemplateError
+from krupy.profiler import profile_template
+
+from .helpers import build_file_tree
+
+
+@pytest.fixture
+def template_path(tmp_path_factory: pytest.TempPathFactory) -> Path:
+    src = tmp_path_factory.mktemp("src")
+    build_file_tree(
+        {
+            (src / "krupy.yml"): yaml.safe_dump(
+                {
+                    "count": 300,
+                    "_tasks": [[sys.executable, "-c", "open('task.txt', 'w')"]],
+                }
+            ),
+            (src / "slow.txt.jinja"): (
+                "{% for i in range(count) %}{{ i|string|upper }}{% endfor %}"
+            ),
+            (src / "fast.txt.jinja"): "{{ count }}",
+            (src / "static.txt"): "static",
+        }
+    )
+    return src
+
+
+def test_profile_template(template_path: Path) -> None:
+    profile = profile_template(str(template_path), filters=True)
+    assert set(profile.files) == {
+        Path("slow.txt"),
+        Path("fast.txt"),
+        Path("static.txt"),
+    }
+    wall, cpu, size = profile.files[Path("slow.txt")]
+    assert wall > 0
+    assert cpu >= 0
+    assert size == len("".join(map(str, range(300))))
+    assert profile.filters["string"][0] == 300
+    assert profile.filters["upper"][0] == 300
+    assert "to_json" not in profile.filters
+    # Data changes the cost
+    profile = profile_template(str(template_path), data={"count": 3})
+    assert profile.files[Path("slow.txt")][2] == 3
+    assert not profile.filters
+
+
+def test_profile_needs_trust_for_extensions(template_path: Path) -> None:
+    build_file_tree(
+        {
+            (template_path / "krupy.yml"): yaml.safe_dump(
+                {"count": 3, "_jinja_extensions": ["jinja2.ext.do"]}
+            )
+        }
+    )
+    with pytest.raises(UnsafeTemplateError):
+        profile_template(str(template_path))
+    profile = profile_template(str(template_path), unsafe=True)
+    assert Path("slow.txt") in profile.files
+
+
+def test_profile_cli(template_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    _, retcode = KrupyApp.run(
+        ["krupy", "profile", "--filters", "--top", "2", str(template_path)],
+        exit=False,
+    )
+    assert retcode == 0
+    out = capsys.readouterr().out
+    files = re.findall(r"^ +[\d.]+s +[\d.]+s +[\d.]+ \w+  (\S+)$", out, re.MULTILINE)
+    assert len(files) == 2
+    assert "slow.txt" in files
+    assert re.search(r"^ +300 +[\d.]+s  upper$", out, re.MULTILINE)
+    assert not (template_path / "task.txt").exists()
+    # It renders into a temporary folder, so destination options make no sense
+    _, retcode = KrupyApp.run(
+        ["krupy", "profile", "--pretend", str(template_path)], exit=False
+    )
+    assert retcode == 2
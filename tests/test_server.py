@@ -0,0 +1,217 @@
+import sys
+import threading
+from pathlib import Path
+from typing import Iterator, Union
+
+import pytest
+import yaml
+from plumbum import local
+
+import krupy.server
+from krupy.server import Address, SessionCache, TCPRenderServer, send_request
+
+from .helpers import build_file_tree, git_save
+
+pytestmark = pytest.mark.skipif(
+    sys.platform == "win32", reason="Unix sockets are used in most tests"
+)
+
+
+@pytest.fixture(scope="module")
+def template_path(tmp_path_factory: pytest.TempPathFactory) -> str:
+    src = tmp_path_factory.mktemp("src")
+    build_file_tree(
+        {
+            (src / "krupy.yml"): yaml.safe_dump(
+                {"name": {"type": "str", "default": "nobody"}}
+            ),
+            (src / "hello.txt.jinja"): "Hello {{ name }}",
+        }
+    )
+    return str(src)
+
+
+@pytest.fixture(params=["unix", "tcp"])
+def address(
+    request: pytest.FixtureRequest, tmp_path_factory: pytest.TempPathFactory
+) -> Iterator[Address]:
+    server: Union[TCPRenderServer, krupy.server.UnixRenderServer]
+    if request.param == "unix":
+        path = tmp_path_factory.mktemp("socket") / "krupy.sock"
+        server = krupy.server.UnixRenderServer(path)
+        address: Address = str(path)
+    else:
+        server = TCPRenderServer()
+        address = server.server_address[:2]  # type: ignore[assignment]
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield address
+    server.shutdown()
+    server.server_close()
+    server.cache.clear()
+    thread.join()
+
+
+def test_copy(template_path: str, address: Address, tmp_path: Path) -> None:
+    for name in ("foo", "bar"):
+        events = list(
+            send_request(
+                address,
+                {
+                    "id": name,
+                    "op": "copy",
+                    "src_path": template_path,
+                    "dst_path": str(tmp_path / name),
+                    "data": {"name": name},
+                },
+            )
+        )
+        assert [event["event"] for event in events] == ["started", "finished"]
+        assert all(event["id"] == name for event in events)
+        assert (tmp_path / name / "hello.txt").read_text() == f"Hello {name}"
+
+
+def test_events(template_path: str, address: Address, tmp_path: Path) -> None:
+    events = list(
+        send_request(
+            address,
+            {
+                "id": 1,
+                "op": "copy",
+                "src_path": template_path,
+                "dst_path": str(tmp_path),
+                "events": True,
+            },
+        )
+    )
+    assert events[0]["event"] == "started"
+    assert events[-1]["event"] == "finished"
+    assert {"id": 1, "event": "file_created", "path": "hello.txt"} in events
+    assert {"id": 1, "event": "file_written", "path": "hello.txt", "size": 12} in events
+
+
+def test_plan(template_path: str, address: Address, tmp_path: Path) -> None:
+    events = list(
+        send_request(
+            address,
+            {"op": "plan", "src_path": template_path, "dst_path": str(tmp_path)},
+        )
+    )
+    assert events[-1]["event"] == "finished"
+    assert not (tmp_path / "hello.txt").exists()
+
+
+def test_update(tmp_path_factory: pytest.TempPathFactory, address: Address) -> None:
+    src, dst = map(tmp_path_factory.mktemp, ("src", "dst"))
+    build_file_tree(
+        {
+            (src / "{{ _krupy_conf.answers_file }}.jinja"): (
+                "{{ _krupy_answers|to_nice_yaml }}"
+            ),
+            (src / "version.txt"): "v1",
+        }
+    )
+    with local.cwd(src):
+        git_save(tag="v1")
+    request = {"op": "copy", "src_path": str(src), "dst_path": str(dst)}
+    assert list(send_request(address, request))[-1]["event"] == "finished"
+    with local.cwd(dst):
+        git_save()
+    build_file_tree({(src / "version.txt"): "v2"})
+    with local.cwd(src):
+        git_save(tag="v2")
+    request = {"op": "update", "dst_path": str(dst)}
+    assert list(send_request(address, request))[-1]["event"] == "finished"
+    assert (dst / "version.txt").read_text() == "v2"
+
+
+def test_errors(template_path: str, address: Address, tmp_path: Path) -> None:
+    events = list(send_request(address, {"op": "wrong"}))
+    assert events[-1]["event"] == "error"
+    assert "Unknown operation" in events[-1]["error"]
+    events = list(send_request(address, {"op": "copy"}))
+    assert "Missing `src_path`" in events[-1]["error"]
+    events = list(
+        send_request(
+            address,
+            {"op": "copy", "src_path": str(tmp_path / "missing"), "dst_path": "x"},
+        )
+    )
+    assert "Local template must be a directory" in events[-1]["error"]
+
+
+def test_cache_eviction(tmp_path: Path) -> None:
+    templates = []
+    for num in range(3):
+        template = tmp_path / f"src{num}"
+        build_file_tree({(template / "file.txt"): "x" * 100})
+        templates.append(str(template))
+    cache = SessionCache(max_entries=2)
+    for template in templates:
+        with cache.session(src_path=template) as session:
+            assert session.template.url == template
+    assert len(cache) == 2
+    with cache.session(src_path=templates[2]) as first:
+        pass
+    with cache.session(src_path=templates[2]) as second:
+        assert second is first
+    with cache.session(src_path=templates[2], refresh=True) as third:
+        assert third is not first
+    # Limit by size
+    cache = SessionCache(max_bytes=150)
+    for template in templates:
+        with cache.session(src_path=template):
+            pass
+    assert len(cache) == 1
+    assert cache.size == 100
+
+
+def test_evicted_while_in_use(tmp_path: Path) -> None:
+    src = tmp_path / "src"
+    build_file_tree({(src / "file.txt"): "content"})
+    with local.cwd(src):
+        git_save()
+    cache = SessionCache()
+    with cache.session(src_path=str(src), vcs_ref="HEAD") as session:
+        clone = session.template.local_abspath
+        cache.clear()
+        # Still usable until released
+        session.render(tmp_path / "dst")
+        assert clone.exists()
+    assert not clone.exists()
+    assert (tmp_path / "dst" / "file.txt").read_text() == "content"
+
+
+def test_unsafe(tmp_path: Path) -> None:
+    src = tmp_path / "src"
+    build_file_tree(
+        {
+            (src / "krupy.yml"): yaml.safe_dump(
+                {"_tasks": [[sys.executable, "-c", "open('task.txt', 'w')"]]}
+            ),
+            (src / "hello.txt"): "Hello",
+        }
+    )
+    request = {"op": "copy", "src_path": str(src), "dst_path": str(tmp_path / "dst")}
+    unsafe_request = {**request, "settings": {"unsafe": True}}
+    for unsafe in (False, True):
+        server = krupy.server.UnixRenderServer(tmp_path / "krupy.sock", unsafe=unsafe)
+        assert (tmp_path / "krupy.sock").stat().st_mode & 0o777 == 0o600
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            # Templates can't run tasks unless both the server and request allow it
+            events = list(send_request(str(tmp_path / "krupy.sock"), request))
+            assert "unsafe feature: tasks" in events[-1]["error"]
+            events = list(send_request(str(tmp_path / "krupy.sock"), unsafe_request))
+        finally:
+            server.shutdown()
+            server.server_close()
+            server.cache.clear()
+            thread.join()
+        if unsafe:
+            assert events[-1]["event"] == "finished"
+            assert (tmp_path / "dst" / "task.txt").exists()
+        else:
+            assert "doesn't let requests enable `unsafe`" in events[-1]["error"]
+            assert not (tmp_path / "dst").exists()
@@ -0,0 +1,92 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+import yaml
+from plumbum import local
+from plumbum.cmd import git
+
+from krupy import TemplateSession
+
+from .helpers import build_file_tree, git_save
+
+
+@pytest.fixture
+def template_path(tmp_path_factory: pytest.TempPathFactory) -> Path:
+    src = tmp_path_factory.mktemp("src")
+    build_file_tree(
+        {
+            (src / "krupy.yml"): yaml.safe_dump(
+                {"name": {"type": "str", "default": "default name"}}
+            ),
+            (src / "{{ name }}.txt.jinja"): "Hello {{ name }}",
+            (src / "static.txt"): "static",
+            (src / "sub" / "nested.txt.jinja"): "{{ name|upper }}",
+            (src / "{{ _krupy_conf.answers_file }}.jinja"): (
+                "{{ _krupy_answers|to_nice_yaml }}"
+            ),
+        }
+    )
+    return src
+
+
+def test_render_many_times(template_path: Path, tmp_path: Path) -> None:
+    with TemplateSession(str(template_path), settings={"defaults": True}) as session:
+        for name in ("foo", "bar"):
+            session.render(tmp_path / name, data={"name": name})
+        session.render(tmp_path / "default")
+    for name in ("foo", "bar", "default name"):
+        dst = tmp_path / name.split()[0]
+        assert (dst / f"{name}.txt").read_text() == f"Hello {name}"
+        assert (dst / "static.txt").read_text() == "static"
+        assert (dst / "sub" / "nested.txt").read_text() == name.upper()
+        answers = yaml.safe_load((dst / ".krupy-answers.yml").read_text())
+        assert answers["name"] == name
+
+
+def test_render_overrides_settings(template_path: Path, tmp_path: Path) -> None:
+    with TemplateSession(
+        str(template_path), exclude=["static.txt"], settings={"defaults": True}
+    ) as session:
+        session.render(tmp_path / "pretend", pretend=True)
+        session.render(tmp_path / "real", data={"name": "real"})
+    assert not (tmp_path / "pretend").exists()
+    assert (tmp_path / "real" / "real.txt").read_text() == "Hello real"
+    assert not (tmp_path / "real" / "static.txt").exists()
+    # The template was prepared with these, so they can't change
+    with pytest.raises(TypeError, match="exclude, vcs_ref"):
+        session.render(tmp_path / "other", exclude=[], vcs_ref="HEAD")
+
+
+def test_render_concurrently(template_path: Path, tmp_path: Path) -> None:
+    names = [f"name{num}" for num in range(16)]
+    with TemplateSession(str(template_path), settings={"defaults": True}) as session:
+        with ThreadPoolExecutor(4) as executor:
+            workers = list(
+                executor.map(
+                    lambda name: session.render(tmp_path / name, data={"name": name}),
+                    names,
+                )
+            )
+    assert len(workers) == len(names)
+    for name in names:
+        assert (tmp_path / name / f"{name}.txt").read_text() == f"Hello {name}"
+        assert (tmp_path / name / "sub" / "nested.txt").read_text() == name.upper()
+
+
+def test_template_resolved_once(template_path: Path, tmp_path: Path) -> None:
+    with local.cwd(template_path):
+        git_save(tag="v1")
+    with TemplateSession(str(template_path), settings={"defaults": True}) as session:
+        clone_path = session.template.local_abspath
+        assert clone_path != template_path
+        for num in range(3):
+            worker = session.render(tmp_path / str(num), data={"name": str(num)})
+            assert worker.template is session.template
+            assert clone_path.is_dir()
+        with local.cwd(clone_path):
+            assert git("describe", "--tags").strip() == "v1"
+    # The temporary clone is removed only when the session ends
+    assert not clone_path.exists()
+    answers = yaml.safe_load((tmp_path / "0" / ".krupy-answers.yml").read_text())
+    assert answers["_commit"] == "v1"
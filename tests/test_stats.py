@@ -0,0 +1,111 @@
+import json
+from pathlib import Path
+
+import pytest
+import yaml
+
+from krupy.cli import KrupyApp
+from krupy.errors import UnsafeTemplateError
+from krupy.stats import template_stats
+
+from .helpers import build_file_tree
+
+
+@pytest.fixture
+def template_path(tmp_path_factory: pytest.TempPathFactory) -> Path:
+    src = tmp_path_factory.mktemp("src")
+    build_file_tree(
+        {
+            (src / "krupy.yml"): yaml.safe_dump(
+                {
+                    "project": "demo",
+                    "docs": {"type": "bool", "default": "{{ project == 'demo' }}"},
+                    "license": {
+                        "choices": ["MIT", "{{ project }}"],
+                        "default": "MIT",
+                        "when": "{{ docs }}",
+                    },
+                    "_exclude": ["krupy.yml", "*.bak"],
+                },
+                sort_keys=False,
+            ),
+            (src / "README.md.jinja"): (
+                "{% for i in range(3) %}{{ project }} {{ i }}{% endfor %}"
+            ),
+            (src / "static.txt"): "static",
+            (src / "old.bak"): "excluded",
+            (src / "{{ project }}" / "__init__.py.jinja"): "{{ license }}",
+            (src / "{% if docs %}docs{% endif %}" / "index.md"): "docs",
+        }
+    )
+    return src
+
+
+def test_template_stats(template_path: Path) -> None:
+    stats = template_stats(str(template_path))
+    assert set(stats.files) == {
+        "README.md.jinja",
+        "static.txt",
+        "{{ project }}/__init__.py.jinja",
+        "{% if docs %}docs{% endif %}/index.md",
+    }
+    assert stats.templated == 2
+    assert stats.templated_ratio == 0.5
+    assert stats.dirs == 2
+    assert stats.excluded == 2
+    assert stats.exclude_patterns == 2
+    assert sorted(stats.path_templated) == [
+        "{% if docs %}docs{% endif %}",
+        "{{ project }}",
+    ]
+    assert (stats.questions, stats.templated_when) == (3, 1)
+    assert (stats.templated_default, stats.templated_choices) == (1, 1)
+    readme = stats.files["README.md.jinja"]
+    assert readme.variables == ["project"]
+    assert readme.nodes > stats.files["{{ project }}/__init__.py.jinja"].nodes
+    assert stats.files["static.txt"].size == len("static")
+    assert not stats.files["static.txt"].variables
+    # Answers change what a copy produces
+    stats = template_stats(str(template_path), data={"docs": False})
+    assert "{% if docs %}docs{% endif %}/index.md" not in stats.files
+
+
+def test_stats_without_suffix(template_path: Path) -> None:
+    with (template_path / "krupy.yml").open("a") as config:
+        config.write("_templates_suffix: ''\n")
+    (template_path / "logo.png").write_bytes(b"\x89PNG\r\n\x1a\n\xff")
+    stats = template_stats(str(template_path))
+    assert stats.files["static.txt"].templated
+    assert not stats.files["logo.png"].templated
+    assert stats.files["logo.png"].size == 9
+
+
+def test_stats_needs_trust_for_extensions(template_path: Path) -> None:
+    with (template_path / "krupy.yml").open("a") as config:
+        config.write("_jinja_extensions: [jinja2.ext.do]\n")
+    with pytest.raises(UnsafeTemplateError):
+        template_stats(str(template_path))
+    assert template_stats(str(template_path), unsafe=True).templated == 2
+
+
+def test_cli_stats(template_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    _, retcode = KrupyApp.run(
+        ["krupy", "stats", "--format", "json", str(template_path)], exit=False
+    )
+    assert retcode == 0
+    data = json.loads(capsys.readouterr().out)
+    assert data["templated"] == 2
+    assert data["verbatim"] == 2
+    assert data["files"]["README.md.jinja"]["variables"] == ["project"]
+    _, retcode = KrupyApp.run(
+        ["krupy", "stats", "--top", "1", str(template_path)], exit=False
+    )
+    assert retcode == 0
+    out = capsys.readouterr().out
+    assert "Largest files, out of 4:" in out
+    assert "4 (2 templated, 2 verbatim, 50% templated)" in out
+    # Nothing is rendered, so rendering options make no sense
+    _, retcode = KrupyApp.run(
+        ["krupy", "stats", "--timings", str(template_path)], exit=False
+    )
+    assert retcode == 2
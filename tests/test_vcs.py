@@ -1,7 +1,7 @@
 import os
 import shutil
 from pathlib import Path
-from typing import Callable, Iterator, Sequence
+from typing import Callable, Iterator, List, Sequence
 
 import pytest
 import yaml
@@ -10,8 +10,23 @@ from plumbum import local
 from plumbum.cmd import git
 
 from krupy import Worker, run_copy, run_update
-from krupy.errors import ShallowCloneWarning
-from krupy.vcs import checkout_latest_tag, clone, get_git_version, get_repo
+from krupy.cache import mirror_path, normalize_url
+from krupy.errors import ShallowCloneWarning, UserMessageError
+from krupy.events import Event, observe
+from krupy.vcs import (
+    GitMetadata,
+    checkout_latest_tag,
+    clone,
+    get_git_version,
+    get_object_reader,
+    get_repo,
+    git_metadata,
+    is_immutable_ref,
+    open_object_reader,
+    resolve_commit,
+)
+
+from .helpers import build_file_tree, git_save
 
 
 def test_get_repo() -> None:
@@ -207,3 +222,129 @@ def test_select_latest_version_tag(
     assert (dst / filename).read_text() == "v1.0.1"
     answers = yaml.safe_load((dst / ".krupy-answers.yml").read_text())
     assert answers["_commit"] == "v1.0.1"
+
+
+def test_normalize_url() -> None:
+    assert {
+        normalize_url("https://GitHub.com/Krunal-Kevadiya/krupy.git"),
+        normalize_url("https://github.com/Krunal-Kevadiya/krupy/"),
+        normalize_url(" https://github.com/Krunal-Kevadiya/krupy "),
+    } == {"https://github.com/Krunal-Kevadiya/krupy"}
+    assert (
+        normalize_url("git@GitHub.com:Krunal-Kevadiya/krupy.git")
+        == "git@github.com:Krunal-Kevadiya/krupy"
+    )
+    assert normalize_url("https://github.com/a/krupy") != normalize_url(
+        "https://github.com/A/krupy"
+    )
+
+
+def test_clone_from_mirror(tmp_path: Path, cache_dir: Path) -> None:
+    src = tmp_path / "src"
+    src.mkdir()
+    with local.cwd(src):
+        git("init")
+        Path("version.txt").write_text("v1")
+        git("add", ".")
+        git("commit", "-m1")
+        git("tag", "v1")
+    url = f"file://{src.as_posix()}"
+    mirror = mirror_path(url)
+    assert mirror.parent.parent == cache_dir
+    assert not mirror.exists()
+    location = Path(clone(url, "v1"))
+    assert (location / "version.txt").read_text() == "v1"
+    assert git("-C", location, "remote", "get-url", "origin").strip() == url
+    assert mirror.is_dir()
+    with local.cwd(src):
+        Path("version.txt").write_text("v2")
+        git("commit", "-am2")
+        git("tag", "v2")
+    # Known tags don't need fetching
+    clone(url, "v1")
+    assert not git("-C", mirror, "tag", "--list", "v2").strip()
+    # Other refs do
+    location = Path(clone(url, "v2"))
+    assert (location / "version.txt").read_text() == "v2"
+    assert git("-C", mirror, "tag", "--list", "v2").strip() == "v2"
+    # The mirror can be evicted afterwards, so checkouts own their objects
+    alternates = location / ".git" / "objects" / "info" / "alternates"
+    assert not alternates.exists()
+    git("-C", location, "fsck", "--connectivity-only")
+    # Unless the caller keeps using the mirror
+    location = Path(clone(url, "v2", mirror))
+    alternates = location / ".git" / "objects" / "info" / "alternates"
+    assert Path(alternates.read_text().strip()).samefile(mirror / "objects")
+    assert not list((location / ".git" / "objects" / "pack").iterdir())
+
+
+def test_git_metadata(tmp_path: Path) -> None:
+    with local.cwd(tmp_path):
+        git("init")
+        with pytest.raises(UserMessageError, match="has no commit `HEAD`"):
+            git_metadata(tmp_path)
+        git("commit", "--allow-empty", "-m1")
+        head = git("rev-parse", "HEAD").strip()
+        short = git("rev-parse", "--short", "HEAD").strip()
+        metadata = git_metadata(tmp_path)
+        assert metadata == GitMetadata(
+            head, short, Version(f"0.0.0.post1.dev0+{short}")
+        )
+        git("tag", "-a", "-m", "v1", "v1.2")
+        assert git_metadata(tmp_path) == GitMetadata(head, "v1.2", Version("1.2"))
+        git("commit", "--allow-empty", "-m2")
+        git("commit", "--allow-empty", "-m3")
+        head = git("rev-parse", "HEAD").strip()
+        short = git("rev-parse", "--short", "HEAD").strip()
+        metadata = git_metadata(tmp_path)
+        assert metadata.commit_hash == head
+        assert metadata.describe == git("describe", "--tags", "--always").strip()
+        assert metadata.version == Version(f"1.2.post2.dev0+{short}")
+        # Tags without a version are described, but not versioned
+        git("tag", "not-a-version")
+        metadata = git_metadata(tmp_path)
+        assert metadata.describe == "not-a-version"
+        assert metadata.version == Version(f"0.0.0.post3.dev0+{short}")
+
+
+def test_object_reader(tmp_path: Path) -> None:
+    build_file_tree(
+        {
+            (tmp_path / "file.txt"): "content",
+            (tmp_path / "folder" / "script.sh"): "#!/bin/sh",
+        }
+    )
+    (tmp_path / "folder" / "script.sh").chmod(0o755)
+    (tmp_path / "link").symlink_to("file.txt")
+    with local.cwd(tmp_path):
+        git_save(tag="v1")
+        head = git("rev-parse", "HEAD").strip()
+    reader = open_object_reader(tmp_path)
+    # Readers are shared while open
+    assert open_object_reader(tmp_path) is reader
+    events: List[Event] = []
+    with observe([events.append]):
+        assert resolve_commit(tmp_path, "v1") == head
+        assert is_immutable_ref(tmp_path, "v1")
+        assert not is_immutable_ref(tmp_path, "missing")
+    # No Git process was spawned
+    assert not events
+    blob = reader.read("v1:file.txt")
+    assert blob is not None
+    assert (blob.type, blob.data) == ("blob", b"content")
+    assert reader.read("v1:missing.txt") is None
+    entries = {entry.name: entry for entry in reader.tree("v1") or []}
+    assert sorted(entries) == ["file.txt", "folder", "link"]
+    assert entries["folder"].is_dir
+    assert entries["link"].is_symlink
+    target = reader.read(entries["link"].object_hash)
+    assert target is not None
+    assert target.data == b"file.txt"
+    (script,) = reader.tree(entries["folder"].object_hash) or []
+    assert script.mode == 0o100755
+    reader.close()
+    assert get_object_reader(tmp_path) is reader
+    reader.close()
+    assert get_object_reader(tmp_path) is None
+    # Without a reader, Git is spawned instead
+    assert resolve_commit(tmp_path, "v1") == head
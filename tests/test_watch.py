@@ -0,0 +1,121 @@
+from pathlib import Path
+
+import pytest
+import yaml
+from plumbum import local
+
+from krupy import Worker
+from krupy.errors import UserMessageError
+from krupy.watch import Watcher, changes, snapshot
+
+from .helpers import build_file_tree, git_save
+
+
+@pytest.fixture
+def template_path(tmp_path_factory: pytest.TempPathFactory) -> Path:
+    src = tmp_path_factory.mktemp("src")
+    build_file_tree(
+        {
+            (src / "krupy.yml"): yaml.safe_dump(
+                {"_exclude": ["krupy.yml", "includes"], "name": "world"}
+            ),
+            (src / "includes" / "greeting.jinja"): "Hello",
+            (src / "hello.txt.jinja"): (
+                '{% include "includes/greeting.jinja" %} {{ name }}'
+            ),
+            (src / "bye.txt.jinja"): "Bye {{ name }}",
+            (src / "static.txt"): "static",
+        }
+    )
+    return src
+
+
+def test_snapshot_changes(tmp_path: Path) -> None:
+    build_file_tree(
+        {
+            (tmp_path / "a.txt"): "a",
+            (tmp_path / "sub" / "b.txt"): "b",
+            (tmp_path / ".git" / "c"): "c",
+        }
+    )
+    before = snapshot(tmp_path)
+    assert set(before) == {Path("a.txt"), Path("sub", "b.txt")}
+    build_file_tree({(tmp_path / "a.txt"): "aa", (tmp_path / "sub" / "new.txt"): "new"})
+    (tmp_path / "sub" / "b.txt").unlink()
+    after = snapshot(tmp_path)
+    assert changes(before, after) == {
+        Path("a.txt"),
+        Path("sub", "b.txt"),
+        Path("sub", "new.txt"),
+    }
+
+
+@pytest.mark.parametrize("use_git", [False, True])
+def test_incremental_render(template_path: Path, tmp_path: Path, use_git: bool) -> None:
+    if use_git:
+        build_file_tree({(template_path / ".gitignore"): "ignored.txt\n"})
+        with local.cwd(template_path):
+            git_save()
+    with Worker(
+        src_path=str(template_path),
+        dst_path=tmp_path,
+        vcs_ref="HEAD",
+        defaults=True,
+        overwrite=True,
+        quiet=True,
+    ) as worker:
+        watcher = Watcher(worker, interval=0.01)
+        worker.run_copy()
+        assert (tmp_path / "hello.txt").read_text() == "Hello world"
+        assert watcher.check() == set()
+        # Changing an included template renders only its dependents
+        build_file_tree({(template_path / "includes" / "greeting.jinja"): "Hi"})
+        assert watcher.check() == {Path("hello.txt.jinja")}
+        assert (tmp_path / "hello.txt").read_text() == "Hi world"
+        # New files are rendered too
+        build_file_tree(
+            {
+                (template_path / "bye.txt.jinja"): "Goodbye {{ name }}",
+                (template_path / "sub" / "new.txt.jinja"): "{{ name|upper }}",
+                (template_path / "ignored.txt"): "ignored",
+            }
+        )
+        rendered = watcher.check()
+        assert Path("bye.txt.jinja") in rendered
+        assert Path("sub", "new.txt.jinja") in rendered
+        assert (tmp_path / "bye.txt").read_text() == "Goodbye world"
+        assert (tmp_path / "sub" / "new.txt").read_text() == "WORLD"
+        assert (tmp_path / "ignored.txt").exists() != use_git
+        assert not (tmp_path / "includes").exists()
+        # Config changes render everything again
+        build_file_tree(
+            {(template_path / "krupy.yml"): yaml.safe_dump({"name": "everybody"})}
+        )
+        assert Path("static.txt") in watcher.check()
+        assert (tmp_path / "hello.txt").read_text() == "Hi everybody"
+        assert (tmp_path / "includes" / "greeting").read_text() == "Hi"
+        watcher.close()
+
+
+def test_render_errors_keep_watching(template_path: Path, tmp_path: Path) -> None:
+    with Worker(
+        src_path=str(template_path),
+        dst_path=tmp_path,
+        defaults=True,
+        overwrite=True,
+        quiet=True,
+    ) as worker:
+        watcher = Watcher(worker, interval=0.01)
+        worker.run_copy()
+        watcher.check()
+        build_file_tree({(template_path / "bye.txt.jinja"): "{{ name "})
+        assert watcher.check() == set()
+        build_file_tree({(template_path / "bye.txt.jinja"): "{{ name }}!"})
+        assert watcher.check() == {Path("bye.txt.jinja")}
+        assert (tmp_path / "bye.txt").read_text() == "world!"
+
+
+def test_remote_template(tmp_path: Path) -> None:
+    with Worker(src_path="gh:someone/template", dst_path=tmp_path) as worker:
+        with pytest.raises(UserMessageError, match="needs a local template"):
+            Watcher(worker)